@@ -1,6 +1,6 @@
 import { useState } from 'react'
 
-export default function SearchBar({ value, onChange, tag, onTagChange, tags = [] }) {
+export default function SearchBar({ value, onChange, tag, onTagChange, tags = [], counts = {} }) {
   const [local, setLocal] = useState(value || '')
 
   return (
@@ -14,7 +14,7 @@ export default function SearchBar({ value, onChange, tag, onTagChange, tags = []
       />
       <select value={tag} onChange={e => onTagChange(e.target.value)} style={{ padding: '8px', borderRadius: 6, border: '1px solid #ddd' }}>
         <option value=''>Všechny tagy</option>
-        {tags.map(t => <option key={t} value={t}>{t}</option>)}
+        {tags.map(t => <option key={t} value={t}>{counts[t] ? `${t} (${counts[t]})` : t}</option>)}
       </select>
     </div>
   )
@@ -0,0 +1,91 @@
+// Client-side query over the index written by scripts/search_index.py
+// (public/data/search-index.json). Weights are precomputed BM25 scores, so a
+// query is a few term lookups: exact words by binary search, the last word
+// (while it is being typed) as a prefix over the sorted term list once it has
+// MIN_PREFIX characters (until then it is ignored, like a stopword). Of the
+// terms with that prefix, the MAX_EXPANSIONS found in the most herbs count
+// (best weight per herb), so a keystroke costs the same however large the
+// index is.
+// Keep fold(), STOPWORDS and the matching rules in line with search_index.py.
+
+const MIN_PREFIX = 2
+const MAX_EXPANSIONS = 64
+const STOPWORDS = new Set(`
+  a i k o s u v z na ve ze se je to do od po pro pri za ze by jak jako nebo ale
+  tak ten ta ty jsou byl bylo jeho jeji ktery ktera ktere kde ci take
+`.split(/\s+/).filter(Boolean))
+
+function fold(text) {
+  return String(text || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase()
+}
+
+function words(text) {
+  return fold(text).match(/[a-z0-9]+/g) || []
+}
+
+function lowerBound(terms, term) {
+  let lo = 0
+  let hi = terms.length
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1
+    if (terms[mid] < term) lo = mid + 1
+    else hi = mid
+  }
+  return lo
+}
+
+function termScores(index, term, prefix) {
+  const { terms, postings } = index
+  const scores = new Map()
+  let i = lowerBound(terms, term)
+  if (!prefix) {
+    if (terms[i] === term) {
+      const p = postings[i]
+      for (let j = 0; j < p.length; j += 2) scores.set(p[j], p[j + 1])
+    }
+    return scores
+  }
+  // terms are [a-z0-9]+ and '{' sorts after 'z': the range of terms with the prefix
+  const end = lowerBound(terms, term + '{')
+  let matched = []
+  for (; i < end; i++) matched.push(i)
+  if (matched.length > MAX_EXPANSIONS) {
+    // the terms found in the most herbs, ties in term order
+    matched = matched.sort((a, b) => postings[b].length - postings[a].length || a - b).slice(0, MAX_EXPANSIONS)
+  }
+  for (const t of matched) {
+    const p = postings[t]
+    for (let j = 0; j < p.length; j += 2) {
+      if (p[j + 1] > (scores.get(p[j]) || 0)) scores.set(p[j], p[j + 1])
+    }
+  }
+  return scores
+}
+
+// Returns matching herb ids, best first (every query word must match),
+// or null when the query has no words.
+function search(index, query) {
+  const ws = words(query)
+  if (!ws.length) return null
+  const prefix = !/\s$/.test(query)
+  let total = null
+  for (let i = 0; i < ws.length; i++) {
+    const isPrefix = prefix && i === ws.length - 1
+    if (isPrefix ? ws[i].length < MIN_PREFIX : STOPWORDS.has(ws[i])) continue
+    const scores = termScores(index, ws[i], isPrefix)
+    if (total === null) {
+      total = scores
+    } else {
+      const next = new Map()
+      for (const [doc, s] of total) {
+        if (scores.has(doc)) next.set(doc, s + scores.get(doc))
+      }
+      total = next
+    }
+    if (!total.size) return []
+  }
+  if (total === null) return null
+  return Array.from(total).sort((a, b) => b[1] - a[1] || a[0] - b[0]).map(([doc]) => index.ids[doc])
+}
+
+module.exports = { fold, search }
@@ -0,0 +1,104 @@
+// Build-time data access for getStaticProps/getStaticPaths.
+// Reads the per-slug shards and the listing written by scripts/export_site_data.py.
+// Without that export it falls back to data/herbs.json, parsed once per build worker;
+// records there must already have sections_html (scripts/sanitize_html.py) or the build fails.
+const fs = require('fs')
+const path = require('path')
+
+const dataDir = path.join(process.cwd(), 'data')
+const siteDir = path.join(dataDir, 'site')
+
+function readJson(p) {
+  return JSON.parse(fs.readFileSync(p, 'utf8'))
+}
+
+let herbsById = null
+function fallbackHerbs() {
+  if (!herbsById) {
+    herbsById = new Map(readJson(path.join(dataDir, 'herbs.json')).map(h => [h.id, h]))
+  }
+  return herbsById
+}
+
+function snippet(text, limit = 160) {
+  const t = String(text || '').replace(/\s+/g, ' ').trim()
+  if (t.length <= limit) return t
+  return t.slice(0, limit).replace(/\s+\S*$/, '').replace(/[,;:]+$/, '') + '…'
+}
+
+// same shape as listing_entry() in scripts/export_site_data.py
+function listingEntry(h, sprites) {
+  const first = (h.images && h.images[0]) || {}
+  const entry = {
+    id: h.id,
+    name: h.name,
+    summary: snippet(h.summary),
+    thumb: first.thumb_url || first.file_url || null,
+    tags: h.tags || []
+  }
+  if (first.lqip) entry.lqip = first.lqip
+  if (first.dominant_color) entry.dominant_color = first.dominant_color
+  if (h.content_quality === 'template' || h.content_quality === 'near_duplicate') entry.content_quality = h.content_quality
+  const pos = sprites && sprites.herbs[h.id]
+  if (pos) entry.sprite = { url: sprites.sheets[pos.sheet].url, x: pos.x, y: pos.y, ...sprites.cell }
+  return entry
+}
+
+// same fields as shard_entry() in scripts/export_site_data.py
+const SHARD_FIELDS = ['id', 'name', 'summary', 'other_names', 'latin', 'sections_html', 'wikipedia_url', 'source_url', 'license', 'similar']
+const IMAGE_FIELDS = ['file_url', 'thumb_url', 'width', 'height', 'lqip', 'dominant_color']
+function pick(obj, keys) {
+  const out = {}
+  for (const k of keys) if (obj[k] !== undefined && obj[k] !== null) out[k] = obj[k]
+  return out
+}
+function shardEntry(h) {
+  const entry = pick(h, SHARD_FIELDS)
+  const first = h.images && h.images[0]
+  if (first) entry.images = [pick(first, IMAGE_FIELDS)]
+  return entry
+}
+
+function loadListing() {
+  const listingPath = path.join(siteDir, 'listing.json')
+  if (fs.existsSync(listingPath)) return readJson(listingPath)
+  const spritePath = path.join(dataDir, 'thumb-sprites.json')
+  const sprites = fs.existsSync(spritePath) ? readJson(spritePath) : null
+  return Array.from(fallbackHerbs().values(), h => listingEntry(h, sprites))
+}
+
+function loadHerb(slug) {
+  const shard = path.join(siteDir, 'herbs', encodeURIComponent(slug) + '.json')
+  if (fs.existsSync(shard)) return readJson(shard)
+  const herb = fallbackHerbs().get(slug)
+  if (!herb) return null
+  // only sanitized sections are shipped; without them the page would silently lose its content
+  if (herb.sections && Object.keys(herb.sections).length && !herb.sections_html) {
+    throw new Error(`${slug}: sections_html missing in data/herbs.json; ` +
+      'run the sanitize pipeline stage or python scripts/export_site_data.py first')
+  }
+  return shardEntry(herb)
+}
+
+function listSlugs() {
+  return loadListing().map(h => h.id)
+}
+
+// { facets: [{ tag, count }], index: { tag: [ids] } } as written by scripts/export_site_data.py
+function loadFacets() {
+  const facetsPath = path.join(siteDir, 'facets.json')
+  if (fs.existsSync(facetsPath)) return readJson(facetsPath)
+  const index = {}
+  for (const h of loadListing()) for (const t of h.tags || []) (index[t] = index[t] || []).push(h.id)
+  const tags = Object.keys(index).sort((a, b) => index[b].length - index[a].length || (a < b ? -1 : a > b ? 1 : 0))
+  return { facets: tags.map(tag => ({ tag, count: index[tag].length })), index }
+}
+
+let namesById = null
+// [{ id, name }] for the ids in `similar` (scripts/similar_herbs.py), skipping unknown ones
+function similarHerbs(herb) {
+  if (!namesById) namesById = new Map(loadListing().map(h => [h.id, h.name]))
+  return ((herb && herb.similar) || []).filter(id => namesById.has(id)).map(id => ({ id, name: namesById.get(id) }))
+}
+
+module.exports = { loadListing, loadFacets, loadHerb, listSlugs, similarHerbs }
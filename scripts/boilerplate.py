@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Strip boilerplate sentences from the text fields, driven by a pattern file.
+
+Patterns live in data/boilerplate-patterns.txt, one per line (# comments).
+Matching ignores case, Czech diacritics and whitespace (a space in a pattern
+matches any run of whitespace, including none, so "našíaplikace" matches
+"naší aplikace"). All patterns are folded into one trie that is compiled to a
+single case-insensitive regular expression in which every letter is a class
+of its accented forms ("a" -> "[aáäą...]"), so it runs on the text as it is,
+without folding it first. At each position of the text, only the branches
+that agree with the next character are tried, so the scan is linear in the
+text length however many patterns are added, and it runs in C. The longest
+match wins.
+
+Only the source text fields (summary, sections, other_names) are stripped and
+searched; derived fields such as sections_html are rebuilt from them.
+
+Discovery mode reports sentences that repeat across many records: word
+shingles are counted by document frequency, and sentences made mostly of
+frequent shingles are grouped and ranked by how many records contain them.
+
+Usage:
+  python scripts/boilerplate.py strip [--dry-run]
+  python scripts/boilerplate.py discover [--min-records 20] [--append]
+"""
+import argparse
+import re
+from collections import Counter
+
+from herbio import iter_records, stream_update
+from herbstore import DATA, ROOT
+from textnorm import FOLD, fold
+
+PATTERNS = ROOT / 'data' / 'boilerplate-patterns.txt'
+SNAPSHOT = 'boilerplate'
+SHINGLE = 5
+FIELDS = ('summary', 'sections', 'other_names')
+
+_WS = '\x00'
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+def _variants():
+    out = {}
+    for cp, base in FOLD.items():
+        out.setdefault(base.lower(), {base.lower()}).add(chr(cp).lower())
+    return {base: '[' + ''.join(sorted(chars)) + ']' for base, chars in out.items()}
+
+# folded letter -> character class of every letter that folds to it
+_VARIANTS = _variants()
+
+def load_patterns(path=PATTERNS):
+    if not path.exists():
+        return []
+    with path.open('r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def _trie_regex(patterns):
+    trie = {}
+    for p in patterns:
+        node = trie
+        for ch in _WS.join(fold(p).split()):
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def emit(node):
+        alts = [(r'\s*' if ch == _WS else _VARIANTS.get(ch) or re.escape(ch)) + emit(child)
+                for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in node else body
+    return emit(trie)
+
+class Stripper:
+    def __init__(self, patterns):
+        self.patterns = [p for p in patterns if p.split()]
+        self.regex = re.compile(_trie_regex(self.patterns), re.IGNORECASE) if self.patterns else None
+
+    @classmethod
+    def from_file(cls, path=PATTERNS):
+        return cls(load_patterns(path))
+
+    def contains(self, text):
+        return bool(self.regex and self.regex.search(text))
+
+    def strip(self, text):
+        """Return (text without boilerplate, number of matches)."""
+        if not self.regex:
+            return text, 0
+        spans = [m.span() for m in self.regex.finditer(text) if m.end() > m.start()]
+        if not spans:
+            return text, 0
+        parts = []
+        prev = 0
+        for start, end in spans:
+            parts.append(text[prev:start])
+            prev = end
+        parts.append(text[prev:])
+        # join what is left around each removal with a single space
+        out = parts[0].rstrip()
+        for i in range(1, len(parts)):
+            part = parts[i].lstrip()
+            if i < len(parts) - 1:
+                part = part.rstrip()
+            if out and part:
+                out += ' '
+            out += part
+        return out.strip(), len(spans)
+
+    def strip_obj(self, obj):
+        """Strip every string inside dicts/lists in place; return the number of matches."""
+        total = 0
+        items = obj.items() if isinstance(obj, dict) else enumerate(obj)
+        for k, v in list(items):
+            if isinstance(v, str):
+                new, n = self.strip(v)
+                if n:
+                    obj[k] = new
+                    total += n
+            elif isinstance(v, (dict, list)):
+                total += self.strip_obj(v)
+        return total
+
+    def strip_record(self, herb):
+        """Strip the source text fields (FIELDS) of `herb` in place; return the number of matches."""
+        total = 0
+        for field in FIELDS:
+            v = herb.get(field)
+            if isinstance(v, str):
+                new, n = self.strip(v)
+                if n:
+                    herb[field] = new
+                    total += n
+            elif isinstance(v, (dict, list)):
+                total += self.strip_obj(v)
+        return total
+
+_default = None
+
+def default_stripper():
+    global _default
+    if _default is None:
+        _default = Stripper.from_file()
+    return _default
+
+def process_record(herb):
+    """Pipeline stage: strip boilerplate from `herb` in place; return the number removed."""
+    return default_stripper().strip_record(herb)
+
+# -- discovery -------------------------------------------------------------
+
+def _strings(obj):
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _strings(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _strings(v)
+
+def _sentences(herb):
+    for text in _strings([herb.get(field) for field in FIELDS]):
+        for s in _SENTENCE_RE.split(text):
+            words = fold(s).split()
+            if len(words) >= 3:
+                yield s.strip(), words
+
+def _shingles(words):
+    if len(words) <= SHINGLE:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + SHINGLE])) for i in range(len(words) - SHINGLE + 1)}
+
+def discover(path=DATA, min_records=20, coverage=0.8, stripper=None):
+    """Return [(records, sentence)] for sentences whose shingles recur in >= min_records records."""
+    df = Counter()
+    for herb in iter_records(path):
+        seen = set()
+        for _, words in _sentences(herb):
+            seen |= _shingles(words)
+        df.update(seen)
+
+    groups = {}
+    for herb in iter_records(path):
+        seen = set()
+        for sentence, words in _sentences(herb):
+            key = ' '.join(words)
+            if key in seen:
+                continue
+            sh = _shingles(words)
+            if sum(df[s] >= min_records for s in sh) >= coverage * len(sh):
+                seen.add(key)
+                g = groups.setdefault(key, [0, sentence])
+                g[0] += 1
+    found = [(n, sentence) for n, sentence in groups.values() if n >= min_records]
+    if stripper:
+        found = [(n, s) for n, s in found if not stripper.contains(s)]
+    return sorted(found, key=lambda x: (-x[0], x[1]))
+
+def main():
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    s = sub.add_parser('strip')
+    s.add_argument('--dry-run', action='store_true')
+    d = sub.add_parser('discover')
+    d.add_argument('--min-records', type=int, default=20)
+    d.add_argument('--coverage', type=float, default=0.8, help='Share of a sentence\'s shingles that must be frequent')
+    d.add_argument('--append', action='store_true', help=f'Append the findings to {PATTERNS.name}')
+    args = p.parse_args()
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    stripper = Stripper.from_file()
+    if args.command == 'strip':
+        if args.dry_run:
+            records = changed = count = 0
+            for herb in iter_records(DATA):
+                n = stripper.strip_record(herb)
+                records += 1
+                changed += bool(n)
+                count += n
+        else:
+            records, changed, count = stream_update(stripper.strip_record, DATA, snapshot=SNAPSHOT)
+        print(f'Done. {len(stripper.patterns)} patterns, {count} removals in {changed} of {records} records'
+              + (' (dry run).' if args.dry_run else f'. Snapshot: {SNAPSHOT}'))
+        return
+    found = discover(DATA, args.min_records, args.coverage, stripper)
+    for n, sentence in found:
+        print(f'{n:>7}  {sentence}')
+    if args.append and found:
+        with PATTERNS.open('a', encoding='utf-8') as f:
+            f.write('# discovered\n' + ''.join(sentence + '\n' for _, sentence in found))
+        print(f'Appended {len(found)} patterns to {PATTERNS}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Pack listing thumbnails into WebP sprite atlases for the index grid.
+
+Behavior:
+- For every herb with a local image (manifest `thumb_path`, else `images[0]`),
+  crops the image to the card aspect and scales it to one --cell (240x120).
+- Packs the cells row by row into sheets of --columns x --rows and saves them as
+  public/sprites/thumbs-<n>.<hash>.webp (content-hashed for caching). Each
+  sheet is written as soon as it is full, so memory stays at one sheet.
+- Writes data/thumb-sprites.json with the sheet URLs, the cell size and the
+  offsets per herb id; the index page merges it into the cards' props.
+
+Usage:
+  python scripts/build_sprites.py [--cell 240x120] [--columns 8] [--rows 16] [--quality 80]
+"""
+import argparse
+import hashlib
+import json
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from image_placeholders import local_file
+from herbio import iter_records
+from herbstore import DATA, ROOT
+
+MANIFEST = ROOT / 'data' / 'images-manifest.json'
+SPRITE_MAP = ROOT / 'data' / 'thumb-sprites.json'
+SPRITES = ROOT / 'public' / 'sprites'
+
+def thumbnail_source(herb, manifest):
+    for entry in manifest.get(herb.get('id')) or []:
+        path = local_file(entry.get('thumb_path')) or local_file(entry.get('local_path'))
+        if path:
+            return path
+    imgs = herb.get('images') or []
+    if imgs:
+        return local_file(imgs[0].get('thumb_url')) or local_file(imgs[0].get('file_url'))
+    return None
+
+def load_cell(path, cell):
+    try:
+        with Image.open(path) as img:
+            img.draft('RGB', (cell[0] * 2, cell[1] * 2))
+            img = img.convert('RGB')
+            return ImageOps.fit(img, cell, Image.LANCZOS)
+    except Exception as e:
+        print('Cannot read', path, e)
+        return None
+
+def save_sheet(cells, cell, columns, quality, index):
+    rows = (len(cells) + columns - 1) // columns
+    sheet = Image.new('RGB', (cell[0] * min(columns, len(cells)), cell[1] * rows), (250, 250, 250))
+    offsets = {}
+    for i, (hid, im) in enumerate(cells):
+        x, y = (i % columns) * cell[0], (i // columns) * cell[1]
+        sheet.paste(im, (x, y))
+        offsets[hid] = (x, y)
+    buf = BytesIO()
+    sheet.save(buf, format='WEBP', quality=quality, method=6)
+    data = buf.getvalue()
+    name = f'thumbs-{index}.{hashlib.sha1(data).hexdigest()[:8]}.webp'
+    (SPRITES / name).write_bytes(data)
+    return name, sheet.size, len(data), offsets
+
+def main(cell=(240, 120), columns=8, rows=16, quality=80):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    manifest = {}
+    if MANIFEST.exists():
+        with MANIFEST.open('r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    SPRITES.mkdir(parents=True, exist_ok=True)
+    old = set(SPRITES.glob('thumbs-*.webp'))
+    per_sheet = columns * rows
+    sprite_map = {'cell': {'width': cell[0], 'height': cell[1]}, 'sheets': [], 'herbs': {}}
+    total = packed = 0
+
+    def flush(cells):
+        n = len(sprite_map['sheets'])
+        name, size, nbytes, offsets = save_sheet(cells, cell, columns, quality, n)
+        old.discard(SPRITES / name)
+        sprite_map['sheets'].append({'url': f'/sprites/{name}', 'width': size[0], 'height': size[1]})
+        for hid, (x, y) in offsets.items():
+            sprite_map['herbs'][hid] = {'sheet': n, 'x': x, 'y': y}
+        return nbytes
+
+    # only one sheet of decoded cells is held in memory at a time
+    cells = []
+    for herb in iter_records(DATA):
+        path = thumbnail_source(herb, manifest)
+        im = load_cell(path, cell) if path else None
+        if im is None:
+            continue
+        cells.append((herb.get('id'), im))
+        packed += 1
+        if len(cells) == per_sheet:
+            total += flush(cells)
+            cells = []
+    if cells:
+        total += flush(cells)
+    for stale in old:
+        stale.unlink()
+
+    with SPRITE_MAP.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+        json.dump(sprite_map, f, ensure_ascii=False, indent=2)
+    SPRITE_MAP.with_suffix('.tmp').replace(SPRITE_MAP)
+    print(f"Done. Packed {packed} thumbnails into {len(sprite_map['sheets'])} sheets ({total} bytes). Map: {SPRITE_MAP.name}")
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--cell', default='240x120', help='Cell size WxH in pixels')
+    p.add_argument('--columns', type=int, default=8)
+    p.add_argument('--rows', type=int, default=16, help='Rows per sheet before starting a new one')
+    p.add_argument('--quality', type=int, default=80)
+    args = p.parse_args()
+    w, h = (int(v) for v in args.cell.lower().split('x'))
+    main(cell=(w, h), columns=args.columns, rows=args.rows, quality=args.quality)
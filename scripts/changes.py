@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Per-record content hashes and the change feed.
+
+Every record written by the scripts carries `content_hash`: the first 16 hex
+digits of the SHA-256 of its canonical JSON (sorted keys, compact separators,
+the hash field itself excluded), so it does not depend on key order. Each
+write that changes records appends one line per record to data/changes.jsonl
+(next to the dataset):
+
+    {"ts": "2026-10-19T10:15:02Z", "id": "...", "old": "3f1c...", "new": "9a0b...",
+     "fields": ["wikipedia_url"]}
+
+`old` is null for new records and `new` is null for removed ones. Downstream
+steps read the feed to process only the delta, e.g.
+`python scripts/download_images.py --changed-since 2026-10-19T10:00:00Z`.
+
+Usage:
+  python scripts/changes.py since 2026-10-19T10:00:00Z   # ids changed since then
+  python scripts/changes.py stamp                        # add hashes to all records once
+"""
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+HASH_FIELD = 'content_hash'
+
+def _canon(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+def field_digests(herb):
+    """Canonical JSON of each top-level field except the hash."""
+    return {k: _canon(v) for k, v in herb.items() if k != HASH_FIELD}
+
+def digest(fields):
+    """Content hash from `field_digests()` output; equals hashing the canonical record."""
+    body = ','.join(f'{_canon(k)}:{fields[k]}' for k in sorted(fields))
+    return hashlib.sha256(('{' + body + '}').encode('utf-8')).hexdigest()[:16]
+
+def content_hash(herb):
+    return digest(field_digests(herb))
+
+def stamp(herb):
+    """Set the record's `content_hash` and return it."""
+    h = herb[HASH_FIELD] = content_hash(herb)
+    return h
+
+def changed_fields(before, after):
+    """Top-level fields that differ between two `field_digests()` results."""
+    return [k for k in {**before, **after} if before.get(k) != after.get(k)]
+
+def change(herb_id, before, after):
+    """Feed entry for one record; `before`/`after` are field digests or None."""
+    return {
+        'id': herb_id,
+        'old': digest(before) if before is not None else None,
+        'new': digest(after) if after is not None else None,
+        'fields': changed_fields(before or {}, after or {}),
+    }
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def feed_path(data_path):
+    return Path(data_path).resolve().parent / 'changes.jsonl'
+
+def append(data_path, entries):
+    """Append change entries to the feed of the dataset at `data_path`."""
+    if not entries:
+        return
+    ts = _now()
+    with feed_path(data_path).open('a', encoding='utf-8') as f:
+        for e in entries:
+            f.write(json.dumps({'ts': ts, **e}, ensure_ascii=False) + '\n')
+
+def read(data_path, since=None):
+    """Yield feed entries, optionally only those at or after the ISO timestamp `since`."""
+    path = feed_path(data_path)
+    if not path.exists():
+        return
+    since = _normalize(since) if since else None
+    with path.open('r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            e = json.loads(line)
+            if since is None or e['ts'] >= since:
+                yield e
+
+def changed_since(data_path, since):
+    """Return (changed_or_added_ids, removed_ids) since the timestamp, net of later changes."""
+    state = {}
+    for e in read(data_path, since):
+        state[e['id']] = e['new'] is not None
+    return {i for i, alive in state.items() if alive}, {i for i, alive in state.items() if not alive}
+
+def _normalize(ts):
+    # accept '2026-10-19', '2026-10-19T10:00' or with an offset; compare as UTC 'Z' strings
+    dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def stamp_all(data_path):
+    """Add or refresh `content_hash` on every record; return how many were stale."""
+    import herbio
+    from herbdb import HerbDB, is_sqlite_path
+
+    with herbio.file_lock(data_path):
+        if is_sqlite_path(data_path):
+            with HerbDB(data_path) as db:
+                stale = [h for h in db.iter_records() if h.get(HASH_FIELD) != content_hash(h)]
+                db.upsert_many(stale)
+            return len(stale)
+        stale = 0
+        with herbio.RecordWriter(data_path) as out:
+            for herb in herbio.iter_records(data_path):
+                stale += herb.get(HASH_FIELD) != content_hash(herb)
+                out.write(herb)
+            if not stale:
+                out.discard()
+        return stale
+
+def main():
+    from herbstore import DATA
+
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    s = sub.add_parser('since')
+    s.add_argument('timestamp')
+    sub.add_parser('stamp')
+    p.add_argument('--data', default=str(DATA))
+    args = p.parse_args()
+    if args.command == 'since':
+        changed, removed = changed_since(args.data, args.timestamp)
+        for i in sorted(changed):
+            print(i)
+        for i in sorted(removed):
+            print('-', i)
+    else:
+        print(f'Stamped {stamp_all(args.data)} records.')
+
+if __name__ == '__main__':
+    main()
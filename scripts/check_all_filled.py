@@ -1,21 +1,28 @@
 #!/usr/bin/env python3
-from pathlib import Path
-import json
+"""Check that every herb has a summary and sections (see validate.py for the full report).
 
-DATA = Path('data') / 'herbs.json'
-if not DATA.exists():
-    print('data/herbs.json not found')
-    raise SystemExit(1)
+Exits with status 1 if any are missing.
+"""
+from herbio import iter_records
+from herbstore import DATA, is_missing
 
-js = json.loads(DATA.read_text(encoding='utf-8'))
-total = len(js)
-missing_summary = [h.get('name') for h in js if not (isinstance(h.get('summary'), str) and h.get('summary').strip())]
-missing_sections = [h.get('name') for h in js if not (isinstance(h.get('sections'), dict) and h.get('sections'))]
+def main():
+    if not DATA.exists():
+        print(f'{DATA} not found')
+        raise SystemExit(1)
+    total = 0
+    missing = {'summary': [], 'sections': []}
+    for h in iter_records(DATA):
+        total += 1
+        for field, names in missing.items():
+            if is_missing(h, field):
+                names.append(h.get('name') or h.get('id'))
 
-print(total)
-print(len(missing_summary))
-print(len(missing_sections))
-if missing_summary:
-    print('examples_missing_summary:', missing_summary[:10])
-if missing_sections:
-    print('examples_missing_sections:', missing_sections[:10])
+    print(f'Records: {total}')
+    for field, names in missing.items():
+        print(f'Missing {field}: {len(names)}' + (f" (e.g. {', '.join(map(str, names[:10]))})" if names else ''))
+    if any(missing.values()):
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -2,14 +2,26 @@
 """Download images referenced in data/herbs.json, create thumbnails and manifest.
 Writes files to public/images/ and manifest to data/images-manifest.json
 Logs progress to data/image-download.log
+
+With --changed-since TIMESTAMP only herbs that the change feed (changes.py)
+lists as changed since then are processed; the rest of the manifest is kept.
+
+Images that are already on disk are not decoded again when their size and
+mtime match the previous manifest entry: its dimensions and placeholder
+(`lqip`, `dominant_color`) are reused. Entries that image_dedup.py --prune
+marked `duplicate_of` are kept as they are instead of being downloaded again.
 """
+import argparse
 import json
 import os
-import re
 from pathlib import Path
 import requests
 from PIL import Image
 from io import BytesIO
+from image_placeholders import compute_placeholder, local_file
+from changes import changed_since as feed_changed_since
+from herbio import iter_records
+from textnorm import safe_filename
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / 'data'
@@ -29,10 +41,6 @@ def log(msg):
     except Exception:
         pass
 
-def slugify(s):
-    s = re.sub(r'[^a-zA-Z0-9_\-]', '_', s)
-    return s
-
 def download_image(url):
     try:
         resp = requests.get(url, headers={'User-Agent': 'herbar-image-downloader/0.1'}, timeout=30)
@@ -58,18 +66,35 @@ def make_thumbnail(src_bytes, out_path: Path, max_size=400):
         log(f'Failed to create thumbnail {out_path}: {e}')
         return False
 
-def process():
+def process(changed_since=None):
     herbs_path = DATA_DIR / 'herbs.json'
     if not herbs_path.exists():
         log('herbs.json not found; run scraper first')
         return
-    with open(herbs_path, 'r', encoding='utf8') as f:
-        herbs = json.load(f)
 
+    previous = {}
+    if MANIFEST.exists():
+        with open(MANIFEST, 'r', encoding='utf8') as mf:
+            previous = json.load(mf)
+    # local_path -> previous entry, to skip decoding files that did not change
+    known = {e.get('local_path'): e for entries in previous.values() for e in entries}
+    # file name without extension -> entry pruned by image_dedup.py (the herb may now
+    # point at a kept copy with another extension)
+    pruned = {Path(e['local_path']).stem: e for entries in previous.values() for e in entries
+              if e.get('duplicate_of') and e.get('local_path')}
     manifest = {}
+    only = None
+    if changed_since:
+        only, removed = feed_changed_since(herbs_path, changed_since)
+        manifest = previous
+        for hid in removed:
+            manifest.pop(hid, None)
+        log(f'{len(only)} herbs changed and {len(removed)} removed since {changed_since}')
     total = 0
-    for herb in herbs:
-        hid = herb.get('id') or slugify(herb.get('name','unknown'))
+    for herb in iter_records(herbs_path):
+        hid = herb.get('id') or safe_filename(herb.get('name','unknown'))
+        if only is not None and hid not in only:
+            continue
         images = herb.get('images') or []
         manifest[hid] = []
         for idx, img in enumerate(images):
@@ -79,23 +104,40 @@ def process():
                 continue
             total += 1
             ext = os.path.splitext(src.split('?')[0])[1].lower() or '.jpg'
-            fname = f'{slugify(hid)}_{idx}{ext}'
+            fname = f'{safe_filename(hid)}_{idx}{ext}'
             out_path = PUBLIC_IMAGES / fname
+            local_path = str(Path('public/images') / fname)
+            old = known.get(local_path)
+            dup = pruned.get(Path(fname).stem)
+            if dup and not local_file(dup['local_path']):
+                # pruned by image_dedup.py; the herb already points at the kept copy
+                manifest[hid].append(dup)
+                continue
             if out_path.exists():
-                size = out_path.stat().st_size
-                try:
-                    pil = Image.open(out_path)
-                    w,h = pil.size
-                except Exception:
-                    w=h=None
-                manifest[hid].append({
+                st = out_path.stat()
+                thumb_path = PUBLIC_IMAGES / f'{safe_filename(hid)}_{idx}_thumb.webp'
+                entry = {
                     'original_url': src,
-                    'local_path': str(Path('public/images') / fname),
-                    'width': w,
-                    'height': h,
-                    'size_bytes': size,
+                    'local_path': local_path,
+                    'thumb_path': str(Path('public/images') / thumb_path.name) if thumb_path.exists() else None,
+                    'size_bytes': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
                     'license': herb.get('license')
-                })
+                }
+                if (old and old.get('size_bytes') == st.st_size and old.get('mtime_ns') == st.st_mtime_ns
+                        and old.get('lqip')):
+                    entry.update({k: old.get(k) for k in ('width', 'height', 'lqip', 'dominant_color')})
+                else:
+                    try:
+                        pil = Image.open(out_path)
+                        w,h = pil.size
+                    except Exception:
+                        w=h=None
+                    entry.update(width=w, height=h)
+                    ph = compute_placeholder(out_path)
+                    if ph:
+                        entry.update(ph)
+                manifest[hid].append(entry)
                 log(f'{hid}: image already exists {fname}')
                 continue
 
@@ -104,7 +146,8 @@ def process():
             if not content:
                 continue
             save_image_bytes(content, out_path)
-            size = out_path.stat().st_size
+            st = out_path.stat()
+            size = st.st_size
             try:
                 pil = Image.open(out_path)
                 w,h = pil.size
@@ -112,7 +155,7 @@ def process():
                 w=h=None
 
             # thumbnail
-            thumb_name = f'{slugify(hid)}_{idx}_thumb.webp'
+            thumb_name = f'{safe_filename(hid)}_{idx}_thumb.webp'
             thumb_path = PUBLIC_IMAGES / thumb_name
             made = make_thumbnail(content, thumb_path)
             manifest_entry = {
@@ -122,8 +165,12 @@ def process():
                 'width': w,
                 'height': h,
                 'size_bytes': size,
+                'mtime_ns': st.st_mtime_ns,
                 'license': herb.get('license')
             }
+            ph = compute_placeholder(content)
+            if ph:
+                manifest_entry.update(ph)
             manifest[hid].append(manifest_entry)
 
     with open(MANIFEST, 'w', encoding='utf8') as mf:
@@ -131,4 +178,8 @@ def process():
     log(f'Done. Processed {total} images. Manifest written to {MANIFEST.name}')
 
 if __name__ == '__main__':
-    process()
+    p = argparse.ArgumentParser()
+    p.add_argument('--changed-since', metavar='TIMESTAMP', default=None,
+                   help='Only process herbs changed since this ISO timestamp (see changes.py)')
+    args = p.parse_args()
+    process(changed_since=args.changed_since)
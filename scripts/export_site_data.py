@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Export per-slug JSON shards and a lightweight listing for the Next.js build.
+
+Writes:
+- data/site/herbs/<encodeURIComponent(id)>.json — one record per herb, read by
+  getStaticProps in src/pages/herb/[slug].js. Only the fields the detail page
+  renders are kept (SHARD_FIELDS, sections as sanitized `sections_html`), since
+  the shard ends up in every page's __NEXT_DATA__,
+- data/site/listing.json — only what the index page needs: id, name, summary
+  snippet, thumbnail (with placeholder and sprite offsets) and tags,
+- data/site/facets.json — tag counts and the tag -> ids index (see tagging.py)
+  for the tag filter of the index page,
+- public/data/search-index.json — the inverted search index (see
+  search_index.py), fetched by the index page on the first search,
+- with --page-size N also public/data/listing/page-<n>.json chunks that the
+  client can fetch incrementally.
+
+Shards whose content is unchanged are not rewritten, and shards of removed
+herbs are deleted.
+
+Usage:
+  python scripts/export_site_data.py [--page-size 48] [--snippet 160]
+"""
+import argparse
+import json
+import os
+from urllib.parse import quote
+
+from herbio import iter_records
+from herbstore import DATA, ROOT
+from search_index import OUT as SEARCH_INDEX, IndexBuilder
+from sanitize_html import process_record as sanitize_sections
+from section_taxonomy import process_record as canonicalize_sections
+from tagging import TagIndex
+
+SITE = ROOT / 'data' / 'site'
+SHARDS = SITE / 'herbs'
+LISTING = SITE / 'listing.json'
+FACETS = SITE / 'facets.json'
+PAGES = ROOT / 'public' / 'data' / 'listing'
+SPRITE_MAP = ROOT / 'data' / 'thumb-sprites.json'
+
+# fields of the detail page; must match shardEntry() in lib/siteData.js
+SHARD_FIELDS = ('id', 'name', 'summary', 'other_names', 'latin', 'sections_html',
+                'wikipedia_url', 'source_url', 'license', 'similar')
+IMAGE_FIELDS = ('file_url', 'thumb_url', 'width', 'height', 'lqip', 'dominant_color')
+
+def shard_name(herb_id):
+    # must match encodeURIComponent() in lib/siteData.js
+    return quote(herb_id, safe="-_.!~*'()") + '.json'
+
+def snippet(text, limit):
+    text = ' '.join((text or '').split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(' ', 1)[0]
+    return cut.rstrip(',;:') + '…'
+
+def listing_entry(herb, snippet_len, sprites):
+    first = (herb.get('images') or [{}])[0] or {}
+    entry = {
+        'id': herb['id'],
+        'name': herb.get('name'),
+        'summary': snippet(herb.get('summary'), snippet_len),
+        'thumb': first.get('thumb_url') or first.get('file_url'),
+        'tags': herb.get('tags') or [],
+    }
+    for key in ('lqip', 'dominant_color'):
+        if first.get(key):
+            entry[key] = first[key]
+    if herb.get('content_quality') in ('template', 'near_duplicate'):
+        entry['content_quality'] = herb['content_quality']
+    pos = sprites.get('herbs', {}).get(herb['id']) if sprites else None
+    if pos:
+        entry['sprite'] = {'url': sprites['sheets'][pos['sheet']]['url'], 'x': pos['x'], 'y': pos['y'], **sprites['cell']}
+    return entry
+
+def shard_entry(herb):
+    entry = {k: herb[k] for k in SHARD_FIELDS if herb.get(k) is not None}
+    first = (herb.get('images') or [None])[0]
+    if first:
+        entry['images'] = [{k: first[k] for k in IMAGE_FIELDS if first.get(k) is not None}]
+    return entry
+
+def write_if_changed(path, obj, indent=None):
+    """Write JSON atomically unless the file already has this content."""
+    data = json.dumps(obj, ensure_ascii=False, indent=indent, separators=None if indent else (',', ':'))
+    if path.exists() and path.read_text(encoding='utf-8') == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(data, encoding='utf-8')
+    os.replace(tmp, path)
+    return True
+
+def main(page_size=None, snippet_len=160):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    sprites = None
+    if SPRITE_MAP.exists():
+        with SPRITE_MAP.open('r', encoding='utf-8') as f:
+            sprites = json.load(f)
+
+    SHARDS.mkdir(parents=True, exist_ok=True)
+    stale = {p.name for p in SHARDS.glob('*.json')}
+    listing = []
+    search = IndexBuilder()
+    tags = TagIndex()
+    written = 0
+    for herb in iter_records(DATA):
+        name = shard_name(herb['id'])
+        # the detail page looks sections up by canonical heading and renders sections_html as is;
+        # both are no-ops for records the pipeline has already processed
+        canonicalize_sections(herb)
+        sanitize_sections(herb)
+        stale.discard(name)
+        written += write_if_changed(SHARDS / name, shard_entry(herb))
+        listing.append(listing_entry(herb, snippet_len, sprites))
+        search.add(herb)
+        tags.add(herb)
+    for name in stale:
+        (SHARDS / name).unlink()
+    write_if_changed(LISTING, listing)
+    write_if_changed(SEARCH_INDEX, search.build())
+    write_if_changed(FACETS, tags.to_json())
+
+    pages = 0
+    if page_size:
+        old_pages = set(PAGES.glob('page-*.json'))
+        for pages, start in enumerate(range(0, len(listing), page_size), 1):
+            path = PAGES / f'page-{pages}.json'
+            old_pages.discard(path)
+            write_if_changed(path, {'page': pages, 'total': len(listing), 'items': listing[start:start + page_size]})
+        for path in old_pages:
+            path.unlink()
+
+    size = LISTING.stat().st_size
+    print(f'Done. {len(listing)} shards ({written} rewritten, {len(stale)} removed), '
+          f'listing {size} bytes, search index {SEARCH_INDEX.stat().st_size} bytes'
+          + (f', {pages} pages' if page_size else '') + '.')
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--page-size', type=int, default=None, help='Also write listing pages of this size')
+    p.add_argument('--snippet', type=int, default=160, help='Maximum summary length in the listing')
+    args = p.parse_args()
+    main(page_size=args.page_size, snippet_len=args.snippet)
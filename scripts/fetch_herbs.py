@@ -1,19 +1,43 @@
 #!/usr/bin/env python3
 """Simple Python scraper for WikiFood.cz 'Kategorie:Bylinky'.
 Writes JSON output to data/herbs.json
+
+Every fetched page and API response is kept in a compressed archive
+(data/raw, see page_archive.py). `reparse` rebuilds the records from that
+archive on all CPU cores without network access, so changes to
+parse_herb_html, normalize_heading or first_paragraph apply in seconds
+instead of a recrawl at crawl-delay speed.
+
+Usage:
+  python scripts/fetch_herbs.py
+  python scripts/fetch_herbs.py reparse [--workers 8] [--fields name,summary,sections,source_url,images]
 """
+import argparse
 import json
 import time
 import re
-import unicodedata
 from urllib.parse import urljoin, urlparse, unquote
 import requests
 from bs4 import BeautifulSoup
 from pathlib import Path
 from datetime import datetime
 import os
+from concurrent.futures import ProcessPoolExecutor
+from herbstore import HerbStore
+from page_archive import PageArchive
+from section_taxonomy import canonical_heading
 
 BASE = 'https://www.wikifood.cz'
+HEADERS = {'User-Agent': 'herbar-scraper/0.1'}
+ARCHIVE = PageArchive()
+# fields that `reparse` rebuilds by default; later scripts enrich images
+REPARSE_FIELDS = ('name', 'summary', 'sections', 'source_url')
+
+def http_get(url, params=None, timeout=None, kind='page'):
+    """requests.get that keeps the response in the archive."""
+    r = requests.get(url, params=params, headers=HEADERS, timeout=timeout)
+    ARCHIVE.put(url, params, r, kind)
+    return r
 
 def get_crawl_delay():
     try:
@@ -36,25 +60,8 @@ def resolve(href):
     return urljoin(BASE, href)
 
 def normalize_heading(text: str) -> str:
-    if not text:
-        return ''
-    t = text.lower()
-    t = unicodedata.normalize('NFKD', t)
-    t = ''.join(ch for ch in t if not unicodedata.combining(ch))
-    t = re.sub(r'\s+', ' ', t).strip()
-    mapping = {
-        'zdravotní přínosy': 'zdravotni_prinosy',
-        'zdravotni přínosy': 'zdravotni_prinosy',
-        'skladování': 'skladovani',
-        'skladovani': 'skladovani',
-        'kde a kdy sbírat': 'kde_kdy_sbirat',
-        'kde kdy sbírat': 'kde_kdy_sbirat',
-        'použití v kuchyni': 'pouziti_v_kuchyni',
-        'použiti v kuchyni': 'pouziti_v_kuchyni',
-        'použití': 'pouziti_v_kuchyni',
-        'masti': 'masti'
-    }
-    return mapping.get(t, re.sub(r'[^a-z0-9]+', '_', t).strip('_'))
+    # canonical section heading ("Zdravotní přínosy" -> "Léčivé účinky"), see section_taxonomy.py
+    return canonical_heading(text)
 
 def first_paragraph(soup: BeautifulSoup) -> str:
     container = soup.select_one('#mw-content-text .mw-parser-output')
@@ -68,10 +75,13 @@ def first_paragraph(soup: BeautifulSoup) -> str:
     p = container.find('p')
     return p.get_text(strip=True) if p else ''
 
-def parse_herb_page(url: str) -> dict:
-    r = requests.get(url, headers={'User-Agent': 'herbar-scraper/0.1'})
+def parse_herb_page(url: str, get=http_get) -> dict:
+    r = get(url)
     r.raise_for_status()
-    soup = BeautifulSoup(r.content, 'lxml')
+    return parse_herb_html(url, r.content)
+
+def parse_herb_html(url: str, content: bytes) -> dict:
+    soup = BeautifulSoup(content, 'lxml')
     title_tag = soup.select_one('#firstHeading')
     title = title_tag.get_text(strip=True) if title_tag else url.split('/')[-1]
     summary = first_paragraph(soup)
@@ -117,7 +127,9 @@ def parse_herb_page(url: str) -> dict:
                     if t:
                         texts.append(t)
                 node = node.next_sibling
-            sections[key] = '\n'.join(texts).strip()
+            text = '\n'.join(texts).strip()
+            # several source headings can map to one canonical section
+            sections[key] = f'{sections[key]}\n\n{text}'.strip() if sections.get(key) else text
 
     return {
         'source_url': url,
@@ -131,7 +143,7 @@ def fetch_file_original_url(file_page_url: str):
     if not file_page_url:
         return None
     try:
-        r = requests.get(file_page_url, headers={'User-Agent': 'herbar-scraper/0.1'})
+        r = http_get(file_page_url, kind='file')
         r.raise_for_status()
         soup = BeautifulSoup(r.content, 'lxml')
         a = soup.select_one('a[href*="/images/"]')
@@ -143,11 +155,101 @@ def fetch_file_original_url(file_page_url: str):
     except Exception:
         return None
 
+def fetch_image_info(file_title, get=http_get, log=print):
+    if not file_title:
+        return None
+    params = {
+        'action': 'query',
+        'titles': f'File:{file_title}',
+        'prop': 'imageinfo',
+        'iiprop': 'url|size|mime|extmetadata',
+        'format': 'json',
+        'formatversion': '2'
+    }
+    for ep in ['/w/api.php', '/api.php']:
+        api = urljoin(BASE, ep)
+        try:
+            r = get(api, params=params, timeout=15, kind='api')
+            if r.status_code == 404:
+                continue
+            r.raise_for_status()
+            j = r.json()
+            pages = j.get('query', {}).get('pages', [])
+            if pages:
+                p = pages[0]
+                if 'imageinfo' in p and p['imageinfo']:
+                    info = p['imageinfo'][0]
+                    mm = {}
+                    mm['file_url'] = info.get('url')
+                    mm['width'] = info.get('width')
+                    mm['height'] = info.get('height')
+                    mm['size_bytes'] = info.get('size')
+                    ext = info.get('extmetadata') or {}
+                    lic = None
+                    if isinstance(ext, dict):
+                        lic_field = ext.get('LicenseShortName') or ext.get('License') or ext.get('Credit')
+                        if isinstance(lic_field, dict):
+                            lic = lic_field.get('value')
+                        else:
+                            lic = lic_field
+                    mm['license'] = lic
+                    return mm
+        except Exception as e:
+            log(f'Error fetching image info for {file_title} via {api}: {e}')
+    return None
+
+def fetch_page_lead_image(page_slug, get=http_get, log=print):
+    # use pageimages API to get lead image URL (original)
+    try:
+        page_title = unquote(page_slug)
+        params = {
+            'action': 'query',
+            'titles': page_title,
+            'prop': 'pageimages',
+            'piprop': 'original',
+            'format': 'json',
+            'formatversion': '2'
+        }
+        for ep in ['/w/api.php', '/api.php']:
+            api = urljoin(BASE, ep)
+            try:
+                r = get(api, params=params, timeout=15, kind='api')
+                if r.status_code == 404:
+                    continue
+                r.raise_for_status()
+                j = r.json()
+                pages = j.get('query', {}).get('pages', [])
+                if pages and 'original' in pages[0]:
+                    return {'file_url': pages[0]['original'].get('source')}
+            except Exception as e:
+                log(f'Error fetching lead image for {page_slug} via {api}: {e}')
+    except Exception as e:
+        log(f'Error fetching lead image for {page_slug}: {e}')
+    return None
+
+def build_record(url, get=http_get, log=print):
+    """Parse a herb page and look up its image; `get` is http_get or an archive replay."""
+    slug = url.split('/')[-1]
+    rec = parse_herb_page(url, get)
+    # try to get image info via file_title if available
+    if rec.get('images') and rec['images'][0].get('file_title'):
+        info = fetch_image_info(rec['images'][0]['file_title'], get, log)
+        if info:
+            rec['images'][0].update(info)
+    else:
+        # fallback: try pageimages API (lead image)
+        lead = fetch_page_lead_image(slug, get, log)
+        if lead and lead.get('file_url'):
+            rec['images'][0]['file_url'] = lead.get('file_url')
+    rec['id'] = slug
+    rec['license'] = rec.get('license') or 'CC BY-NC-SA 4.0 (source site)'
+    return rec
+
 def fetch_all_herbs():
     cat_url = urljoin(BASE, '/Kategorie:Bylinky')
     delay = get_crawl_delay()
     print('Crawl delay:', delay, 's')
-    r = requests.get(cat_url, headers={'User-Agent': 'herbar-scraper/0.1'})
+    r = http_get(cat_url, kind='category')
     r.raise_for_status()
     soup = BeautifulSoup(r.content, 'lxml')
 
@@ -194,16 +296,12 @@ def fetch_all_herbs():
             pass
         print(line)
 
-    # load existing checkpoint into a map by id
-    existing = {}
+    # load existing checkpoint, indexed by id
+    store = HerbStore(outpath)
     if outpath.exists():
         try:
-            with open(outpath, 'r', encoding='utf8') as f:
-                arr = json.load(f)
-                for item in arr:
-                    if 'id' in item:
-                        existing[item['id']] = item
-            write_log(f'Loaded existing checkpoint with {len(existing)} records')
+            store = HerbStore.load(outpath)
+            write_log(f'Loaded existing checkpoint with {len(store)} records')
         except json.JSONDecodeError:
             ts = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
             corrupt = outdir / f'herbs.json.corrupt.{ts}'
@@ -212,55 +310,8 @@ def fetch_all_herbs():
                 write_log(f'Corrupt herbs.json moved to {corrupt.name}')
             except Exception as e:
                 write_log(f'Failed to backup corrupt herbs.json: {e}')
-            existing = {}
         except Exception as e:
             write_log(f'Error loading existing herbs.json: {e}')
-            existing = {}
-
-    herbs = list(existing.values())
-
-    def fetch_image_info(file_title):
-        if not file_title:
-            return None
-        params = {
-            'action': 'query',
-            'titles': f'File:{file_title}',
-            'prop': 'imageinfo',
-            'iiprop': 'url|size|mime|extmetadata',
-            'format': 'json',
-            'formatversion': '2'
-        }
-        for ep in ['/w/api.php', '/api.php']:
-            api = urljoin(BASE, ep)
-            try:
-                r = requests.get(api, params=params, headers={'User-Agent': 'herbar-scraper/0.1'}, timeout=15)
-                if r.status_code == 404:
-                    continue
-                r.raise_for_status()
-                j = r.json()
-                pages = j.get('query', {}).get('pages', [])
-                if pages:
-                    p = pages[0]
-                    if 'imageinfo' in p and p['imageinfo']:
-                        info = p['imageinfo'][0]
-                        mm = {}
-                        mm['file_url'] = info.get('url')
-                        mm['width'] = info.get('width')
-                        mm['height'] = info.get('height')
-                        mm['size_bytes'] = info.get('size')
-                        ext = info.get('extmetadata') or {}
-                        lic = None
-                        if isinstance(ext, dict):
-                            lic_field = ext.get('LicenseShortName') or ext.get('License') or ext.get('Credit')
-                            if isinstance(lic_field, dict):
-                                lic = lic_field.get('value')
-                            else:
-                                lic = lic_field
-                        mm['license'] = lic
-                        return mm
-            except Exception as e:
-                write_log(f'Error fetching image info for {file_title} via {api}: {e}')
-        return None
 
     def fetch_page_images(page_slug):
         # use MediaWiki API to list images used on a page
@@ -276,7 +327,7 @@ def fetch_all_herbs():
             for ep in ['/w/api.php', '/api.php']:
                 api = urljoin(BASE, ep)
                 try:
-                    r = requests.get(api, params=params, headers={'User-Agent': 'herbar-scraper/0.1'}, timeout=15)
+                    r = http_get(api, params=params, timeout=15, kind='api')
                     if r.status_code == 404:
                         continue
                     r.raise_for_status()
@@ -295,39 +346,10 @@ def fetch_all_herbs():
             write_log(f'Error fetching page images for {page_slug}: {e}')
         return []
 
-    def fetch_page_lead_image(page_slug):
-        # use pageimages API to get lead image URL (original)
-        try:
-            page_title = unquote(page_slug)
-            params = {
-                'action': 'query',
-                'titles': page_title,
-                'prop': 'pageimages',
-                'piprop': 'original',
-                'format': 'json',
-                'formatversion': '2'
-            }
-            for ep in ['/w/api.php', '/api.php']:
-                api = urljoin(BASE, ep)
-                try:
-                    r = requests.get(api, params=params, headers={'User-Agent': 'herbar-scraper/0.1'}, timeout=15)
-                    if r.status_code == 404:
-                        continue
-                    r.raise_for_status()
-                    j = r.json()
-                    pages = j.get('query', {}).get('pages', [])
-                    if pages and 'original' in pages[0]:
-                        return {'file_url': pages[0]['original'].get('source')}
-                except Exception as e:
-                    write_log(f'Error fetching lead image for {page_slug} via {api}: {e}')
-        except Exception as e:
-            write_log(f'Error fetching lead image for {page_slug}: {e}')
-        return None
-
     try:
         for i, url in enumerate(link_list, 1):
             slug = url.split('/')[-1]
-            existing_rec = existing.get(slug)
+            existing_rec = store.get(slug)
             needs_fetch = True
             if existing_rec:
                 imgs = existing_rec.get('images') or []
@@ -338,29 +360,13 @@ def fetch_all_herbs():
                 continue
             try:
                 write_log(f'Fetching ({i}/{len(link_list)}): {url}')
-                rec = parse_herb_page(url)
-                # try to get image info via file_title if available
-                if rec.get('images') and rec['images'][0].get('file_title'):
-                    info = fetch_image_info(rec['images'][0]['file_title'])
-                    if info:
-                        rec['images'][0].update(info)
-                else:
-                    # fallback: try pageimages API (lead image)
-                    lead = fetch_page_lead_image(slug)
-                    if lead and lead.get('file_url'):
-                        rec['images'][0]['file_url'] = lead.get('file_url')
-                rec['id'] = slug
-                rec['license'] = rec.get('license') or 'CC BY-NC-SA 4.0 (source site)'
-                existing[slug] = {**(existing.get(slug) or {}), **rec}
-                herbs = list(existing.values())
-                tmp = outpath.with_suffix('.json.tmp')
+                rec = build_record(url, log=write_log)
+                store.upsert(rec)
                 try:
-                    with open(tmp, 'w', encoding='utf8') as f:
-                        json.dump(herbs, f, ensure_ascii=False, indent=2)
-                    os.replace(tmp, outpath)
-                    write_log(f'Checkpoint saved ({len(herbs)} records)')
-                    if len(herbs) % 3 == 0:
-                        write_log(f'MILESTONE: {len(herbs)} records saved (every 3)')
+                    if store.save():
+                        write_log(f'Checkpoint saved ({len(store)} records)')
+                        if len(store) % 3 == 0:
+                            write_log(f'MILESTONE: {len(store)} records saved (every 3)')
                 except Exception as e:
                     write_log(f'Failed to write checkpoint: {e}')
             except Exception as e:
@@ -369,16 +375,50 @@ def fetch_all_herbs():
     except KeyboardInterrupt:
         write_log('Interrupted by user — checkpoint saved (if possible). Exiting.')
 
-    return herbs
+    return store
+
+def _quiet(msg):
+    pass
+
+def _reparse_one(url):
+    try:
+        return url, build_record(url, ARCHIVE.replay(), _quiet), None
+    except Exception as e:
+        return url, None, e
+
+def reparse(workers=None, fields=REPARSE_FIELDS):
+    """Rebuild records from the archived herb pages in parallel; return (updated, failed)."""
+    urls = [e['url'] for e in ARCHIVE.entries('page') if e['status'] == 200]
+    outpath = Path(__file__).resolve().parent.parent / 'data' / 'herbs.json'
+    store = HerbStore.load(outpath) if outpath.exists() else HerbStore(outpath)
+    updated = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for url, rec, err in ex.map(_reparse_one, urls, chunksize=8):
+            if rec is None:
+                failed += 1
+                print(f'Failed {url}: {err}')
+                continue
+            before = store.get(rec['id'])
+            after = store.upsert({'id': rec['id'], **{f: rec[f] for f in fields if f in rec}})
+            updated += after is not before
+    store.save(snapshot='reparse')
+    return len(urls), updated, failed
 
 def main():
-    outdir = Path(__file__).resolve().parent.parent / 'data'
-    outdir.mkdir(parents=True, exist_ok=True)
-    herbs = fetch_all_herbs()
-    outpath = outdir / 'herbs.json'
-    with open(outpath, 'w', encoding='utf8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    print('Wrote', len(herbs), 'records to', outpath)
+    p = argparse.ArgumentParser()
+    p.add_argument('command', nargs='?', choices=['crawl', 'reparse'], default='crawl')
+    p.add_argument('--workers', type=int, default=None, help='Processes for reparse (default: all CPU cores)')
+    p.add_argument('--fields', default=','.join(REPARSE_FIELDS), help='Record fields that reparse rebuilds')
+    args = p.parse_args()
+    if args.command == 'reparse':
+        t0 = time.perf_counter()
+        pages, updated, failed = reparse(args.workers, [f for f in args.fields.split(',') if f])
+        print(f'Done. {pages} archived pages re-parsed in {time.perf_counter() - t0:.1f} s: '
+              f'{updated} records updated, {failed} failed.')
+        return
+    store = fetch_all_herbs()
+    store.save()
+    print('Wrote', len(store), 'records to', store.path)
 
 if __name__ == '__main__':
     main()
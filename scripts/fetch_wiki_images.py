@@ -8,26 +8,20 @@ Behavior:
   `file_url` to the local path `/images/<filename>` and `thumb_url` to same.
 - If no suitable image is found, leave values as null.
 
-Creates a backup at data/herbs.json.fetch_images.bak
+Snapshots the previous data as 'fetch_images' (see snapshots.py)
 """
 from pathlib import Path
-import json, shutil, urllib.request, urllib.parse, re
+import json, urllib.request, urllib.parse, re
+from herbstore import HerbStore, DATA, ROOT
+from textnorm import slugify
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.fetch_images.bak'
+SNAPSHOT = 'fetch_images'
 OUT_DIR = ROOT / 'public' / 'images'
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 WIKI_LANGS = ['cs', 'en']
 TIMEOUT = 8
 
-def slugify(name):
-    s = name.lower()
-    s = re.sub(r"[^a-z0-9\-]+", "-", s)
-    s = re.sub(r"-+", "-", s).strip('-')
-    return s or 'img'
-
 def query_pageimage(lang, title):
     api = f'https://{lang}.wikipedia.org/w/api.php'
     params = {
@@ -69,7 +63,7 @@ def get_imageinfo(lang, file_title):
         'action': 'query',
         'titles': file_title,
         'prop': 'imageinfo',
-        'iiprop': 'url',
+        'iiprop': 'url|size',
         'format': 'json'
     }
     url = api + '?' + urllib.parse.urlencode(params, safe=':')
@@ -92,6 +86,22 @@ def extract_image_url_from_query(q):
             return page['thumbnail'].get('source')
     return None
 
+def extract_imageinfo(q):
+    """Return (url, width, height, size) of the first imageinfo in q, or None."""
+    if not q or 'query' not in q:
+        return None
+    for pid, page in q['query'].get('pages', {}).items():
+        for info in page.get('imageinfo') or []:
+            if info.get('url'):
+                return info['url'], info.get('width') or 0, info.get('height') or 0, info.get('size') or 0
+    return None
+
+def best_candidate(candidates):
+    """Pick the highest-resolution candidate, preferring the smaller file on ties."""
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c[1] * c[2], -c[3]))[0]
+
 def download_image(url, outpath):
     try:
         headers = {'User-Agent': 'herbar-bot/1.0 (contact)'}
@@ -123,14 +133,13 @@ def main():
     if not DATA.exists():
         print('data/herbs.json not found')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        herbs = json.load(f)
+    store = HerbStore.load()
 
     downloaded = 0
     updated_entries = 0
-    print('Starting fetch_wiki_images; herbs to check:', len(herbs))
-    for herb in herbs:
+    to_check = store.missing('image')
+    print('Starting fetch_wiki_images; herbs to check:', len(to_check))
+    for herb in to_check:
         print('Checking:', herb.get('name'))
         imgs = herb.get('images') or []
         if not imgs:
@@ -150,8 +159,9 @@ def main():
                 found = u
                 img['page_url'] = f'https://{lang}.wikipedia.org/wiki/{title_candidate}'
                 break
-            # fallback: list images on the page and query imageinfo for a suitable file
+            # fallback: list images on the page and keep the best-resolution file
             li = query_images_list(lang, name.replace(' ', '_'))
+            candidates = []
             if li and 'query' in li and 'pages' in li['query']:
                 pages = li['query']['pages']
                 for pid, page in pages.items():
@@ -160,24 +170,22 @@ def main():
                         if not title: 
                             continue
                         if re.search(r"\.(jpg|jpeg|png|svg)$", title, flags=re.I):
-                            info = get_imageinfo(lang, title)
-                            if info and 'query' in info and 'pages' in info['query']:
-                                iu = extract_image_url_from_query(info)
-                                if iu:
-                                    found = iu
-                                    img['page_url'] = f'https://{lang}.wikipedia.org/wiki/{title_candidate}'
-                                    break
-                    if found:
-                        break
+                            info = extract_imageinfo(get_imageinfo(lang, title))
+                            if info:
+                                candidates.append(info)
+            found = best_candidate(candidates)
             if found:
+                img['page_url'] = f'https://{lang}.wikipedia.org/wiki/{title_candidate}'
                 break
 
         if not found:
             # leave null
             continue
+        # page_url was set in place; persist it even if the download fails
+        store.touch(herb['id'])
 
         ext = ext_from_url(found)
-        filename = f"{slugify(name)}.{ext}"
+        filename = f"{slugify(name, 'img')}.{ext}"
         outpath = OUT_DIR / filename
         outpath = ensure_unique(outpath)
         ok = download_image(found, outpath)
@@ -188,15 +196,14 @@ def main():
         local_url = f"/images/{outpath.name}"
         img['file_url'] = local_url
         img['thumb_url'] = local_url
+        store.touch(herb['id'])
         downloaded += 1
         updated_entries += 1
 
     # write back
-    with DATA.with_suffix('.tmp').open('w', encoding='utf-8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    DATA.with_suffix('.tmp').replace(DATA)
+    store.save(snapshot=SNAPSHOT)
 
-    print(f'Downloaded images: {downloaded}, updated entries: {updated_entries}. Backup at {BACKUP}')
+    print(f'Downloaded images: {downloaded}, updated entries: {updated_entries}. Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     main()
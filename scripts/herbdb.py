@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Optional SQLite backend for the herb dataset.
+
+Records are stored as JSON in the `data` column, with indexed columns extracted
+for cheap partial reads: id, name, wikipedia_url, has_image and updated_at.
+The database runs in WAL mode so readers are not blocked by a writer, and each
+upsert touches only its own row inside a transaction.
+
+HerbStore uses this backend automatically when its path ends in .sqlite/.db,
+e.g. `HERBAR_DATA=data/herbs.sqlite python scripts/pipeline.py`.
+
+Usage:
+  python scripts/herbdb.py import [--db data/herbs.sqlite] [--json data/herbs.json]
+  python scripts/herbdb.py export [--db data/herbs.sqlite] [--json data/herbs.json]
+  python scripts/herbdb.py stats  [--db data/herbs.sqlite]
+
+`export` regenerates herbs.json for the Next.js build.
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from changes import stamp
+
+ROOT = Path(__file__).resolve().parents[1]
+DB = ROOT / 'data' / 'herbs.sqlite'
+JSON = ROOT / 'data' / 'herbs.json'
+
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS herbs (
+    id            TEXT PRIMARY KEY,
+    pos           INTEGER NOT NULL,
+    name          TEXT,
+    wikipedia_url TEXT,
+    has_image     INTEGER NOT NULL DEFAULT 0,
+    updated_at    TEXT NOT NULL,
+    data          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS herbs_pos ON herbs(pos);
+CREATE INDEX IF NOT EXISTS herbs_name ON herbs(name);
+CREATE INDEX IF NOT EXISTS herbs_wikipedia_url ON herbs(wikipedia_url);
+CREATE INDEX IF NOT EXISTS herbs_has_image ON herbs(has_image);
+CREATE INDEX IF NOT EXISTS herbs_updated_at ON herbs(updated_at);
+"""
+
+def is_sqlite_path(path):
+    return Path(path).suffix.lower() in SQLITE_SUFFIXES
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def _has_image(herb):
+    imgs = herb.get('images') or []
+    return int(bool(imgs and isinstance(imgs[0], dict) and imgs[0].get('file_url')))
+
+def _dumps(herb):
+    return json.dumps(herb, ensure_ascii=False, separators=(',', ':'))
+
+class HerbDB:
+    def __init__(self, path=DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM herbs').fetchone()[0]
+
+    def get(self, herb_id):
+        row = self.conn.execute('SELECT data FROM herbs WHERE id = ?', (herb_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_records(self, where='', params=()):
+        """Yield records in dataset order, optionally filtered by a SQL condition."""
+        sql = 'SELECT data FROM herbs' + (f' WHERE {where}' if where else '') + ' ORDER BY pos'
+        for (data,) in self.conn.execute(sql, params):
+            yield json.loads(data)
+
+    def missing_wikipedia(self):
+        return self.iter_records("wikipedia_url IS NULL OR wikipedia_url = ''")
+
+    def missing_image(self):
+        return self.iter_records('has_image = 0')
+
+    def upsert_many(self, herbs, removed=()):
+        """Write changed records and delete `removed` ids in one transaction.
+
+        Rows whose JSON is unchanged keep their updated_at. Returns rows written.
+        """
+        written = 0
+        now = _now()
+        with self.conn:
+            next_pos = self.conn.execute('SELECT COALESCE(MAX(pos) + 1, 0) FROM herbs').fetchone()[0]
+            for herb in herbs:
+                stamp(herb)
+                data = _dumps(herb)
+                row = self.conn.execute('SELECT data FROM herbs WHERE id = ?', (herb['id'],)).fetchone()
+                if row and row[0] == data:
+                    continue
+                values = (herb.get('name'), herb.get('wikipedia_url'), _has_image(herb), now, data, herb['id'])
+                if row:
+                    self.conn.execute('UPDATE herbs SET name = ?, wikipedia_url = ?, has_image = ?, '
+                                      'updated_at = ?, data = ? WHERE id = ?', values)
+                else:
+                    self.conn.execute('INSERT INTO herbs (name, wikipedia_url, has_image, updated_at, data, id, pos) '
+                                      'VALUES (?, ?, ?, ?, ?, ?, ?)', values + (next_pos,))
+                    next_pos += 1
+                written += 1
+            for herb_id in removed:
+                self.conn.execute('DELETE FROM herbs WHERE id = ?', (herb_id,))
+        return written
+
+    def upsert(self, herb):
+        return self.upsert_many([herb]) == 1
+
+    def backup_to(self, path):
+        """Write a consistent copy of the database to `path` (safe under WAL)."""
+        tmp = Path(str(path) + '.tmp')
+        tmp.unlink(missing_ok=True)
+        dst = sqlite3.connect(tmp)
+        with dst:
+            self.conn.backup(dst)
+        dst.close()
+        os.replace(tmp, path)
+
+    def import_json(self, path=JSON):
+        """Stream the records of a JSON dataset into the database; return rows written."""
+        # herbio imports this module, so import it here
+        from herbio import iter_records
+        return self.upsert_many(h for h in iter_records(path) if 'id' in h)
+
+    def export_json(self, path=JSON):
+        """Regenerate the JSON array (same layout as the scripts write) atomically."""
+        from herbio import RecordWriter
+        with RecordWriter(path) as out:
+            for herb in self.iter_records():
+                out.write(herb)
+        return out.count
+
+    def stats(self):
+        q = self.conn.execute("SELECT COUNT(*), SUM(has_image), "
+                              "SUM(wikipedia_url IS NOT NULL AND wikipedia_url != ''), MAX(updated_at) FROM herbs")
+        total, images, wiki, last = q.fetchone()
+        return {'records': total, 'with_image': images or 0, 'with_wikipedia': wiki or 0, 'last_update': last}
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('command', choices=['import', 'export', 'stats'])
+    p.add_argument('--db', default=str(DB))
+    p.add_argument('--json', default=str(JSON))
+    args = p.parse_args()
+    with HerbDB(args.db) as db:
+        if args.command == 'import':
+            n = db.import_json(args.json)
+            print(f'Imported {n} changed records into {args.db} ({len(db)} total)')
+        elif args.command == 'export':
+            n = db.export_json(args.json)
+            print(f'Exported {n} records to {args.json}')
+        else:
+            print(json.dumps(db.stats(), ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
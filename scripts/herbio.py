@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Streaming, constant-memory reading and writing of the herb dataset.
+
+Supports the JSON array layout of data/herbs.json and a JSONL variant (one
+record per line, any path ending in .jsonl).
+
+    from herbio import iter_records, RecordWriter, stream_update
+
+    for herb in iter_records(DATA):          # parsed incrementally
+        ...
+
+    with RecordWriter(DATA) as out:          # temp file, replaced on success
+        out.write(herb)
+
+    stream_update(process_record, DATA)      # read -> fn(record) -> write
+
+    with file_lock(DATA):                    # advisory lock on DATA.lock
+        ...
+
+The array writer produces byte-for-byte the same layout as
+`json.dump(records, f, ensure_ascii=False, indent=2)`.
+
+Usage:
+  python scripts/herbio.py convert data/herbs.json data/herbs.jsonl
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import changes as changefeed
+import snapshots
+from changes import field_digests, stamp
+from herbdb import HerbDB, is_sqlite_path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = 1 << 16
+LOCK_TIMEOUT = float(os.environ.get('HERBAR_LOCK_TIMEOUT') or 600)
+
+def is_jsonl_path(path):
+    return Path(path).suffix.lower() == '.jsonl'
+
+def _try_lock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT, poll=0.1):
+    """Hold an exclusive advisory lock on `<path>.lock` for the duration of the block.
+
+    The lock lives in a separate file because the dataset itself is replaced,
+    not rewritten, on save. Not re-entrant: do not nest locks on the same path.
+    Raises TimeoutError if another process holds it for longer than `timeout`.
+    """
+    lock_path = Path(str(path) + '.lock')
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    with lock_path.open('a+b') as f:
+        while True:
+            try:
+                _try_lock(f)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f'{lock_path} is held by another process')
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+def _iter_json_array(f, chunk_size):
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        # skip whitespace and separators
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            fill()
+        if pos >= len(buf):
+            raise ValueError('Unexpected end of JSON array')
+        ch = buf[pos]
+        if not started:
+            if ch != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            pos += 1
+            continue
+        if ch == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # a scalar ending exactly at the buffer edge may be cut short
+        if end == len(buf) and not eof and not isinstance(obj, (dict, list)):
+            fill()
+            continue
+        pos = end
+        yield obj
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """Yield records from a JSON array, JSONL or SQLite dataset one at a time."""
+    path = Path(path)
+    if is_sqlite_path(path):
+        with HerbDB(path) as db:
+            yield from db.iter_records()
+        return
+    with path.open('r', encoding='utf-8') as f:
+        if is_jsonl_path(path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f, chunk_size)
+
+class RecordWriter:
+    """Write records incrementally to a temp file and atomically replace `path`.
+
+    If the block raises, or `discard()` is called, the target is left untouched.
+    With `snapshot` (a label), the previous file is snapshotted (see
+    snapshots.py) before it is replaced. Records are stamped with their
+    `content_hash` (see changes.py) as they are written.
+    """
+
+    def __init__(self, path, snapshot=None):
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.tmp = self.path.with_name(self.path.name + '.tmp')
+        self.jsonl = is_jsonl_path(self.path)
+        self.count = 0
+        self._f = None
+        self._keep = True
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.tmp.open('w', encoding='utf-8')
+        if not self.jsonl:
+            self._f.write('[')
+        return self
+
+    def write(self, record):
+        stamp(record)
+        if self.jsonl:
+            self._f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            body = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            self._f.write((',\n  ' if self.count else '\n  ') + body)
+        self.count += 1
+
+    def discard(self):
+        self._keep = False
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.jsonl:
+            self._f.write('\n]' if self.count else ']')
+        self._f.close()
+        if exc_type is not None or not self._keep:
+            self.tmp.unlink(missing_ok=True)
+            return False
+        if self.snapshot and self.path.exists():
+            snapshots.take(self.path, self.snapshot)
+        os.replace(self.tmp, self.path)
+        return False
+
+def stream_update(fn, path, snapshot=None):
+    """Apply `fn(record) -> number of changes` to every record in one pass.
+
+    A record counts as changed only if its content hash changed, whatever
+    `fn` returned. The file is replaced only if some record changed, each
+    changed record is appended to the change feed, and the dataset lock is
+    held for the whole pass so concurrent HerbStore writers wait for it.
+    Returns (records, changed_records, changes).
+    """
+    with file_lock(path):
+        return _stream_update(fn, Path(path), snapshot)
+
+def _apply(fn, herb, feed):
+    before = field_digests(herb)
+    n = fn(herb)
+    if not n:
+        return 0
+    after = field_digests(herb)
+    if after == before:
+        return 0
+    feed.append(changefeed.change(herb.get('id'), before, after))
+    return n
+
+def _stream_update(fn, path, snapshot):
+    records = changes = 0
+    feed = []
+    if is_sqlite_path(path):
+        with HerbDB(path) as db:
+            batch = []
+            for herb in db.iter_records():
+                records += 1
+                n = _apply(fn, herb, feed)
+                if n:
+                    changes += n
+                    batch.append(herb)
+            if batch and snapshot:
+                snapshots.take(path, snapshot)
+            db.upsert_many(batch)
+    else:
+        with RecordWriter(path, snapshot=snapshot) as out:
+            for herb in iter_records(path):
+                records += 1
+                changes += _apply(fn, herb, feed)
+                out.write(herb)
+            if not feed:
+                out.discard()
+    changefeed.append(path, feed)
+    return records, len(feed), changes
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('command', choices=['convert'])
+    p.add_argument('src')
+    p.add_argument('dst')
+    args = p.parse_args()
+    with RecordWriter(args.dst) as out:
+        for herb in iter_records(args.src):
+            out.write(herb)
+    print(f'Wrote {out.count} records to {args.dst}')
+
+if __name__ == '__main__':
+    main()
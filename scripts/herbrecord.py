@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Compact, read-only in-memory representation of herb records.
+
+A parsed herb is a tree of dicts that each carry their own copies of the same
+keys ("Popis", "Použití", "page_url", ...) and often of the same text (the
+template section bodies, the image disclaimer, None-filled image dicts).
+`Record` stores a dict as a shared `Shape` (the key tuple plus a key->index
+map, one per distinct key layout) and a tuple of values; lists become tuples
+and strings are de-duplicated through a `Pool`.
+
+    from herbrecord import Pool, iter_compact
+
+    pool = Pool()
+    herbs = list(iter_compact(DATA, pool))
+    pool.release()                    # drop the lookup tables, keep the records
+    herbs[0]['sections']['Popis']     # read like a dict
+    herbs[0].to_dict()                # back to the exact JSON shape
+
+The conversion is lossless: `json.dumps(compact(h).to_dict())` equals
+`json.dumps(h)`, key order included. Records are immutable; convert with
+`to_dict()` to edit and back with `compact()`.
+
+Usage:
+  python scripts/herbrecord.py --check            # round-trip the dataset
+  python scripts/herbrecord.py --bench 1000000    # resident memory, dict vs compact
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Mapping
+
+from herbio import iter_records
+from herbstore import DATA
+
+class Shape:
+    __slots__ = ('keys', 'index')
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.index = {k: i for i, k in enumerate(keys)}
+
+class Pool:
+    """Interning tables shared by the records of one dataset."""
+
+    def __init__(self):
+        self.shapes = {}
+        self.texts = {}
+
+    def shape(self, keys):
+        keys = tuple(self.text(k) for k in keys)
+        s = self.shapes.get(keys)
+        if s is None:
+            s = self.shapes[keys] = Shape(keys)
+        return s
+
+    def text(self, s):
+        return self.texts.setdefault(s, s)
+
+    def release(self):
+        """Forget the lookup tables once loading is done (records keep their data)."""
+        self.shapes = {}
+        self.texts = {}
+
+class Record(Mapping):
+    """Immutable mapping over a shared `Shape` and a tuple of values."""
+
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._shape.index[key]]
+
+    def __contains__(self, key):
+        return key in self._shape.index
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key, default=None):
+        i = self._shape.index.get(key)
+        return default if i is None else self._values[i]
+
+    def to_dict(self):
+        return {k: expand(v) for k, v in zip(self._shape.keys, self._values)}
+
+    def __repr__(self):
+        return f'Record({self.to_dict()!r})'
+
+def compact(obj, pool):
+    """Convert a parsed JSON value to its compact form."""
+    if isinstance(obj, dict):
+        return Record(pool.shape(obj.keys()), tuple(compact(v, pool) for v in obj.values()))
+    if isinstance(obj, list):
+        return tuple(compact(v, pool) for v in obj)
+    if isinstance(obj, str):
+        return pool.text(obj)
+    return obj
+
+def expand(obj):
+    """Inverse of `compact`: return plain dicts and lists."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, tuple):
+        return [expand(v) for v in obj]
+    return obj
+
+def iter_compact(path=DATA, pool=None):
+    pool = pool if pool is not None else Pool()
+    for herb in iter_records(path):
+        yield compact(herb, pool)
+
+def check(path=DATA):
+    pool = Pool()
+    n = 0
+    for herb in iter_records(path):
+        a = json.dumps(herb, ensure_ascii=False)
+        b = json.dumps(compact(herb, pool).to_dict(), ensure_ascii=False)
+        if a != b:
+            raise SystemExit(f"Round trip differs for {herb.get('id')!r}")
+        n += 1
+    print(f'OK. {n} records round-trip losslessly ({len(pool.shapes)} shapes, {len(pool.texts)} distinct strings).')
+
+def rss_bytes():
+    """Current resident set size, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def synthetic(n, path=DATA):
+    """Yield `n` freshly parsed records modelled on the dataset, with unique ids and names."""
+    templates = [json.dumps(h, ensure_ascii=False) for h in iter_records(path)]
+    if not templates:
+        raise SystemExit('No records to model the benchmark on')
+    for i in range(n):
+        src = templates[i % len(templates)]
+        herb = json.loads(src)
+        name = f"{herb.get('name') or 'Bylinka'} {i}"
+        if herb.get('name'):
+            src = src.replace(json.dumps(herb['name'], ensure_ascii=False)[1:-1], name)
+            herb = json.loads(src)
+        herb['id'] = f'{herb.get("id")}-{i}'
+        herb['name'] = name
+        yield herb
+
+def bench_one(mode, n, path=DATA):
+    base = rss_bytes()
+    t0 = time.perf_counter()
+    if mode == 'dict':
+        herbs = list(synthetic(n, path))
+    else:
+        pool = Pool()
+        herbs = [compact(h, pool) for h in synthetic(n, path)]
+        pool.release()
+    elapsed = time.perf_counter() - t0
+    rss = rss_bytes()
+    print(json.dumps({'mode': mode, 'records': len(herbs), 'seconds': round(elapsed, 2),
+                      'rss_bytes': rss - base if rss and base else None}))
+
+def bench(n, path=DATA):
+    # each mode in its own process so the measurements do not share a heap
+    results = {}
+    for mode in ('dict', 'compact'):
+        out = subprocess.run([sys.executable, __file__, '--bench', str(n), '--mode', mode],
+                             capture_output=True, text=True, check=True,
+                             env={**os.environ, 'HERBAR_DATA': str(path)})
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"{'mode':<10}{'records':>10}{'RSS MiB':>10}{'B/record':>10}{'s':>8}")
+    for mode, r in results.items():
+        rss = r['rss_bytes']
+        print(f"{mode:<10}{r['records']:>10}"
+              + (f'{rss / 2**20:>10.1f}{rss / r["records"]:>10.0f}' if rss else f"{'n/a':>10}{'n/a':>10}")
+              + f"{r['seconds']:>8.1f}")
+    d, c = results['dict']['rss_bytes'], results['compact']['rss_bytes']
+    if d and c:
+        print(f'Compact records use {c / d:.0%} of the dict representation.')
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--check', action='store_true', help='Verify the lossless round trip on the dataset')
+    p.add_argument('--bench', type=int, metavar='N', help='Measure resident memory for N synthetic records')
+    p.add_argument('--mode', choices=['dict', 'compact'], help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.bench and args.mode:
+        bench_one(args.mode, args.bench)
+    elif args.bench:
+        bench(args.bench)
+    else:
+        check()
@@ -0,0 +1,350 @@
+"""Shared, indexed access to data/herbs.json for the processing scripts.
+
+Usage:
+    from herbstore import HerbStore
+
+    store = HerbStore.load()
+    for herb in store.missing('wikipedia_url'):
+        store.update(herb['id'], wikipedia_url=url)
+    store.save(snapshot='wiki_api')
+
+The dataset is read once and kept in insertion order. Lookups by id, by
+diacritic-folded name and by missing field are dictionary lookups; indexes are
+maintained on every `upsert`/`update`. Only changed records mark the store
+dirty, and `save` writes atomically (temp file + replace) and only when dirty.
+
+Concurrent writers are safe: `load` and `save` take an advisory lock on
+`<path>.lock`, and if another process changed the dataset in between, `save`
+merges instead of overwriting. For each dirty record, the top-level fields
+this store changed since it loaded are applied on top of the current stored
+record; all other fields and records keep the other writer's version. A field
+changed on both sides to different values is a conflict, resolved by
+`on_conflict`: 'ours' (default, reported in `store.conflicts`), 'theirs' or
+'raise'.
+
+Set HERBAR_DATA to use another dataset; a path ending in .sqlite/.db uses the
+SQLite backend (see herbdb.py), where `save` updates only the dirty rows, and
+a path ending in .jsonl stores one record per line. Records are parsed and
+written incrementally (see herbio.py).
+
+Scripts that only need one pass over the records should use
+`herbio.iter_records`/`stream_update` instead, which keep memory constant.
+"""
+import json
+import os
+from pathlib import Path
+
+import changes as changefeed
+import snapshots
+from changes import HASH_FIELD, field_digests
+from herbdb import HerbDB, is_sqlite_path
+from herbio import RecordWriter, file_lock, iter_records
+from textnorm import fold_key as fold
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = Path(os.environ.get('HERBAR_DATA') or ROOT / 'data' / 'herbs.json')
+
+# fields tracked by the missing-field index
+MISSING_FIELDS = ('summary', 'sections', 'wikipedia_url', 'image')
+
+_ABSENT = object()
+
+class MergeConflict(Exception):
+    pass
+
+def is_missing(herb, field):
+    if field == 'image':
+        imgs = herb.get('images') or []
+        return not (imgs and isinstance(imgs[0], dict) and imgs[0].get('file_url'))
+    v = herb.get(field)
+    if isinstance(v, str):
+        return not v.strip()
+    return not v
+
+def _names(herb):
+    names = [herb.get('name')]
+    other = herb.get('other_names')
+    if isinstance(other, list):
+        names.extend(other)
+    return {fold(n) for n in names if isinstance(n, str) and n.strip()}
+
+def _fingerprint(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def _snapshot(herb):
+    return json.dumps(herb, ensure_ascii=False)
+
+class HerbStore:
+    def __init__(self, path=DATA):
+        self.path = Path(path)
+        self._records = {}
+        self._by_name = {}
+        self._names_of = {}
+        self._pos = {}
+        self._seq = 0
+        self._missing = {f: set() for f in MISSING_FIELDS}
+        self._dirty = set()
+        self._removed = set()
+        # state as last loaded/saved, for the three-way merge in save()
+        self._base = {}
+        self._fingerprint = None
+        self.conflicts = []
+
+    @classmethod
+    def load(cls, path=DATA):
+        """Load `path` into a new store; a missing file gives an empty store."""
+        store = cls(path)
+        if not store.path.exists():
+            return store
+        with file_lock(store.path):
+            store._fingerprint = _fingerprint(store.path)
+            for herb in iter_records(store.path):
+                if 'id' not in herb:
+                    print('Skipping record without id:', herb.get('name'))
+                    continue
+                store._insert(herb)
+                store._base[herb['id']] = _snapshot(herb)
+        return store
+
+    # -- queries -----------------------------------------------------------
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(list(self._records.values()))
+
+    def __contains__(self, herb_id):
+        return herb_id in self._records
+
+    def get(self, herb_id, default=None):
+        return self._records.get(herb_id, default)
+
+    def ids(self):
+        return list(self._records)
+
+    def find_by_name(self, name):
+        """Return records whose name or other_names fold to the same text."""
+        return [self._records[i] for i in self._by_name.get(fold(name), ())]
+
+    def missing(self, field):
+        """Return records where `field` is empty, in dataset order."""
+        ids = sorted(self._missing[field], key=self._pos.__getitem__)
+        return [self._records[i] for i in ids]
+
+    def count_missing(self, field):
+        return len(self._missing[field])
+
+    # -- mutation ----------------------------------------------------------
+
+    def upsert(self, herb, merge=True):
+        """Insert or replace a record by `id`; with merge, keep fields not in `herb`.
+
+        Returns the stored record.
+        """
+        herb_id = herb['id']
+        old = self._records.get(herb_id)
+        new = {**old, **herb} if (merge and old is not None) else dict(herb)
+        if old is not None and new == old:
+            return old
+        if old is not None:
+            self._unindex(herb_id, old)
+        self._insert(new)
+        self._dirty.add(herb_id)
+        self._removed.discard(herb_id)
+        return new
+
+    def update(self, herb_id, **fields):
+        """Set top-level fields of an existing record."""
+        return self.upsert({'id': herb_id, **fields})
+
+    def touch(self, herb_id):
+        """Re-index and mark dirty a record that was modified in place."""
+        herb = self._records[herb_id]
+        self._unindex(herb_id, herb)
+        self._index(herb_id, herb)
+        self._dirty.add(herb_id)
+
+    def remove(self, herb_id):
+        herb = self._records.pop(herb_id, None)
+        if herb is not None:
+            self._unindex(herb_id, herb)
+            del self._pos[herb_id]
+            self._dirty.discard(herb_id)
+            self._removed.add(herb_id)
+        return herb
+
+    @property
+    def dirty(self):
+        """Ids of records changed since load or the last save."""
+        return set(self._dirty)
+
+    def is_dirty(self):
+        return bool(self._dirty or self._removed)
+
+    def save(self, snapshot=None, force=False, on_conflict='ours'):
+        """Atomically write the dataset if anything changed; return True if written.
+
+        With `snapshot` (a label) the previous dataset is snapshotted first
+        (see snapshots.py). Changes made by other processes since `load` are
+        merged, see the module docs. Dirty records whose content hash is
+        unchanged do not count: if nothing really changed, the file is not
+        touched. Changed records are appended to the change feed (changes.py).
+        """
+        if not (force or self.is_dirty()):
+            return False
+        pending = self._pending_changes()
+        if not (force or pending):
+            self._dirty.clear()
+            self._removed.clear()
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conflicts = []
+        with file_lock(self.path):
+            if is_sqlite_path(self.path):
+                ids = list(self._records) if force else [i for i in self._dirty if i in pending]
+                with HerbDB(self.path) as db:
+                    merged = [self._merged(i, db.get(i), on_conflict) for i in ids]
+                    if snapshot:
+                        snapshots.take(self.path, snapshot)
+                    db.upsert_many(merged, removed=self._removed)
+                for herb in merged:
+                    self._replace(herb)
+                    self._base[herb['id']] = _snapshot(herb)
+            elif self._fingerprint != _fingerprint(self.path):
+                self._merge_from_disk(on_conflict)
+                self._write(snapshot)
+                self._base = {i: _snapshot(h) for i, h in self._records.items()}
+            else:
+                self._write(snapshot)
+                for i in self._dirty:
+                    self._base[i] = _snapshot(self._records[i])
+            for i in self._removed:
+                self._base.pop(i, None)
+            self._fingerprint = _fingerprint(self.path)
+            feed = []
+            for i, (before, after) in pending.items():
+                entry = changefeed.change(i, before, after)
+                if after is not None and i in self._records:
+                    # the hash as written, after any merge
+                    entry['new'] = self._records[i].get(HASH_FIELD, entry['new'])
+                feed.append(entry)
+            changefeed.append(self.path, feed)
+        self._dirty.clear()
+        self._removed.clear()
+        if self.conflicts:
+            print(f'Merged with concurrent changes; {len(self.conflicts)} conflicting field(s) resolved as '
+                  f"'{on_conflict}':", ', '.join(f'{i}.{k}' for i, k in self.conflicts[:10]))
+        return True
+
+    # -- merge -------------------------------------------------------------
+
+    def _pending_changes(self):
+        """{id: (field digests before, after)} for dirty records whose content changed."""
+        pending = {}
+        for i in self._dirty:
+            before = field_digests(json.loads(self._base[i])) if i in self._base else None
+            after = field_digests(self._records[i])
+            if before != after:
+                pending[i] = (before, after)
+        for i in self._removed:
+            if i in self._base:
+                pending[i] = (field_digests(json.loads(self._base[i])), None)
+        return pending
+
+    def _write(self, snapshot):
+        with RecordWriter(self.path, snapshot=snapshot) as out:
+            for herb in self._records.values():
+                out.write(herb)
+
+    def _merged(self, herb_id, theirs, on_conflict):
+        """Apply the fields changed here since load to `theirs` (the stored record)."""
+        mine = self._records[herb_id]
+        base = json.loads(self._base[herb_id]) if herb_id in self._base else {}
+        if theirs is None or theirs == base:
+            return mine
+        out = dict(theirs)
+        for key in {**base, **mine}:
+            b = base.get(key, _ABSENT)
+            m = mine.get(key, _ABSENT)
+            if m == b:
+                continue
+            t = theirs.get(key, _ABSENT)
+            if t != b and t != m:
+                self.conflicts.append((herb_id, key))
+                if on_conflict == 'raise':
+                    raise MergeConflict(f'{herb_id}.{key} was changed by another process')
+                if on_conflict == 'theirs':
+                    continue
+            if m is _ABSENT:
+                out.pop(key, None)
+            else:
+                out[key] = m
+        return out
+
+    def _merge_from_disk(self, on_conflict):
+        current = {}
+        for herb in iter_records(self.path):
+            if 'id' in herb:
+                current[herb['id']] = herb
+        for herb_id in self._dirty:
+            current[herb_id] = self._merged(herb_id, current.get(herb_id), on_conflict)
+        for herb_id in self._removed:
+            current.pop(herb_id, None)
+        # records removed by the other writer and untouched here go away too
+        for herb_id in [i for i in self._records if i not in current]:
+            self.remove(herb_id)
+        self._removed.clear()
+        for herb in current.values():
+            self._replace(herb)
+        # follow the stored order, with records new to it at the end
+        self._records = {i: self._records[i] for i in current}
+        self._pos = {i: n for n, i in enumerate(current)}
+        self._seq = len(current)
+
+    def _replace(self, herb):
+        """Make the stored record `herb`, updating the held dict in place to keep references valid."""
+        herb_id = herb['id']
+        held = self._records.get(herb_id)
+        if held is None:
+            self._insert(dict(herb))
+            return
+        if held is not herb:
+            self._unindex(herb_id, held)
+            held.clear()
+            held.update(herb)
+            self._index(herb_id, held)
+
+    # -- indexes -----------------------------------------------------------
+
+    def _insert(self, herb):
+        herb_id = herb['id']
+        if herb_id not in self._records:
+            self._pos[herb_id] = self._seq
+            self._seq += 1
+        self._records[herb_id] = herb
+        self._index(herb_id, herb)
+
+    def _index(self, herb_id, herb):
+        names = _names(herb)
+        self._names_of[herb_id] = names
+        for n in names:
+            self._by_name.setdefault(n, set()).add(herb_id)
+        for field in MISSING_FIELDS:
+            if is_missing(herb, field):
+                self._missing[field].add(herb_id)
+
+    def _unindex(self, herb_id, herb):
+        # use the names recorded at index time: `herb` may have been edited in place
+        for n in self._names_of.pop(herb_id, ()):
+            ids = self._by_name.get(n)
+            if ids:
+                ids.discard(herb_id)
+                if not ids:
+                    del self._by_name[n]
+        for field in MISSING_FIELDS:
+            self._missing[field].discard(herb_id)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Detect near-duplicate images with perceptual hashes and keep the best one.
+
+Behavior:
+- Hashes every local image referenced by data/images-manifest.json and by
+  `images[0]` in data/herbs.json with a 64-bit dHash and pHash (NumPy).
+- Builds a BK-tree over the pHashes for Hamming-distance lookups and groups
+  images that are within --phash-distance (and --dhash-distance) into clusters.
+- In each cluster the best candidate wins: highest resolution, then smallest file.
+- Writes `phash`/`dhash` (and `duplicate_of` for losers) to the manifest and a
+  report to data/image-duplicates.json. Duplicates across herbs are flagged.
+- With --prune, redundant files and their `_thumb.webp` variants (manifest
+  `thumb_path`) are deleted. Their manifest entries stay, marked with
+  `duplicate_of` and pointing at the kept thumbnail, so download_images.py
+  does not fetch them again. Every herb image that used a pruned file (by
+  local path, thumbnail or original URL) is re-pointed to the kept file and
+  its thumbnail.
+
+Usage:
+  python scripts/image_dedup.py [--prune] [--phash-distance 8] [--dhash-distance 10]
+"""
+import argparse
+import json
+
+import numpy as np
+from PIL import Image
+
+from image_placeholders import local_file
+from herbio import iter_records, stream_update
+from herbstore import DATA, ROOT
+
+MANIFEST = ROOT / 'data' / 'images-manifest.json'
+REPORT = ROOT / 'data' / 'image-duplicates.json'
+PUBLIC = ROOT / 'public'
+
+HASH_SIZE = 8
+PHASH_SAMPLE = 32
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+_DCT = _dct_matrix(PHASH_SAMPLE)
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+def _gray(img, size):
+    return np.asarray(img.convert('L').resize(size, Image.LANCZOS), dtype=np.float64)
+
+def dhash(img):
+    px = _gray(img, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(px[:, 1:] > px[:, :-1])
+
+def phash(img):
+    px = _gray(img, (PHASH_SAMPLE, PHASH_SAMPLE))
+    low = (_DCT @ px @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # the DC term only carries mean brightness; exclude it from the median
+    return _bits_to_int(low > np.median(low[1:]))
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, h, item):
+        if self.root is None:
+            self.root = (h, [item], {})
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (h, [item], {})
+                return
+            node = child
+
+    def query(self, h, max_dist):
+        """Yield (distance, item) for every stored hash within max_dist."""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_dist:
+                for item in node[1]:
+                    yield d, item
+            for cd, child in node[2].items():
+                if d - max_dist <= cd <= d + max_dist:
+                    stack.append(child)
+
+def collect_candidates(herbs, manifest):
+    """Return a list of candidate dicts, one per distinct local file."""
+    by_path = {}
+    def add(hid, path):
+        if not path:
+            return
+        c = by_path.setdefault(path, {'path': path, 'herbs': []})
+        if hid not in c['herbs']:
+            c['herbs'].append(hid)
+    for hid, entries in manifest.items():
+        for entry in entries:
+            add(hid, local_file(entry.get('local_path')))
+    for herb in herbs:
+        imgs = herb.get('images') or []
+        if imgs:
+            add(herb.get('id'), local_file(imgs[0].get('file_url')))
+    return list(by_path.values())
+
+def hash_candidate(c):
+    try:
+        with Image.open(c['path']) as img:
+            # read the real size before draft() lets the decoder downscale
+            c['width'], c['height'] = img.size
+            img.draft('RGB', (PHASH_SAMPLE * 4, PHASH_SAMPLE * 4))
+            img.load()
+            c['phash'] = phash(img)
+            c['dhash'] = dhash(img)
+    except Exception as e:
+        print('Cannot hash', c['path'], e)
+        return False
+    c['size_bytes'] = c['path'].stat().st_size
+    return True
+
+def quality_key(c):
+    return (-(c['width'] * c['height']), c['size_bytes'])
+
+def cluster(cands, max_phash, max_dhash):
+    tree = BKTree()
+    for i, c in enumerate(cands):
+        tree.add(c['phash'], i)
+    parent = list(range(len(cands)))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for i, c in enumerate(cands):
+        for _, j in tree.query(c['phash'], max_phash):
+            if j != i and hamming(c['dhash'], cands[j]['dhash']) <= max_dhash:
+                parent[find(j)] = find(i)
+    groups = {}
+    for i in range(len(cands)):
+        groups.setdefault(find(i), []).append(cands[i])
+    return [sorted(g, key=quality_key) for g in groups.values() if len(g) > 1]
+
+def rel(path):
+    return path.relative_to(PUBLIC).as_posix()
+
+def main(prune=False, max_phash=8, max_dhash=10):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    manifest = {}
+    if MANIFEST.exists():
+        with MANIFEST.open('r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    cands = [c for c in collect_candidates(iter_records(DATA), manifest) if hash_candidate(c)]
+    clusters = cluster(cands, max_phash, max_dhash)
+    print(f'Hashed {len(cands)} images, {len(clusters)} duplicate clusters')
+
+    keeper_of = {}
+    for group in clusters:
+        for loser in group[1:]:
+            keeper_of[loser['path']] = group[0]['path']
+
+    hashes = {c['path']: c for c in cands}
+    thumb_of = {}
+    for entries in manifest.values():
+        for entry in entries:
+            path, thumb = local_file(entry.get('local_path')), local_file(entry.get('thumb_path'))
+            if path and thumb:
+                thumb_of.setdefault(path, thumb)
+
+    # thumbnail of a pruned entry -> kept original
+    thumbs = {}
+    # (herb id, original URL) of a pruned entry -> kept original
+    originals = {}
+    for hid, entries in manifest.items():
+        for entry in entries:
+            path = local_file(entry.get('local_path'))
+            c = hashes.get(path)
+            if c:
+                entry['phash'] = f"{c['phash']:016x}"
+                entry['dhash'] = f"{c['dhash']:016x}"
+            keeper = keeper_of.get(path)
+            if keeper:
+                entry['duplicate_of'] = 'public/' + rel(keeper)
+                if prune:
+                    thumb = local_file(entry.get('thumb_path'))
+                    if thumb and thumb != keeper and thumb != thumb_of.get(keeper):
+                        thumbs[thumb] = keeper
+                    entry['thumb_path'] = 'public/' + rel(thumb_of.get(keeper, keeper))
+                    if entry.get('original_url'):
+                        originals[(hid, entry['original_url'])] = keeper
+            elif path:
+                entry.pop('duplicate_of', None)
+            # else: pruned by an earlier run; the entry keeps recording that
+
+    repointed = 0
+    if prune:
+        def repoint(herb):
+            n = 0
+            for img in herb.get('images') or []:
+                keeper = (keeper_of.get(local_file(img.get('file_url')))
+                          or thumbs.get(local_file(img.get('thumb_url')))
+                          or originals.get((herb.get('id'), img.get('file_url') or img.get('thumb_url'))))
+                if not keeper:
+                    continue
+                img['file_url'] = '/' + rel(keeper)
+                img['thumb_url'] = '/' + rel(thumb_of.get(keeper, keeper))
+                n += 1
+            return n
+        if keeper_of:
+            _, repointed, _ = stream_update(repoint, DATA)
+        for path in (*keeper_of, *thumbs):
+            path.unlink(missing_ok=True)
+
+    report = []
+    for group in clusters:
+        owners = sorted({hid for c in group for hid in c['herbs'] if hid})
+        report.append({
+            'keep': 'public/' + rel(group[0]['path']),
+            'cross_herb': len(owners) > 1,
+            'herbs': owners,
+            'members': [{
+                'path': 'public/' + rel(c['path']),
+                'herbs': c['herbs'],
+                'width': c['width'],
+                'height': c['height'],
+                'size_bytes': c['size_bytes'],
+                'phash_distance': hamming(c['phash'], group[0]['phash']),
+            } for c in group],
+        })
+    with REPORT.open('w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if manifest:
+        with MANIFEST.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        MANIFEST.with_suffix('.tmp').replace(MANIFEST)
+
+    cross = sum(1 for r in report if r['cross_herb'])
+    action = (f'removed {len(keeper_of)} files and {len(thumbs)} thumbnails, re-pointed {repointed} herbs' if prune
+              else 'use --prune to remove them')
+    print(f'Done. {len(keeper_of)} redundant images ({cross} clusters span several herbs); {action}. Report: {REPORT.name}')
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--prune', action='store_true', help='Delete redundant files and re-point herbs')
+    p.add_argument('--phash-distance', type=int, default=8)
+    p.add_argument('--dhash-distance', type=int, default=10)
+    args = p.parse_args()
+    main(prune=args.prune, max_phash=args.phash_distance, max_dhash=args.dhash_distance)
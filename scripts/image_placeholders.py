@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Compute low-quality image placeholders (LQIP) and dominant colours.
+
+For every local image referenced from data/images-manifest.json or from
+`images[0]` in data/herbs.json this computes:
+- `lqip`: a tiny WebP data URI (~16 px on the long side) the frontend can
+  paint immediately as a blurred background,
+- `dominant_color`: the most common colour as `#rrggbb`, computed with NumPy
+  over the downsampled pixels.
+
+Results are written to the manifest entries and next to `images[0]` in
+herbs.json. Images that already have both fields are skipped unless --force.
+
+Usage:
+  python scripts/image_placeholders.py [--force] [--size 16]
+"""
+import argparse
+import base64
+import json
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from herbio import stream_update
+from herbstore import DATA, ROOT
+
+MANIFEST = ROOT / 'data' / 'images-manifest.json'
+PUBLIC = ROOT / 'public'
+
+LQIP_SIZE = 16
+LQIP_QUALITY = 40
+# pixels sampled for the dominant colour; bins are 4 bits per channel
+COLOR_SAMPLE = 64
+COLOR_BITS = 4
+
+def _rgb(img):
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        bg = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(bg, img)
+    return img.convert('RGB')
+
+def lqip_data_uri(img, size=LQIP_SIZE):
+    small = _rgb(img)
+    small.thumbnail((size, size), Image.BILINEAR)
+    buf = BytesIO()
+    small.save(buf, format='WEBP', quality=LQIP_QUALITY, method=6)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+def dominant_color(img):
+    """Return the mean colour of the most populated RGB bin as '#rrggbb'."""
+    small = _rgb(img)
+    small.thumbnail((COLOR_SAMPLE, COLOR_SAMPLE), Image.BILINEAR)
+    px = np.asarray(small, dtype=np.uint8).reshape(-1, 3)
+    if not len(px):
+        return None
+    shift = 8 - COLOR_BITS
+    q = (px >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * COLOR_BITS)) | (q[:, 1] << COLOR_BITS) | q[:, 2]
+    top = np.bincount(bins).argmax()
+    r, g, b = px[bins == top].mean(axis=0).round().astype(int)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+def compute_placeholder(src, size=LQIP_SIZE):
+    """Return {'lqip', 'dominant_color'} for a path or raw bytes, or None."""
+    try:
+        img = Image.open(BytesIO(src) if isinstance(src, (bytes, bytearray)) else src)
+        img.draft('RGB', (COLOR_SAMPLE * 2, COLOR_SAMPLE * 2))
+        img.load()
+    except Exception:
+        return None
+    return {'lqip': lqip_data_uri(img, size), 'dominant_color': dominant_color(img)}
+
+def local_file(url_or_path):
+    """Map '/images/x.jpg' or 'public/images/x.jpg' to a file under public/."""
+    if not url_or_path or '://' in url_or_path:
+        return None
+    p = url_or_path.replace('\\', '/').lstrip('/')
+    if p.startswith('public/'):
+        p = p[len('public/'):]
+    path = PUBLIC / p
+    return path if path.exists() else None
+
+def main(force=False, size=LQIP_SIZE):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    manifest = {}
+    if MANIFEST.exists():
+        with MANIFEST.open('r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    cache = {}
+    def placeholder(path):
+        if path not in cache:
+            cache[path] = compute_placeholder(path, size)
+        return cache[path]
+
+    manifest_updated = 0
+    for entries in manifest.values():
+        for entry in entries:
+            if not force and entry.get('lqip') and entry.get('dominant_color'):
+                continue
+            path = local_file(entry.get('local_path'))
+            ph = placeholder(path) if path else None
+            if ph:
+                entry.update(ph)
+                manifest_updated += 1
+
+    def process(herb):
+        imgs = herb.get('images') or []
+        if not imgs:
+            return 0
+        img = imgs[0]
+        if not force and img.get('lqip') and img.get('dominant_color'):
+            return 0
+        path = local_file(img.get('file_url')) or local_file(img.get('thumb_url'))
+        if not path:
+            entries = manifest.get(herb.get('id')) or []
+            path = local_file(entries[0].get('local_path')) if entries else None
+        ph = placeholder(path) if path else None
+        if not ph:
+            return 0
+        img.update(ph)
+        return 1
+
+    _, herbs_updated, _ = stream_update(process, DATA)
+
+    if manifest_updated:
+        with MANIFEST.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        MANIFEST.with_suffix('.tmp').replace(MANIFEST)
+    print(f'Done. Placeholders: {manifest_updated} manifest entries, {herbs_updated} herbs.')
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--force', action='store_true', help='Recompute existing placeholders')
+    p.add_argument('--size', type=int, default=LQIP_SIZE, help='LQIP long side in pixels')
+    args = p.parse_args()
+    main(force=args.force, size=args.size)
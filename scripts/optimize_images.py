@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Optimise images under public/images and report their size against a budget.
+
+Behavior:
+- Processes every image in public/images in parallel (one process per core).
+- Applies the EXIF orientation to the pixels, then strips EXIF/XMP and
+  embedded colour profiles (converting to sRGB first when a profile is
+  present), caps the long side at --max-dim and re-encodes:
+  JPEG progressive with the original quantisation tables (`quality='keep'`) or
+  --quality when resized or rotated, PNG with lossless optimisation. WebP is
+  already lossy and is only re-encoded (at --quality) when resized or rotated.
+- A file is only replaced when the result is smaller or had to be resized or
+  rotated.
+- The size and mtime of every processed file are kept in
+  data/optimize-images-cache.json; files that have not changed since are
+  skipped, so repeated runs do not re-encode their own output.
+- Updates size/width/height/mtime in data/images-manifest.json and writes a
+  per-image and total report to data/image-size-report.json.
+- Exits with status 1 when the total exceeds --budget-mb (for CI).
+
+Usage:
+  python scripts/optimize_images.py [--max-dim 1600] [--quality 88] [--budget-mb 25] [--dry-run] [--force]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without littleCMS
+    ImageCms = None
+
+ROOT = Path(__file__).resolve().parents[1]
+PUBLIC = ROOT / 'public'
+IMAGES = PUBLIC / 'images'
+MANIFEST = ROOT / 'data' / 'images-manifest.json'
+REPORT = ROOT / 'data' / 'image-size-report.json'
+CACHE = ROOT / 'data' / 'optimize-images-cache.json'
+
+EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+ORIENTATION = 0x0112  # EXIF tag
+
+def to_srgb(img):
+    icc = img.info.get('icc_profile')
+    if not icc or ImageCms is None:
+        return img
+    try:
+        src = ImageCms.ImageCmsProfile(BytesIO(icc))
+        dst = ImageCms.createProfile('sRGB')
+        mode = 'RGBA' if 'A' in img.getbands() else 'RGB'
+        return ImageCms.profileToProfile(img, src, dst, outputMode=mode)
+    except Exception:
+        return img
+
+def encode(img, fmt, quality, keep_tables, changed):
+    buf = BytesIO()
+    if fmt == 'JPEG':
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        if keep_tables:
+            img.save(buf, format='JPEG', quality='keep', subsampling='keep', optimize=True, progressive=True)
+        else:
+            img.save(buf, format='JPEG', quality=quality, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        img.save(buf, format='PNG', optimize=True)
+    elif fmt == 'WEBP':
+        if not changed:
+            return None
+        img.save(buf, format='WEBP', quality=quality, method=6)
+    else:
+        return None
+    return buf.getvalue()
+
+def optimize_one(path, max_dim, quality, dry_run):
+    before = path.stat().st_size
+    row = {'path': path.relative_to(ROOT).as_posix(), 'before': before, 'after': before,
+           'width': None, 'height': None, 'resized': False, 'rewritten': False}
+    try:
+        with Image.open(path) as src:
+            fmt = src.format
+            src.load()
+            img = src
+            resized = max(img.size) > max_dim
+            # EXIF is dropped on re-encode, so its orientation goes into the pixels
+            rotated = src.getexif().get(ORIENTATION, 1) != 1
+            if rotated:
+                img = ImageOps.exif_transpose(img)
+            # quality='keep' needs the original JPEG quantisation tables
+            keep_tables = fmt == 'JPEG' and not resized and not rotated and not src.info.get('icc_profile')
+            if not keep_tables:
+                img = to_srgb(img)
+            if resized:
+                img = img.copy()
+                img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+            data = encode(img, fmt, quality, keep_tables, resized or rotated)
+            row['width'], row['height'] = img.size
+    except Exception as e:
+        row['error'] = str(e)
+        return row
+    if data is None:
+        return row
+    row['resized'] = resized
+    if resized or rotated or len(data) < before:
+        row['after'] = len(data)
+        row['rewritten'] = True
+        if not dry_run:
+            tmp = path.with_name(path.name + '.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+    return row
+
+def update_manifest(rows):
+    if not MANIFEST.exists():
+        return 0
+    with MANIFEST.open('r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    by_path = {r['path']: r for r in rows if r['rewritten']}
+    updated = 0
+    for entries in manifest.values():
+        for entry in entries:
+            r = by_path.get((entry.get('local_path') or '').replace('\\', '/'))
+            if r:
+                entry['size_bytes'] = r['after']
+                entry['width'], entry['height'] = r['width'], r['height']
+                entry['mtime_ns'] = r['mtime_ns']
+                updated += 1
+    if updated:
+        with MANIFEST.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        MANIFEST.with_suffix('.tmp').replace(MANIFEST)
+    return updated
+
+def load_cache():
+    if not CACHE.exists():
+        return {}
+    with CACHE.open('r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_cache(rows):
+    cache = {}
+    for r in rows:
+        if 'error' not in r:
+            cache[r['path']] = {'size': r['after'], 'mtime_ns': r['mtime_ns'],
+                                'width': r['width'], 'height': r['height']}
+    with CACHE.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+    CACHE.with_suffix('.tmp').replace(CACHE)
+
+def fmt_mb(n):
+    return f'{n / 1024 / 1024:.2f} MB'
+
+def main(max_dim=1600, quality=88, budget_mb=None, dry_run=False, workers=None, force=False):
+    if not IMAGES.exists():
+        print('public/images not found')
+        return 0
+    cache = {} if force else load_cache()
+    files, rows = [], []
+    for p in sorted(p for p in IMAGES.rglob('*') if p.is_file() and p.suffix.lower() in EXTENSIONS):
+        st = p.stat()
+        key = p.relative_to(ROOT).as_posix()
+        seen = cache.get(key)
+        if seen and seen['size'] == st.st_size and seen['mtime_ns'] == st.st_mtime_ns:
+            # already optimised by an earlier run and not touched since
+            rows.append({'path': key, 'before': st.st_size, 'after': st.st_size,
+                         'width': seen['width'], 'height': seen['height'],
+                         'resized': False, 'rewritten': False})
+        else:
+            files.append(p)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        rows += ex.map(optimize_one, files, [max_dim] * len(files), [quality] * len(files),
+                       [dry_run] * len(files), chunksize=8)
+    for r in rows:
+        if 'error' not in r:
+            r['mtime_ns'] = (ROOT / r['path']).stat().st_mtime_ns
+
+    if not dry_run:
+        update_manifest(rows)
+        save_cache(rows)
+
+    before = sum(r['before'] for r in rows)
+    after = sum(r['after'] for r in rows)
+    budget = int(budget_mb * 1024 * 1024) if budget_mb else None
+    report = {
+        'files': len(rows),
+        'rewritten': sum(1 for r in rows if r['rewritten']),
+        'skipped': len(rows) - len(files),
+        'resized': sum(1 for r in rows if r['resized']),
+        'errors': sum(1 for r in rows if 'error' in r),
+        'total_before': before,
+        'total_after': after,
+        'budget_bytes': budget,
+        'over_budget': bool(budget and after > budget),
+        'dry_run': dry_run,
+        'images': sorted(rows, key=lambda r: -r['after']),
+    }
+    with REPORT.open('w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for r in report['images'][:10]:
+        print(f"{r['path']}: {r['before']} -> {r['after']} bytes" + (' (resized)' if r['resized'] else ''))
+    print(f'Done. {len(rows)} images, {fmt_mb(before)} -> {fmt_mb(after)}'
+          + (f' (budget {fmt_mb(budget)})' if budget else '') + f'. Report: {REPORT.name}')
+    if report['over_budget']:
+        print(f'Image budget exceeded by {fmt_mb(after - budget)}')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--max-dim', type=int, default=1600, help='Cap for the longer image side in pixels')
+    p.add_argument('--quality', type=int, default=88, help='Quality for resized JPEG and WebP output')
+    p.add_argument('--budget-mb', type=float, default=None, help='Fail when the total exceeds this size')
+    p.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    p.add_argument('--dry-run', action='store_true', help='Report only, do not rewrite files')
+    p.add_argument('--force', action='store_true', help='Ignore the cache and process every image')
+    args = p.parse_args()
+    sys.exit(main(max_dim=args.max_dim, quality=args.quality, budget_mb=args.budget_mb,
+                  dry_run=args.dry_run, workers=args.workers, force=args.force))
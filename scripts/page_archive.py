@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Compressed archive of the pages and API responses fetched by the crawler.
+
+Every response is kept as one gzip file: a JSON metadata line (url, params,
+kind, status, selected headers, fetch time) followed by the raw body bytes.
+Files are addressed by a hash of the URL and query parameters, so fetching
+the same URL again replaces its entry (latest wins):
+
+    data/raw/objects/ab/ab12....gz    one response per file
+    data/raw/index.jsonl              one line per fetch, for listing
+
+`replay()` returns a drop-in for `requests.get` that answers from the
+archive, so `fetch_herbs.py reparse` can rebuild records from the same
+responses without touching the network.
+
+Usage:
+  python scripts/page_archive.py list [--kind page]
+  python scripts/page_archive.py show URL
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+
+from herbstore import ROOT
+
+ARCHIVE = ROOT / 'data' / 'raw'
+HEADERS = ('content-type', 'last-modified', 'etag', 'date')
+
+class ArchiveMiss(LookupError):
+    pass
+
+def _request_key(url, params=None):
+    query = urlencode(sorted((params or {}).items()))
+    return url + ('?' + query if query else '')
+
+class ArchivedResponse:
+    """The parts of `requests.Response` the crawler uses."""
+
+    def __init__(self, meta, content):
+        self.meta = meta
+        self.url = meta['url']
+        self.status_code = meta['status']
+        self.headers = meta.get('headers') or {}
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.meta.get('encoding') or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} for {self.url} (archived)', response=self)
+
+class PageArchive:
+    def __init__(self, root=ARCHIVE):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.index = self.root / 'index.jsonl'
+
+    def key(self, url, params=None):
+        return hashlib.sha256(_request_key(url, params).encode('utf-8')).hexdigest()[:24]
+
+    def _path(self, key):
+        return self.objects / key[:2] / f'{key}.gz'
+
+    def put(self, url, params, response, kind='page'):
+        """Store a `requests.Response`; return its key."""
+        key = self.key(url, params)
+        meta = {
+            'key': key,
+            'url': url,
+            'params': params or None,
+            'kind': kind,
+            'status': response.status_code,
+            'encoding': response.encoding,
+            'headers': {h: response.headers[h] for h in HEADERS if h in response.headers},
+            'fetched': datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            'bytes': len(response.content),
+        }
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp, 'wb') as f:
+            f.write(json.dumps(meta, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.write(response.content)
+        os.replace(tmp, path)
+        with self.index.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + '\n')
+        return key
+
+    def get(self, url, params=None):
+        """Return the archived ArchivedResponse for the request, or None."""
+        path = self._path(self.key(url, params))
+        if not path.exists():
+            return None
+        with gzip.open(path, 'rb') as f:
+            meta = json.loads(f.readline())
+            return ArchivedResponse(meta, f.read())
+
+    def entries(self, kind=None):
+        """Latest index entry per archived request, in first-fetch order."""
+        latest = {}
+        if self.index.exists():
+            with self.index.open('r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        e = json.loads(line)
+                        latest[e['key']] = e
+        return [e for e in latest.values() if kind is None or e['kind'] == kind]
+
+    def replay(self):
+        """A `requests.get` replacement that answers from the archive or raises ArchiveMiss."""
+        def get(url, params=None, **_):
+            r = self.get(url, params)
+            if r is None:
+                raise ArchiveMiss(_request_key(url, params))
+            return r
+        return get
+
+def main():
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    ls = sub.add_parser('list')
+    ls.add_argument('--kind', default=None, help='page, category, file or api')
+    sh = sub.add_parser('show')
+    sh.add_argument('url')
+    args = p.parse_args()
+    archive = PageArchive()
+    if args.command == 'list':
+        entries = archive.entries(args.kind)
+        for e in entries:
+            print(f"{e['fetched']}  {e['kind']:<8}{e['status']:>4}{e['bytes']:>9}  {_request_key(e['url'], e['params'])}")
+        print(f'{len(entries)} archived responses')
+    else:
+        r = archive.get(args.url)
+        if r is None:
+            raise SystemExit(f'Not archived: {args.url}')
+        print(json.dumps(r.meta, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
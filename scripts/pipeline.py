@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Run the data clean-up scripts as stages of a single pass over data/herbs.json.
+
+Each stage is the `process_record(herb)` function of one of the clean-up
+scripts: it edits a record in place and returns the number of changes. Records
+are streamed once (constant memory, see herbio.py), every stage is applied to
+each record in the declared order and the result is written once, atomically,
+only if something changed.
+
+Usage:
+  python scripts/pipeline.py [--stages boilerplate,cleanup_images] [--dry-run] [--list]
+
+Snapshots the previous data as 'pipeline' (see snapshots.py).
+"""
+import argparse
+import time
+
+import boilerplate
+import cleanup_images_and_licenses
+import populate_all_with_templates
+import populate_wikipedia_links
+import populate_summaries
+import sanitize_html
+import section_taxonomy
+import tagging
+from herbio import iter_records, stream_update
+from herbstore import DATA
+
+SNAPSHOT = 'pipeline'
+
+# declared order: later stages see the output of earlier ones
+STAGES = [
+    ('boilerplate', boilerplate.process_record, 'strip boilerplate from data/boilerplate-patterns.txt'),
+    ('sections', section_taxonomy.process_record, 'rename section headings to canonical ones'),
+    ('cleanup_images', cleanup_images_and_licenses.process_record, 'drop non-wiki image links and source license'),
+    ('summaries', populate_summaries.process_record, 'fill empty summaries from sections'),
+    ('templates', populate_all_with_templates.process_record, 'fill remaining summaries/sections with templates'),
+    ('sanitize', sanitize_html.process_record, 'build sanitized section HTML and plain text'),
+    ('tags', tagging.process_record, 'derive tags from section text'),
+    ('wikipedia', populate_wikipedia_links.process_record, 'fill wikipedia_url from data/wikipedia-cache.json'),
+]
+
+def select_stages(names=None):
+    if not names:
+        return STAGES
+    known = {s[0]: s for s in STAGES}
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}. Known: {', '.join(known)}")
+    # keep the declared order regardless of the order given on the command line
+    return [s for s in STAGES if s[0] in names]
+
+def make_runner(stages, stats):
+    """Return a record function applying `stages` in order and filling `stats`."""
+    def process(herb):
+        total = 0
+        for name, fn, _ in stages:
+            t0 = time.perf_counter()
+            n = fn(herb)
+            st = stats[name]
+            st['seconds'] += time.perf_counter() - t0
+            if n:
+                st['records'] += 1
+                st['changes'] += n
+                total += n
+        return total
+    return process
+
+def main(stage_names=None, dry_run=False):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    stages = select_stages(stage_names)
+    stats = {name: {'records': 0, 'changes': 0, 'seconds': 0.0} for name, _, _ in stages}
+    process = make_runner(stages, stats)
+    t0 = time.perf_counter()
+    if dry_run:
+        records = changed = 0
+        for herb in iter_records(DATA):
+            records += 1
+            changed += bool(process(herb))
+    else:
+        records, changed, _ = stream_update(process, DATA, snapshot=SNAPSHOT)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{'stage':<20}{'records':>9}{'changes':>9}{'ms':>10}")
+    for name, _, _ in stages:
+        st = stats[name]
+        print(f"{name:<20}{st['records']:>9}{st['changes']:>9}{st['seconds'] * 1000:>10.1f}")
+    print(f'Done. {records} records, {changed} changed in {elapsed * 1000:.1f} ms'
+          + (' (dry run, not written).' if dry_run else '.'))
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--stages', default=None, help='Comma-separated subset of stages to run')
+    p.add_argument('--dry-run', action='store_true', help='Report changes without writing')
+    p.add_argument('--list', action='store_true', help='List stages in order and exit')
+    args = p.parse_args()
+    if args.list:
+        for name, _, desc in STAGES:
+            print(f'{name:<20}{desc}')
+    else:
+        main(stage_names=args.stages.split(',') if args.stages else None, dry_run=args.dry_run)
@@ -1,14 +1,12 @@
 #!/usr/bin/env python3
 """Populate missing `summary` and `sections` in data/herbs.json with simple templates.
 
-Creates a backup at data/herbs.json.allfilled.bak and reports how many entries were updated.
+Snapshots the previous data as 'allfilled' (see snapshots.py) and reports how many entries were updated.
 """
-from pathlib import Path
-import json, shutil
+from herbio import stream_update
+from herbstore import DATA
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.allfilled.bak'
+SNAPSHOT = 'allfilled'
 
 def make_summary(name):
     return f"{name} je běžná bylinka či koření; základní informace o použití, pěstování a sběru."
@@ -21,35 +19,38 @@ def make_sections(name):
         "Sběr": "Sběr listů/květů/semen v optimální fázi — obvykle před nebo během kvetení; sušte rychle ve stínu."
     }
 
+def fill_record(herb):
+    """Fill empty summary/sections in place; return (summary_added, sections_added)."""
+    name = herb.get('name') or herb.get('id') or 'Bylinka'
+    summary_added = sections_added = 0
+    summary = herb.get('summary')
+    if not isinstance(summary, str) or not summary.strip():
+        herb['summary'] = make_summary(name)
+        summary_added = 1
+    sections = herb.get('sections')
+    if not isinstance(sections, dict) or not sections:
+        herb['sections'] = make_sections(name)
+        sections_added = 1
+    return summary_added, sections_added
+
+def process_record(herb):
+    """Pipeline stage: fill empty summary/sections in place; return fields filled."""
+    return sum(fill_record(herb))
+
 def main():
     if not DATA.exists():
         print('data/herbs.json not found')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    changed_summary = 0
-    changed_sections = 0
-
-    for herb in data:
-        name = herb.get('name') or herb.get('id') or 'Bylinka'
-        summary = herb.get('summary')
-        if not isinstance(summary, str) or not summary.strip():
-            herb['summary'] = make_summary(name)
-            changed_summary += 1
-
-        sections = herb.get('sections')
-        if not isinstance(sections, dict) or not sections:
-            herb['sections'] = make_sections(name)
-            changed_sections += 1
-
-    out_path = DATA.with_suffix('.tmp')
-    with out_path.open('w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    out_path.replace(DATA)
-
-    print(f'Done. Summaries added: {changed_summary}, Sections added: {changed_sections}. Backup at {BACKUP}')
+    counts = [0, 0]
+    def process(herb):
+        summary_added, sections_added = fill_record(herb)
+        counts[0] += summary_added
+        counts[1] += sections_added
+        return summary_added + sections_added
+    stream_update(process, DATA, snapshot=SNAPSHOT)
+    changed_summary, changed_sections = counts
+
+    print(f'Done. Summaries added: {changed_summary}, Sections added: {changed_sections}. Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     main()
@@ -2,15 +2,15 @@
 """Populate empty `summary` fields in data/herbs.json by extracting
 the first paragraph from available `sections` content.
 
-Backs up `data/herbs.json` to `data/herbs.json.populate.bak`.
+Snapshots the previous `data/herbs.json` as 'populate' (see snapshots.py).
 """
-from pathlib import Path
-import json, shutil, re
+import re
 from html import unescape
+from herbio import stream_update
+from herbstore import DATA
+from section_taxonomy import canonicalize
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.populate.bak'
+SNAPSHOT = 'populate'
 
 def strip_tags(html):
     # remove tags
@@ -42,51 +42,47 @@ def first_paragraph_from_html(html):
     first = s[0]
     return first if len(first) <= 400 else (first[:397].rstrip() + '...')
 
-def replace_summaries(data):
-    changed = 0
-    for herb in data:
-        summary = herb.get('summary') or ''
-        if isinstance(summary, str) and summary.strip():
-            continue
-        sections = herb.get('sections') or {}
-        # find first meaningful section content
-        # prefer Popis/Vzhled/Popis a vzhled etc.
-        keys = list(sections.keys())
-        preferred = ['Popis', 'Vzhled', 'Popis a vzhled', 'Popis a použití', 'Úvod']
-        candidate = None
-        for k in preferred:
-            for real in keys:
-                if k.lower() in real.lower():
-                    candidate = sections.get(real)
-                    break
-            if candidate:
-                break
-        if not candidate and keys:
-            # pick the first non-empty section
-            for real in keys:
-                val = sections.get(real)
-                if isinstance(val, str) and val.strip():
-                    candidate = val
-                    break
+def _truncate(text):
+    return text if len(text) <= 400 else (text[:397].rstrip() + '...')
+
+def _preferred(sections):
+    # canonical headings: "Vzhled", "Popis a vzhled", "Úvod" etc. are all "Popis"
+    candidate = sections.get('Popis')
+    if not isinstance(candidate, str) or not candidate.strip():
+        # pick the first non-empty section
+        candidate = next((v for v in sections.values() if isinstance(v, str) and v.strip()), None)
+    return candidate
+
+def summary_from_sections(herb):
+    """Return the first paragraph of the most descriptive section, or ''."""
+    # plain text from sanitize_html.py when available: its first paragraph, no tag stripping
+    text = herb.get('sections_text')
+    if isinstance(text, dict) and text:
+        candidate = _preferred(canonicalize(text))
         if candidate:
-            para = first_paragraph_from_html(candidate)
-            if para:
-                herb['summary'] = para
-                changed += 1
-    return changed
+            return _truncate(candidate.split('\n\n', 1)[0].replace('\n', ' '))
+    candidate = _preferred(canonicalize(herb.get('sections') or {}))
+    if candidate:
+        return first_paragraph_from_html(candidate)
+    return ''
+
+def process_record(herb):
+    """Pipeline stage: fill an empty summary in place; return 1 if filled."""
+    summary = herb.get('summary') or ''
+    if isinstance(summary, str) and summary.strip():
+        return 0
+    para = summary_from_sections(herb)
+    if not para:
+        return 0
+    herb['summary'] = para
+    return 1
 
 def main():
     if not DATA.exists():
         print('data/herbs.json not found')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        data = json.load(f)
-    changed = replace_summaries(data)
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
-    print(f'Done. Summaries populated for {changed} herbs. Backup at {BACKUP}')
+    _, changed, _ = stream_update(process_record, DATA, snapshot=SNAPSHOT)
+    print(f'Done. Summaries populated for {changed} herbs. Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     main()
@@ -1,117 +1,185 @@
 #!/usr/bin/env python3
-"""Check and populate `wikipedia_url` for herbs in data/herbs.json.
+"""Resolve `wikipedia_url` for herbs in batches and cache the answers.
 
 Behavior:
-- Reads `data/herbs.json` and for each herb without `wikipedia_url` tries
-  candidates on `cs.wikipedia.org` and `en.wikipedia.org` using HEAD (falls
-  back to GET if HEAD not allowed).
-- Respects `robots.txt` crawl-delay (defaults to 10s if not found).
-- Backs up original file to `data/herbs.json.wiki.bak` and writes changes atomically.
+- For each herb without `wikipedia_url` the candidates are, in order: the name
+  on cs.wikipedia.org, the id on cs.wikipedia.org (when it differs) and the
+  name on en.wikipedia.org.
+- Candidates are checked with the MediaWiki API, up to 50 titles per request
+  (`action=query&titles=...&redirects=1`), instead of one HEAD request per
+  URL. Normalized titles and redirects are followed, so the stored URL points
+  at the article itself.
+- Every answer is kept in data/wikipedia-cache.json. Found titles are cached
+  for good; missing ones are asked again only after --negative-ttl days.
+  Titles whose request failed are not cached and are retried on the next run.
+- The `wikipedia` pipeline stage (`process_record`) fills `wikipedia_url` from
+  the cache alone, so the pipeline and the site build never touch the network.
+- Snapshots the previous data as 'wiki' (see snapshots.py).
 
 Usage:
-  python scripts/populate_wikipedia_links.py [--limit N] [--delay S]
-
-Note: Running without `--limit` will check all herbs; obey crawl-delay which
-may take ~10s per request (≈ 13 minutes for ~76 herbs).
+  python scripts/populate_wikipedia_links.py [--limit N] [--delay S] [--negative-ttl DAYS]
+  python scripts/populate_wikipedia_links.py --offline    # only apply the cache
 """
 import argparse
-from pathlib import Path
-import json, shutil, time, re
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, unquote
+
 import requests
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.wiki.bak'
-
-WIKIPEDIA_HOSTS = [
-    'https://cs.wikipedia.org/wiki/',
-    'https://en.wikipedia.org/wiki/'
-]
-
-def get_crawl_delay(site='https://www.wikifood.cz'):
-    try:
-        r = requests.get(site.rstrip('/') + '/robots.txt', timeout=10)
-        txt = r.text
-        m = re.search(r'(?i)crawl-delay:\s*(\d+)', txt)
-        if m:
-            return int(m.group(1))
-    except Exception:
-        pass
-    return 10
-
-def check_url_exists(session, url):
-    try:
-        r = session.head(url, allow_redirects=True, timeout=10)
-        if r.status_code == 200:
-            return True
-        # some servers disallow HEAD; try GET for 405/501 or other
-        if r.status_code in (405, 501, 400):
-            r2 = session.get(url, allow_redirects=True, timeout=10)
-            return r2.status_code == 200
-        return False
-    except requests.RequestException:
-        return False
+from herbio import iter_records, stream_update
+from herbstore import DATA, ROOT
+
+SNAPSHOT = 'wiki'
+CACHE = ROOT / 'data' / 'wikipedia-cache.json'
+LANGS = ('cs', 'en')
+BATCH = 50
+NEGATIVE_TTL_DAYS = 30
+HEADERS = {'User-Agent': 'herbar-bot/1.0 (+https://example.org) python-requests'}
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def _stamp(dt):
+    return dt.isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def article_url(lang, title):
+    return f'https://{lang}.wikipedia.org/wiki/' + quote(title.replace(' ', '_'), safe="()',:")
 
 def candidates_for(herb):
-    name = herb.get('name') or ''
-    slug = herb.get('id') or ''
-    def enc(s):
-        return requests.utils.requote_uri(s.replace(' ', '_'))
-    name_c = enc(name)
-    slug_c = enc(slug)
-    c = []
-    c.append(('cs', WIKIPEDIA_HOSTS[0] + name_c))
-    if slug_c != name_c:
-        c.append(('cs', WIKIPEDIA_HOSTS[0] + slug_c))
-    c.append(('en', WIKIPEDIA_HOSTS[1] + name_c))
-    return c
-
-def main(limit=None, override_delay=None):
+    """(lang, title) pairs to try, best first."""
+    name = ' '.join((herb.get('name') or '').split())
+    slug = ' '.join(unquote(herb.get('id') or '').replace('_', ' ').split())
+    out = []
+    if name:
+        out.append(('cs', name))
+    if slug and slug != name:
+        out.append(('cs', slug))
+    if name:
+        out.append(('en', name))
+    return out
+
+def load_cache(path=CACHE):
+    if not path.exists():
+        return {}
+    with path.open('r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_cache(cache, path=CACHE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def is_fresh(entry, now, negative_ttl):
+    if entry is None:
+        return False
+    if entry.get('title'):
+        return True
+    checked = datetime.fromisoformat(entry['checked'].replace('Z', '+00:00'))
+    return now - checked < negative_ttl
+
+def query_titles(session, lang, titles):
+    """Return {asked title: article title or None} for one batch, following redirects."""
+    r = session.get(f'https://{lang}.wikipedia.org/w/api.php', params={
+        'action': 'query',
+        'titles': '|'.join(titles),
+        'redirects': 1,
+        'format': 'json',
+        'formatversion': 2,
+    }, timeout=15)
+    r.raise_for_status()
+    q = r.json().get('query', {})
+    mapped = {m['from']: m['to'] for m in q.get('normalized', [])}
+    redirects = {m['from']: m['to'] for m in q.get('redirects', [])}
+    existing = {p['title'] for p in q.get('pages', []) if not p.get('missing') and not p.get('invalid')}
+    out = {}
+    for title in titles:
+        t = mapped.get(title, title)
+        t = redirects.get(t, t)
+        out[title] = t if t in existing else None
+    return out
+
+def resolve(pending, cache, delay=1.0, log=print):
+    """Query the (lang, title) pairs in batches and record the answers in `cache`; return requests made."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    requests_made = 0
+    for lang in LANGS:
+        titles = sorted({t for l, t in pending if l == lang})
+        for start in range(0, len(titles), BATCH):
+            batch = titles[start:start + BATCH]
+            if requests_made:
+                time.sleep(delay)
+            requests_made += 1
+            try:
+                found = query_titles(session, lang, batch)
+            except (requests.RequestException, ValueError) as e:
+                log(f'{lang}: batch of {len(batch)} titles failed, will retry next run: {e}')
+                continue
+            checked = _stamp(_now())
+            for title, article in found.items():
+                cache[f'{lang}:{title}'] = {'title': article, 'checked': checked}
+    return requests_made
+
+def url_from_cache(herb, cache):
+    for lang, title in candidates_for(herb):
+        entry = cache.get(f'{lang}:{title}')
+        if entry and entry.get('title'):
+            return article_url(lang, entry['title'])
+    return None
+
+_cache = None
+
+def process_record(herb, cache=None):
+    """Pipeline stage: set a missing `wikipedia_url` from the cache; return 1 if set."""
+    global _cache
+    if herb.get('wikipedia_url'):
+        return 0
+    if cache is None:
+        if _cache is None:
+            _cache = load_cache()
+        cache = _cache
+    url = url_from_cache(herb, cache)
+    if not url:
+        return 0
+    herb['wikipedia_url'] = url
+    return 1
+
+def main(limit=None, delay=1.0, negative_ttl_days=NEGATIVE_TTL_DAYS, offline=False):
     if not DATA.exists():
         print('data/herbs.json not found at', DATA)
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        herbs = json.load(f)
-
-    session = requests.Session()
-    crawl_delay = override_delay if override_delay is not None else get_crawl_delay()
-    print('Using crawl-delay:', crawl_delay, 'seconds')
-
-    to_check = [h for h in herbs if not h.get('wikipedia_url')]
-    total = len(to_check)
-    print(f'Total herbs to check: {total}')
-    checked = 0
-
-    for i, herb in enumerate(to_check):
-        if limit and i >= limit:
-            break
-        candidates = candidates_for(herb)
-        found = None
-        for lang, url in candidates:
-            print(f'Checking {herb.get("name")} -> {url}')
-            ok = check_url_exists(session, url)
-            if ok:
-                found = url
-                herb['wikipedia_url'] = url
-                print('Found:', url)
+    cache = load_cache()
+    now = _now()
+    ttl = timedelta(days=negative_ttl_days)
+    missing = pending = requests_made = 0
+    if not offline:
+        todo = set()
+        for herb in iter_records(DATA):
+            if herb.get('wikipedia_url'):
+                continue
+            if limit and missing >= limit:
                 break
-            else:
-                print('Not found:', url)
-            time.sleep(crawl_delay)
-        if not found:
-            print('No wikipedia page found for', herb.get('name'))
-        checked += 1
-
-    # write back
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
-    print(f'Done. Checked {checked} herbs. Backup at {BACKUP}')
+            missing += 1
+            todo.update(c for c in candidates_for(herb) if not is_fresh(cache.get(f'{c[0]}:{c[1]}'), now, ttl))
+        pending = len(todo)
+        print(f'{pending} titles to check ({missing} herbs without wikipedia_url)')
+        requests_made = resolve(todo, cache, delay)
+        save_cache(cache)
+    _, changed, _ = stream_update(lambda herb: process_record(herb, cache), DATA, snapshot=SNAPSHOT)
+    print(f'Done. {pending} titles checked in {requests_made} requests, '
+          f'{changed} herbs got wikipedia_url. Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
     p.add_argument('--limit', type=int, default=None, help='Limit number of herbs to check')
-    p.add_argument('--delay', type=int, default=None, help='Override crawl-delay in seconds')
+    p.add_argument('--delay', type=float, default=1.0, help='Seconds between API requests')
+    p.add_argument('--negative-ttl', type=float, default=NEGATIVE_TTL_DAYS,
+                   help='Days before a title that was not found is checked again')
+    p.add_argument('--offline', action='store_true', help='Only fill wikipedia_url from the cache')
     args = p.parse_args()
-    main(limit=args.limit, override_delay=args.delay)
+    main(args.limit, args.delay, args.negative_ttl, args.offline)
@@ -12,17 +12,16 @@ Defaults:
   --limit: None (process all)
   --delay: 1 (seconds between API queries to avoid throttling)
 
-Backups the original file to `data/herbs.json.wiki_api.bak`.
+Snapshots the original data as 'wiki_api' (see snapshots.py).
 """
 import argparse
-from pathlib import Path
-import json, shutil, time, unicodedata, re
+import time
 import requests
 from urllib.parse import quote_plus
+from herbstore import HerbStore, DATA
+from textnorm import strip_diacritics, words
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.wiki_api.bak'
+SNAPSHOT = 'wiki_api'
 
 WIKI_APIS = [
     ('cs', 'https://cs.wikipedia.org/w/api.php'),
@@ -51,42 +50,30 @@ def best_candidate_from_search(results, name):
     # pick candidate by simple heuristics: exact title match, title contains name tokens, else top
     name_norm = (name or '').strip().lower()
     name_no_diac = strip_diacritics(name_norm)
-    for item in results:
-        title = (item.get('title') or '').strip()
-        tnorm = title.lower()
+    titles = [(item.get('title') or '').strip() for item in results]
+    lowered = [t.lower() for t in titles]
+    for title, tnorm in zip(titles, lowered):
         if tnorm == name_norm or strip_diacritics(tnorm) == name_no_diac:
             return title
     # look for title containing any important token
-    tokens = [t for t in re_split_tokens(name_norm) if len(t) > 2]
-    for item in results:
-        title = (item.get('title') or '').strip()
-        tnorm = title.lower()
-        for tk in tokens:
-            if tk in tnorm or strip_diacritics(tnorm).find(strip_diacritics(tk)) != -1:
+    tokens = [(t, strip_diacritics(t)) for t in words(name_norm) if len(t) > 2]
+    for title, tnorm in zip(titles, lowered):
+        stripped = strip_diacritics(tnorm)
+        for tk, tk_stripped in tokens:
+            if tk in tnorm or tk_stripped in stripped:
                 return title
     return results[0].get('title')
 
-def strip_diacritics(s):
-    if not s:
-        return s
-    nkfd = unicodedata.normalize('NFKD', s)
-    return ''.join([c for c in nkfd if not unicodedata.combining(c)])
-
-def re_split_tokens(s):
-    return [p for p in re.split(r"[^\w]+", s) if p]
-
 def main(limit=None, delay=1):
     if not DATA.exists():
         print('data/herbs.json not found')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        herbs = json.load(f)
+    store = HerbStore.load()
 
     session = requests.Session()
     # set a polite User-Agent so Wikimedia APIs don't reject requests
     session.headers.update({'User-Agent': 'herbar-bot/1.0 (+https://example.org) python-requests'})
-    to_check = [h for h in herbs if not h.get('wikipedia_url')]
+    to_check = store.missing('wikipedia_url')
     total = len(to_check)
     print(f'Total herbs to check via API: {total}')
     processed = 0
@@ -104,7 +91,7 @@ def main(limit=None, delay=1):
         if nd and nd != name:
             variants.append(nd)
         # tokens
-        toks = re_split_tokens(name)
+        toks = words(name)
         if toks:
             if len(toks) > 1:
                 variants.append(' '.join(toks[:2]))
@@ -117,9 +104,8 @@ def main(limit=None, delay=1):
                 title = best_candidate_from_search(results, name)
                 if title:
                     url = f'https://{lang}.wikipedia.org/wiki/' + quote_plus(title.replace(' ', '_'))
-                    herb['wikipedia_url'] = url
-                    herb.setdefault('wikipedia_match', {})
-                    herb['wikipedia_match'].update({'lang': lang, 'title': title, 'query': q})
+                    match = {**(herb.get('wikipedia_match') or {}), 'lang': lang, 'title': title, 'query': q}
+                    store.update(herb['id'], wikipedia_url=url, wikipedia_match=match)
                     found_url = url
                     print(f'Found {herb.get("name")} → {url} (query={q})')
                     break
@@ -132,10 +118,8 @@ def main(limit=None, delay=1):
         # pause between herbs
         time.sleep(delay)
 
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
-    print(f'Done. Processed {processed} herbs. Backup: {BACKUP}')
+    store.save(snapshot=SNAPSHOT)
+    print(f'Done. Processed {processed} herbs. Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
@@ -5,7 +5,7 @@ Behavior:
 - For each herb without `wikipedia_url`, query Google search page for "{name} wiki".
 - Parse the first 5 results and choose the first Wikipedia link (cs or en).
 - If none of the first 5 are Wikipedia, leaves the field empty.
-- Adds a backup `data/herbs.json.google.bak` and writes changes atomically.
+- Snapshots the original data as 'google' (see snapshots.py) and writes changes atomically.
 
 Usage:
   python scripts/populate_wikipedia_via_google.py --limit 10 --delay 1
@@ -14,14 +14,12 @@ Notes:
 - This scrapes Google search HTML and tries to mimic a browser. If Google blocks requests
   (captcha, unusual traffic), the script will stop and report the issue.
 """
-from pathlib import Path
-import time, json, shutil, argparse, re
+import time, argparse, re
 import requests
 from urllib.parse import quote_plus, urlparse, unquote
+from herbstore import HerbStore, DATA
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.google.bak'
+SNAPSHOT = 'google'
 
 UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36'
 
@@ -70,13 +68,11 @@ def main(limit=None, delay=1):
     if not DATA.exists():
         print('data/herbs.json not found at', DATA)
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        herbs = json.load(f)
+    store = HerbStore.load()
 
     session = requests.Session()
     processed = 0
-    to_check = [h for h in herbs if not h.get('wikipedia_url')]
+    to_check = store.missing('wikipedia_url')
     print('Total to check via Google:', len(to_check))
 
     for i, herb in enumerate(to_check):
@@ -91,16 +87,14 @@ def main(limit=None, delay=1):
             break
         if res['found']:
             print('Found Wikipedia link:', res['found'])
-            herb['wikipedia_url'] = res['found']
+            store.update(herb['id'], wikipedia_url=res['found'])
         else:
             print('No Wikipedia in first 5 results for', name)
         processed += 1
         time.sleep(delay)
 
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
-    print(f'Done. Processed {processed} herbs (limited). Backup at {BACKUP}')
+    store.save(snapshot=SNAPSHOT)
+    print(f'Done. Processed {processed} herbs (limited). Snapshot: {SNAPSHOT}')
 
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
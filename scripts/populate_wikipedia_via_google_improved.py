@@ -10,21 +10,16 @@ Wikipedia link found. If none found for both queries, leaves wikipedia_url empty
 
 Use --limit to test only a subset.
 """
-from pathlib import Path
-import argparse, time, json, shutil, unicodedata
+import argparse, time
 import requests, re
 from urllib.parse import quote_plus, unquote, urlparse
+from herbstore import HerbStore, DATA
+from textnorm import strip_diacritics
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.google.improved.bak'
+SNAPSHOT = 'google_improved'
 
 UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36'
 
-def strip_diacritics(s):
-    nkfd = unicodedata.normalize('NFKD', s)
-    return ''.join([c for c in nkfd if not unicodedata.combining(c)])
-
 def extract_google_results(html, max_results=5):
     pattern = re.compile(r'/url\?q=(https?://[^&"\']+)', re.I)
     found = pattern.findall(html)
@@ -62,12 +57,10 @@ def main(limit=None, delay=1.0):
     if not DATA.exists():
         print('data/herbs.json not found')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        herbs = json.load(f)
+    store = HerbStore.load()
 
     session = requests.Session()
-    to_check = [h for h in herbs if not h.get('wikipedia_url')]
+    to_check = store.missing('wikipedia_url')
     print('To check:', len(to_check))
     processed = 0
 
@@ -89,7 +82,7 @@ def main(limit=None, delay=1.0):
                 return
             if res['found']:
                 print('Found:', res['found'])
-                herb['wikipedia_url'] = res['found']
+                store.update(herb['id'], wikipedia_url=res['found'])
                 found = res['found']
                 break
             else:
@@ -99,10 +92,8 @@ def main(limit=None, delay=1.0):
         processed += 1
         time.sleep(delay)
 
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(herbs, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
-    print('Done. Processed', processed, 'items. Backup at', BACKUP)
+    store.save(snapshot=SNAPSHOT)
+    print('Done. Processed', processed, 'items. Snapshot:', SNAPSHOT)
 
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Write pre-compressed `.br` and `.gz` siblings for shipped text artifacts.
+
+Behavior:
+- Walks the shipped artifacts: out/, public/ and the exported site data in
+  data/site/ (or the given --root directories) for JSON, SVG, CSS, JS, HTML,
+  TXT and XML files.
+- Compresses changed files in parallel at maximum level: gzip -9 (mtime 0, so
+  output is reproducible) and Brotli quality 11 when the `brotli` package is
+  installed.
+- Content hashes are kept in data/precompress-cache.json; files whose hash is
+  unchanged and whose siblings exist are skipped.
+- A sibling is only written when it is smaller than the original.
+- Siblings under the roots whose original is gone or now below --min-size
+  are deleted.
+- The cache is merged with earlier runs (so running over one root keeps the
+  others' entries); only entries of files that no longer exist are dropped.
+
+Usage:
+  python scripts/precompress.py [--root out] [--min-size 256] [--force]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE = ROOT / 'data' / 'precompress-cache.json'
+DEFAULT_ROOTS = [ROOT / 'out', ROOT / 'public', ROOT / 'data' / 'site']
+EXTENSIONS = {'.json', '.svg', '.css', '.js', '.html', '.txt', '.xml'}
+
+def _write(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def compress_one(path):
+    data = path.read_bytes()
+    row = {'path': path.relative_to(ROOT).as_posix(), 'size': len(data), 'gz': None, 'br': None}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        _write(path.with_name(path.name + '.gz'), gz)
+        row['gz'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+        if len(br) < len(data):
+            _write(path.with_name(path.name + '.br'), br)
+            row['br'] = len(br)
+    return row
+
+def sha256(path):
+    h = hashlib.sha256()
+    with path.open('rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def siblings_present(path):
+    gz = path.with_name(path.name + '.gz').exists()
+    br = brotli is None or path.with_name(path.name + '.br').exists()
+    return gz and br
+
+def stale_siblings(roots, min_size):
+    """.gz/.br files whose original is missing or would no longer be compressed."""
+    for root in roots:
+        if not root.exists():
+            continue
+        for p in sorted(root.rglob('*')):
+            if p.suffix not in ('.gz', '.br') or not p.is_file():
+                continue
+            src = p.with_suffix('')
+            if src.suffix.lower() in EXTENSIONS and (not src.exists() or src.stat().st_size < min_size):
+                yield p
+
+def find_files(roots, min_size):
+    for root in roots:
+        if not root.exists():
+            continue
+        for p in sorted(root.rglob('*')):
+            if p.is_file() and p.suffix.lower() in EXTENSIONS and p != CACHE and p.stat().st_size >= min_size:
+                yield p
+
+def main(roots=None, min_size=256, force=False, workers=None):
+    if brotli is None:
+        print('brotli package not installed; writing .gz only (pip install brotli)')
+    roots = roots or DEFAULT_ROOTS
+    cache = {}
+    if CACHE.exists():
+        with CACHE.open('r', encoding='utf-8') as f:
+            cache = json.load(f)
+
+    stale = list(stale_siblings(roots, min_size))
+    for p in stale:
+        p.unlink()
+        cache.pop(p.with_suffix('').relative_to(ROOT).as_posix(), None)
+
+    todo = []
+    hashes = {}
+    for p in find_files(roots, min_size):
+        key = p.relative_to(ROOT).as_posix()
+        hashes[key] = sha256(p)
+        if force or cache.get(key) != hashes[key] or not siblings_present(p):
+            todo.append(p)
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        rows = list(ex.map(compress_one, todo, chunksize=4))
+
+    total, total_gz, total_br = 0, 0, 0
+    for r in rows:
+        total += r['size']
+        total_gz += r['gz'] or r['size']
+        total_br += r['br'] or r['size']
+        gz = f"{r['gz']} ({100 - 100 * r['gz'] // r['size']}% saved)" if r['gz'] else '-'
+        br = f"{r['br']} ({100 - 100 * r['br'] // r['size']}% saved)" if r['br'] else '-'
+        print(f"{r['path']}: {r['size']} -> gz {gz}, br {br}")
+
+    # keep other roots' entries; drop only those of files that no longer exist
+    cache = {k: v for k, v in cache.items() if (ROOT / k).exists()}
+    cache.update(hashes)
+    with CACHE.with_suffix('.tmp').open('w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+    CACHE.with_suffix('.tmp').replace(CACHE)
+    print(f'Done. Compressed {len(rows)} files, {len(hashes) - len(rows)} unchanged, '
+          f'{len(stale)} stale siblings removed. '
+          f'{total} bytes -> gz {total_gz}' + (f', br {total_br}' if brotli else ''))
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--root', action='append', default=None, help='Directory to process (repeatable)')
+    p.add_argument('--min-size', type=int, default=256, help='Skip files smaller than this many bytes')
+    p.add_argument('--force', action='store_true', help='Ignore the hash cache')
+    p.add_argument('--workers', type=int, default=None)
+    args = p.parse_args()
+    roots = [Path(r).resolve() for r in args.root] if args.root else None
+    main(roots=roots, min_size=args.min_size, force=args.force, workers=args.workers)
@@ -1,58 +1,19 @@
 #!/usr/bin/env python3
-from pathlib import Path
-import json, shutil
+"""Strip the disclaimer and other boilerplate listed in data/boilerplate-patterns.txt.
 
-ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / 'data' / 'herbs.json'
-BACKUP = ROOT / 'data' / 'herbs.json.variants.bak'
+Kept for compatibility; equivalent to `python scripts/boilerplate.py strip`.
+"""
+from boilerplate import process_record
+from herbio import stream_update
+from herbstore import DATA
 
-variants = [
-    'Obrázky jsou pouze ilustrační. Máte vlastní foto receptu? Nahrajte jej pomocí našíaplikace, dostupné pro iOS, iPadOS, macOS a Android.',
-    'Obrázky jsou pouze ilustrační. Máte vlastní foto receptu? Nahrajte jej pomocí naší aplikace, dostupné pro iOS, iPadOS, macOS a Android.',
-    'Obrázky jsou pouze ilustrační.',
-    'Obrazky jsou pouze ilustracni. Mate vlastni foto receptu? Nahrajte jej pomocí nasiaplikace, dostupne pro iOS, iPadOS, macOS a Android.',
-    'Obrazky jsou pouze ilustracni. Mate vlastni foto receptu? Nahrajte jej pomoci nasi aplikace, dostupne pro iOS, iPadOS, macOS a Android.',
-    'Obrazky jsou pouze ilustracni.'
-]
-
-def replace_in_obj(o):
-    if isinstance(o, str):
-        s = o
-        c = 0
-        for v in variants:
-            if v in s:
-                s = s.replace(v, '').strip()
-                c += 1
-        return s, c
-    if isinstance(o, list):
-        total = 0
-        new = []
-        for v in o:
-            nv, tc = replace_in_obj(v)
-            new.append(nv)
-            total += tc
-        return new, total
-    if isinstance(o, dict):
-        total = 0
-        new = {}
-        for k, v in o.items():
-            nv, tc = replace_in_obj(v)
-            new[k] = nv
-            total += tc
-        return new, total
-    return o, 0
+SNAPSHOT = 'variants'
 
 def main():
     if not DATA.exists():
         print('no data')
         return
-    shutil.copy2(DATA, BACKUP)
-    with DATA.open('r', encoding='utf-8') as f:
-        data = json.load(f)
-    new, count = replace_in_obj(data)
-    with (DATA.with_suffix('.tmp')).open('w', encoding='utf-8') as f:
-        json.dump(new, f, ensure_ascii=False, indent=2)
-    (DATA.with_suffix('.tmp')).replace(DATA)
+    _, _, count = stream_update(process_record, DATA, snapshot=SNAPSHOT)
     print('Replacements made (variants):', count)
 
 if __name__=='__main__':
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Sanitize section content once, at data-build time.
+
+Each section is parsed with html.parser and rebuilt from an allowlist of tags
+and attributes. Script-like elements are dropped with their content. Other
+unknown tags are unwrapped (their text is kept). Links keep only http(s),
+mailto and relative URLs. Unclosed tags are closed. Plain-text sections
+(no markup) are escaped, with blank lines becoming paragraphs and single
+newlines becoming <br>.
+
+The record gets:
+- `sections_html`: heading -> sanitized HTML, rendered as is by the detail page;
+- `sections_text`: heading -> plain text (paragraphs separated by a blank
+  line), used by the summaries, the search index, similar herbs and template
+  clustering instead of stripping tags again;
+- `sanitizer`: {"version": VERSION, "source": hash of `sections`}. A record is
+  processed again only when its sections or VERSION change.
+
+Usage:
+  python scripts/sanitize_html.py [--force] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from herbio import iter_records, stream_update
+from herbstore import DATA
+
+SNAPSHOT = 'sanitize'
+# bump when the allowlist or the text rendering changes
+VERSION = 2
+
+ALLOWED = {
+    'p': (), 'br': (), 'b': (), 'strong': (), 'i': (), 'em': (), 'u': (), 'small': (), 'sub': (), 'sup': (),
+    'ul': (), 'ol': (), 'li': (), 'dl': (), 'dt': (), 'dd': (), 'blockquote': (), 'code': (),
+    'h3': (), 'h4': (), 'h5': (), 'table': (), 'thead': (), 'tbody': (), 'tr': (),
+    'th': ('colspan', 'rowspan'), 'td': ('colspan', 'rowspan'),
+    'a': ('href', 'title'), 'img': ('src', 'alt', 'width', 'height'),
+}
+# dropped together with everything inside them
+DROP = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math', 'form', 'head', 'title'}
+VOID = {'br', 'img', 'hr', 'wbr', 'input', 'meta', 'link', 'source', 'area', 'col', 'param', 'embed'}
+# tags after which the plain text gets a line break / paragraph break
+LINE = {'br', 'li', 'tr', 'dt', 'dd'}
+CELL = {'td', 'th'}
+BLOCK = {'p', 'div', 'ul', 'ol', 'dl', 'table', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section'}
+URL_ATTRS = {'href', 'src'}
+# an open tag that is closed implicitly when one of these starts (<li>a<li>b)
+IMPLIED = {'li': {'li'}, 'p': {'p'}, 'dt': {'dt', 'dd'}, 'dd': {'dt', 'dd'},
+           'tr': {'tr', 'td', 'th'}, 'td': {'td', 'th'}, 'th': {'td', 'th'}}
+
+_SAFE_URL_RE = re.compile(r'^(?:https?:|mailto:|[/#]|[^:]*$)', re.I)
+_TAG_RE = re.compile(r'<[a-zA-Z/!]')
+_WS_RE = re.compile(r'[ \t\r\f\v]+')
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP:
+            if tag not in VOID:
+                self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in LINE:
+            self.text.append('\n')
+        elif tag in CELL:
+            self.text.append(' ')
+        elif tag in BLOCK:
+            self.text.append('\n\n')
+        allowed = ALLOWED.get(tag)
+        if allowed is None:
+            return
+        out = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            value = value.strip()
+            if name in URL_ATTRS and not _SAFE_URL_RE.match(value):
+                continue
+            out.append(f' {name}="{escape(value, quote=True)}"')
+        if tag == 'img' and not any(o.startswith(' src=') for o in out):
+            return
+        if tag == 'a':
+            out.append(' rel="nofollow noopener noreferrer"')
+        while self.open and self.open[-1] in IMPLIED.get(tag, ()):
+            self.html.append(f'</{self.open.pop()}>')
+        self.html.append(f'<{tag}{"".join(out)}>')
+        if tag not in VOID:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP:
+            # <svg/> has no content and no end tag to stop dropping at
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in self.open and tag not in VOID and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK:
+            self.text.append('\n\n')
+        if tag not in self.open:
+            return
+        # close anything left open inside this element
+        while self.open:
+            t = self.open.pop()
+            self.html.append(f'</{t}>')
+            if t == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self):
+        self.close()
+        while self.open:
+            self.html.append(f'</{self.open.pop()}>')
+        return ''.join(self.html).strip(), _clean_text(''.join(self.text))
+
+def _clean_text(text):
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        lines = [_WS_RE.sub(' ', line).strip() for line in block.split('\n')]
+        block = '\n'.join(line for line in lines if line)
+        if block:
+            paragraphs.append(block)
+    return '\n\n'.join(paragraphs)
+
+def _plain(text):
+    """(html, text) for a section without markup."""
+    text = _clean_text(text)
+    html = ''.join(f"<p>{escape(p, quote=False).replace(chr(10), '<br>')}</p>" for p in text.split('\n\n') if p)
+    return html, text
+
+def sanitize(content):
+    """Return (sanitized HTML, plain text) of one section."""
+    if not isinstance(content, str) or not content.strip():
+        return '', ''
+    if not _TAG_RE.search(content):
+        return _plain(content)
+    parser = _Sanitizer()
+    parser.feed(content)
+    return parser.result()
+
+def source_hash(sections):
+    data = json.dumps(sections, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+def process_record(herb, force=False):
+    """Pipeline stage: (re)build sections_html/sections_text when stale; return 1 if rebuilt."""
+    sections = herb.get('sections')
+    if not isinstance(sections, dict):
+        return 0
+    stamp = {'version': VERSION, 'source': source_hash(sections)}
+    if not force and herb.get('sanitizer') == stamp:
+        return 0
+    html, text = {}, {}
+    for heading, content in sections.items():
+        html[heading], text[heading] = sanitize(content)
+    herb['sections_html'] = html
+    herb['sections_text'] = text
+    herb['sanitizer'] = stamp
+    return 1
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--force', action='store_true', help='Rebuild every record, not only stale ones')
+    p.add_argument('--dry-run', action='store_true')
+    args = p.parse_args()
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    process = lambda herb: process_record(herb, args.force)
+    if args.dry_run:
+        records = changed = 0
+        for herb in iter_records(DATA):
+            records += 1
+            changed += process(herb)
+    else:
+        records, changed, _ = stream_update(process, DATA, snapshot=SNAPSHOT)
+    print(f'Done. {changed} of {records} records sanitized (version {VERSION})'
+          + (' (dry run).' if args.dry_run else f'. Snapshot: {SNAPSHOT}'))
+
+if __name__ == '__main__':
+    main()
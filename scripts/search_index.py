@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Build the inverted search index used by the index page.
+
+Tokens are folded (lower case, no diacritics: "Šalvěj" -> "salvej") and taken
+from name, other_names, latin, summary and section text. Each (term, herb)
+pair gets a BM25 weight computed here, with field boosts (a match in the name
+counts more than one in a section). The client (lib/searchIndex.js) then only
+looks terms up and adds weights; the last query word is matched as a prefix
+by binary search over the sorted term list once it has MIN_PREFIX characters
+(until then it is ignored, like a stopword). Of the terms with that prefix,
+the MAX_EXPANSIONS found in the most herbs count (a herb scores its best weight
+among them), so the cost of a keystroke does not grow with the index.
+
+Written as public/data/search-index.json by export_site_data.py:
+
+    {"version": 1, "ids": [herb ids], "terms": [sorted terms],
+     "postings": [[doc, weight, doc, weight, ...] per term]}
+
+where `doc` indexes `ids` and `weight` is the BM25 score times 100, rounded.
+
+Usage:
+  python scripts/search_index.py [--out FILE]
+  python scripts/search_index.py query "salvej lek"
+  python scripts/search_index.py --bench 5000
+"""
+import argparse
+import bisect
+import heapq
+import json
+import math
+import re
+import time
+from pathlib import Path
+
+from herbio import iter_records
+from herbstore import DATA, ROOT
+from textnorm import fold
+
+OUT = ROOT / 'public' / 'data' / 'search-index.json'
+VERSION = 1
+
+# field -> boost, applied to term frequencies before BM25
+FIELDS = (('name', 3.0), ('other_names', 2.5), ('latin', 2.0), ('summary', 1.0), ('sections', 1.0))
+K1 = 1.2
+B = 0.75
+SCALE = 100
+MIN_PREFIX = 2
+MAX_EXPANSIONS = 64
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+TAG_RE = re.compile(r'<[^>]+>')
+# folded; too common to be useful for filtering
+STOPWORDS = frozenset('''
+    a i k o s u v z na ve ze se je to do od po pro pri za ze by jak jako nebo ale
+    tak ten ta ty jsou byl bylo jeho jeji ktery ktera ktere kde ci take
+'''.split())
+
+def tokens(text):
+    return [t for t in TOKEN_RE.findall(fold(TAG_RE.sub(' ', text))) if t not in STOPWORDS]
+
+def field_texts(herb):
+    for field, boost in FIELDS:
+        # plain section text from sanitize_html.py when available
+        v = (field == 'sections' and herb.get('sections_text')) or herb.get(field)
+        if isinstance(v, str):
+            yield boost, v
+        elif isinstance(v, list):
+            for x in v:
+                if isinstance(x, str):
+                    yield boost, x
+        elif isinstance(v, dict):
+            for x in v.values():
+                if isinstance(x, str):
+                    yield boost, x
+
+class IndexBuilder:
+    """Collect weighted term frequencies record by record, then score them."""
+
+    def __init__(self):
+        self.ids = []
+        self.docs = []
+        self.lengths = []
+
+    def add(self, herb):
+        tf = {}
+        length = 0.0
+        for boost, text in field_texts(herb):
+            for t in tokens(text):
+                tf[t] = tf.get(t, 0.0) + boost
+                length += boost
+        self.ids.append(herb.get('id'))
+        self.docs.append(tf)
+        self.lengths.append(length)
+
+    def build(self):
+        n = len(self.ids)
+        avg = (sum(self.lengths) / n) if n else 1.0
+        df = {}
+        for tf in self.docs:
+            for t in tf:
+                df[t] = df.get(t, 0) + 1
+        idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+        postings = {t: [] for t in df}
+        for doc, (tf, length) in enumerate(zip(self.docs, self.lengths)):
+            norm = K1 * (1 - B + B * length / (avg or 1.0))
+            for t, f in tf.items():
+                score = idf[t] * f * (K1 + 1) / (f + norm)
+                postings[t].extend((doc, max(1, round(score * SCALE))))
+        terms = sorted(postings)
+        return {'version': VERSION, 'ids': self.ids, 'terms': terms, 'postings': [postings[t] for t in terms]}
+
+def build_index(records):
+    builder = IndexBuilder()
+    for herb in records:
+        builder.add(herb)
+    return builder.build()
+
+# -- query (same algorithm as lib/searchIndex.js) ---------------------------
+
+def _term_scores(index, term, prefix):
+    terms = index['terms']
+    scores = {}
+    i = bisect.bisect_left(terms, term)
+    if not prefix:
+        if i < len(terms) and terms[i] == term:
+            p = index['postings'][i]
+            scores = dict(zip(p[::2], p[1::2]))
+        return scores
+    # terms are [a-z0-9]+ and '{' sorts after 'z': the range of terms with the prefix
+    end = bisect.bisect_left(terms, term + '{', i)
+    matched = range(i, end)
+    if len(matched) > MAX_EXPANSIONS:
+        # the terms found in the most herbs, ties in term order
+        matched = heapq.nsmallest(MAX_EXPANSIONS, matched, key=lambda t: (-len(index['postings'][t]), t))
+    for t in matched:
+        p = index['postings'][t]
+        for doc, w in zip(p[::2], p[1::2]):
+            if w > scores.get(doc, 0):
+                scores[doc] = w
+    return scores
+
+def search(index, query):
+    """Return matching herb ids, best first; every query word must match."""
+    words = TOKEN_RE.findall(fold(query))
+    if not words:
+        return None
+    prefix = not query[-1:].isspace()
+    parts = [(w, prefix and i == len(words) - 1) for i, w in enumerate(words)]
+    parts = [(w, p) for w, p in parts if (len(w) >= MIN_PREFIX if p else w not in STOPWORDS)]
+    total = None
+    for w, p in parts:
+        scores = _term_scores(index, w, p)
+        if total is None:
+            total = scores
+        else:
+            total = {d: s + scores[d] for d, s in total.items() if d in scores}
+        if not total:
+            return []
+    if total is None:
+        return None
+    return [index['ids'][d] for d, _ in sorted(total.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+def write_index(index, path=OUT):
+    """Write the index as compact JSON unless unchanged; return True if written."""
+    from export_site_data import write_if_changed
+    return write_if_changed(path, index)
+
+def bench(n):
+    from herbrecord import synthetic
+    t0 = time.perf_counter()
+    index = build_index(synthetic(n))
+    t1 = time.perf_counter()
+    queries = ['salvej', 'sal', 'mata', 'lecive ucinky', 'caj z', 'bylinka ko', 'p', 'pr']
+    rounds = 200
+    for _ in range(rounds):
+        for q in queries:
+            search(index, q)
+    t2 = time.perf_counter()
+    size = len(json.dumps(index, separators=(',', ':')))
+    print(json.dumps({'records': n, 'terms': len(index['terms']), 'bytes': size, 'build_s': round(t1 - t0, 2),
+                      'query_ms': round((t2 - t1) * 1000 / (rounds * len(queries)), 3)}))
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('command', nargs='?', choices=['build', 'query'], default='build')
+    p.add_argument('text', nargs='?', help='Query text for `query`')
+    p.add_argument('--out', default=str(OUT))
+    p.add_argument('--bench', type=int, metavar='N', help='Build an index of N synthetic records and time queries')
+    args = p.parse_args()
+    if args.bench:
+        bench(args.bench)
+        return
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    index = build_index(iter_records(DATA))
+    if args.command == 'query':
+        for herb_id in (search(index, args.text or '') or [])[:20]:
+            print(herb_id)
+        return
+    written = write_index(index, Path(args.out))
+    print(f"Done. {len(index['ids'])} herbs, {len(index['terms'])} terms"
+          + ('' if written else ' (unchanged)') + f'. Index: {args.out}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Canonical section headings and the alias table that maps source headings to them.
+
+Section keys in `sections` are display headings ("Popis", "Léčivé účinky").
+Sources use many variants for the same section ("Vzhled", "Zdravotní přínosy",
+"Kde a kdy sbírat"). TAXONOMY lists each canonical heading with its aliases.
+They are folded (case, diacritics, punctuation) once into ALIASES, so mapping
+a heading is a single dict lookup, and each distinct heading is mapped only
+once (lru_cache). Headings that are not in the taxonomy keep their own text,
+with whitespace collapsed.
+
+fetch_herbs.py stores canonical headings at ingest, and the `sections` pipeline
+stage rewrites older records. Consumers (the detail page, populate_summaries.py)
+then look sections up directly by heading.
+
+Usage:
+  python scripts/section_taxonomy.py [--dry-run]    # canonicalize data/herbs.json, list unmapped headings
+"""
+import argparse
+import re
+from collections import Counter
+from functools import lru_cache
+
+from herbio import iter_records, stream_update
+from herbstore import DATA
+from textnorm import fold
+
+SNAPSHOT = 'sections'
+
+# canonical heading -> aliases (written naturally; folded when ALIASES is built).
+# The first seven are the sections the detail page always shows, in this order.
+TAXONOMY = (
+    ('Popis', ('Vzhled', 'Popis a vzhled', 'Popis a použití', 'Botanický popis', 'Charakteristika', 'Úvod')),
+    ('Použití', ('Použití v kuchyni', 'Kulinářské použití', 'Využití', 'Použití a účinky')),
+    ('Pěstování', ('Pěstování a péče', 'Péče', 'Pěstování na zahradě')),
+    ('Léčivé účinky', ('Zdravotní přínosy', 'Účinky', 'Léčivé vlastnosti', 'Léčitelství', 'Využití v léčitelství')),
+    ('Složení', ('Obsahové látky', 'Účinné látky', 'Obsah látek')),
+    ('Sběr', ('Kde a kdy sbírat', 'Kde kdy sbírat', 'Sběr a sušení', 'Sušení')),
+    ('Recepty', ('Recept',)),
+    ('Skladování', ('Uchovávání',)),
+    ('Masti', ('Mast',)),
+)
+DISPLAY = tuple(title for title, _ in TAXONOMY[:7])
+CANONICAL = frozenset(title for title, _ in TAXONOMY)
+
+_PUNCT_RE = re.compile(r'[^a-z0-9]+')
+
+def heading_key(text):
+    """Folded lookup key: "Kde a kdy sbírat?" -> "kde a kdy sbirat"."""
+    return _PUNCT_RE.sub(' ', fold(text)).strip()
+
+ALIASES = {heading_key(alias): title for title, aliases in TAXONOMY for alias in (title, *aliases)}
+
+@lru_cache(maxsize=4096)
+def canonical_heading(text):
+    if not text:
+        return ''
+    return ALIASES.get(heading_key(text)) or ' '.join(text.split())
+
+def canonicalize(sections):
+    """Return `sections` keyed by canonical headings; texts of merged headings are joined."""
+    out = {}
+    for heading, text in sections.items():
+        key = canonical_heading(heading) or heading
+        if key in out and isinstance(out[key], str) and isinstance(text, str):
+            out[key] = '\n\n'.join(t for t in (out[key], text) if t.strip())
+        else:
+            out[key] = text
+    return out
+
+def process_record(herb):
+    """Pipeline stage: rename section headings to canonical ones in place; return 1 if changed."""
+    sections = herb.get('sections')
+    if not isinstance(sections, dict):
+        return 0
+    new = canonicalize(sections)
+    if list(new.items()) == list(sections.items()):
+        return 0
+    herb['sections'] = new
+    return 1
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--dry-run', action='store_true', help='Only report which headings would change')
+    args = p.parse_args()
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    unmapped = Counter()
+    def process(herb):
+        for heading in (herb.get('sections') or {}):
+            if canonical_heading(heading) not in CANONICAL:
+                unmapped[heading] += 1
+        return process_record(herb)
+    if args.dry_run:
+        records = changed = 0
+        for herb in iter_records(DATA):
+            records += 1
+            changed += process(herb)
+    else:
+        records, changed, _ = stream_update(process, DATA, snapshot=SNAPSHOT)
+    for heading, n in unmapped.most_common(30):
+        print(f'{n:>7}  {heading}')
+    print(f'Done. {changed} of {records} records with renamed sections, '
+          f'{len(unmapped)} headings outside the taxonomy'
+          + (' (dry run).' if args.dry_run else f'. Snapshot: {SNAPSHOT}'))
+
+if __name__ == '__main__':
+    main()
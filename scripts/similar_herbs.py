@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Store the most similar herbs of each record in `similar` (TF-IDF cosine).
+
+Behavior:
+- Tokenizes summary and section text like the search index (folded, no
+  stopwords) and builds a sparse TF-IDF matrix (SciPy CSR, sublinear tf,
+  rows L2-normalized). Terms found in only one record or in more than half of
+  them are dropped: they cannot make two records similar.
+- Cosine scores are computed in row chunks (sparse product, densified per
+  chunk), so memory stays at about --chunk-cells floats whatever the dataset
+  size; the top --k neighbours with a score of at least --min-score are kept.
+- Records that template_clusters.py marked as `template` are neither given
+  neighbours nor offered as one.
+- With --changed-since TIMESTAMP only records whose summary, sections or
+  template label (`content_quality`) changed since then (change feed, see changes.py) are recomputed, together
+  with the records that list them, that they now list, or whose score against
+  a changed record reaches their current k-th score (they may now rank it).
+  IDF is always taken from the whole dataset. The result is the same as a full
+  run, except when unchanged records' IDF shifted enough to reorder their
+  neighbours.
+
+Usage:
+  python scripts/similar_herbs.py [--k 6] [--changed-since 2026-10-19T10:00:00Z] [--dry-run]
+  python scripts/similar_herbs.py --bench 100000
+"""
+import argparse
+import json
+import math
+import time
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from changes import read as read_feed
+from herbio import iter_records, stream_update
+from herbstore import DATA
+from search_index import tokens
+from template_clusters import record_text
+
+SNAPSHOT = 'similar'
+# fields that change a record's vector or whether it takes part (content_quality)
+TEXT_FIELDS = {'summary', 'sections', 'sections_text', 'content_quality'}
+K = 6
+MIN_SCORE = 0.1
+MAX_DF = 0.5
+CHUNK_CELLS = 1 << 24
+
+def tfidf(texts, max_df=MAX_DF):
+    """Return the L2-normalized TF-IDF CSR matrix (float32) of `texts`."""
+    counts = [Counter(tokens(t)) for t in texts]
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    n = len(texts)
+    limit = max(2, max_df * n)
+    vocab = {t: i for i, t in enumerate(t for t, d in df.items() if 2 <= d <= limit)}
+    idf = np.zeros(len(vocab), dtype=np.float32)
+    for t, i in vocab.items():
+        idf[i] = np.log((1 + n) / (1 + df[t])) + 1
+    indptr = [0]
+    indices = []
+    data = []
+    for c in counts:
+        for t, f in c.items():
+            i = vocab.get(t)
+            if i is not None:
+                indices.append(i)
+                data.append(1 + math.log(f))
+        indptr.append(len(indices))
+    x = sparse.csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32),
+                           np.array(indptr, dtype=np.int64)), shape=(n, len(vocab)))
+    x = x.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(x).tocsr().astype(np.float32)
+
+def top_k(x, rows, allowed, k=K, min_score=MIN_SCORE, chunk_cells=CHUNK_CELLS):
+    """Yield (row, [(col, score), ...] best first) for each of `rows`."""
+    n = x.shape[0]
+    xt = x.T.tocsc()
+    step = max(1, chunk_cells // max(n, 1))
+    blocked = ~allowed
+    for start in range(0, len(rows), step):
+        chunk = rows[start:start + step]
+        scores = (x[chunk] @ xt).toarray()
+        scores[:, blocked] = -1
+        scores[np.arange(len(chunk)), chunk] = -1
+        kk = min(k, n - 1)
+        if kk <= 0:
+            for r in chunk:
+                yield r, []
+            continue
+        best = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        for i, r in enumerate(chunk):
+            cols = best[i][np.argsort(-scores[i, best[i]], kind='stable')]
+            yield r, [(int(c), float(scores[i, c])) for c in cols if scores[i, c] >= min_score]
+
+def best_against(x, rows, allowed, chunk_cells=CHUNK_CELLS):
+    """Best score of every record against any of `rows` (itself excluded)."""
+    n = x.shape[0]
+    xt = x.T.tocsc()
+    step = max(1, chunk_cells // max(n, 1))
+    best = np.full(n, -1, dtype=np.float32)
+    rows = rows[allowed[rows]]
+    for start in range(0, len(rows), step):
+        chunk = rows[start:start + step]
+        scores = (x[chunk] @ xt).toarray()
+        scores[np.arange(len(chunk)), chunk] = -1
+        best = np.maximum(best, scores.max(axis=0))
+    return best
+
+def kth_scores(x, current, position, k=K, min_score=MIN_SCORE):
+    """Score each record needs to enter its current top k (min_score when the list is not full)."""
+    n = x.shape[0]
+    out = np.full(n, min_score, dtype=np.float32)
+    full = [(i, position[sim[k - 1]]) for i, sim in enumerate(current)
+            if len(sim) >= k and sim[k - 1] in position]
+    if full:
+        rows, cols = (np.array(v, dtype=np.int64) for v in zip(*full))
+        out[rows] = np.asarray(x[rows].multiply(x[cols]).sum(axis=1)).ravel()
+    return out
+
+def changed_text_ids(since):
+    """Ids whose summary or sections changed (or that were added) since the timestamp."""
+    ids = set()
+    for e in read_feed(DATA, since):
+        if e['old'] is None or e['new'] is None or TEXT_FIELDS & set(e['fields']):
+            ids.add(e['id'])
+    return ids
+
+def bench(n):
+    from herbrecord import synthetic
+    texts = [record_text(h) for h in synthetic(n)]
+    t0 = time.perf_counter()
+    x = tfidf(texts)
+    t1 = time.perf_counter()
+    rows = np.arange(n)
+    pairs = sum(len(s) for _, s in top_k(x, rows, np.ones(n, dtype=bool)))
+    t2 = time.perf_counter()
+    print(json.dumps({'records': n, 'terms': x.shape[1], 'nnz': int(x.nnz), 'tfidf_s': round(t1 - t0, 2),
+                      'top_k_s': round(t2 - t1, 2), 'neighbours': pairs}))
+
+def main(k=K, min_score=MIN_SCORE, changed_since=None, dry_run=False, chunk_cells=CHUNK_CELLS):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    t0 = time.perf_counter()
+    ids, texts, allowed, current = [], [], [], []
+    for herb in iter_records(DATA):
+        ids.append(herb.get('id'))
+        texts.append(record_text(herb))
+        allowed.append(herb.get('content_quality') != 'template')
+        current.append(herb.get('similar') or [])
+    n = len(ids)
+    allowed = np.array(allowed, dtype=bool)
+    position = {herb_id: i for i, herb_id in enumerate(ids)}
+    x = tfidf(texts)
+
+    if changed_since:
+        changed = {position[i] for i in changed_text_ids(changed_since) if i in position}
+        changed_ids = {ids[i] for i in changed}
+        rows = set(changed)
+        # records that list a changed or removed record
+        rows.update(i for i, sim in enumerate(current)
+                    if changed_ids.intersection(sim) or any(s not in position for s in sim))
+        changed_rows = np.array(sorted(changed), dtype=np.int64)
+        for _, found in top_k(x, changed_rows[allowed[changed_rows]], allowed, k, min_score, chunk_cells):
+            rows.update(c for c, _ in found)
+        # records that may now rank a changed record in their top k
+        if len(changed_rows):
+            gain = best_against(x, changed_rows, allowed, chunk_cells) >= kth_scores(x, current, position, k, min_score)
+            rows.update(np.flatnonzero(gain & allowed).tolist())
+        rows = np.array(sorted(rows), dtype=np.int64)
+    else:
+        rows = np.arange(n)
+
+    # template records get no neighbours; only the others are scored
+    result = {ids[r]: [] for r in rows[~allowed[rows]]}
+    for r, found in top_k(x, rows[allowed[rows]], allowed, k, min_score, chunk_cells):
+        result[ids[r]] = [ids[c] for c, _ in found]
+    elapsed = time.perf_counter() - t0
+
+    changed = 0
+    if not dry_run and result:
+        def update(herb):
+            new = result.get(herb.get('id'))
+            if new is None or new == (herb.get('similar') or []):
+                return 0
+            if new:
+                herb['similar'] = new
+            else:
+                herb.pop('similar', None)
+            return 1
+        _, changed, _ = stream_update(update, DATA, snapshot=SNAPSHOT)
+
+    with_links = sum(1 for v in result.values() if v)
+    print(f'Done. {len(rows)} of {n} records scored in {elapsed:.2f} s ({x.shape[1]} terms), '
+          f'{with_links} with similar herbs, {changed} records updated'
+          + (' (dry run).' if dry_run else '.'))
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--k', type=int, default=K, help='Neighbours per herb')
+    p.add_argument('--min-score', type=float, default=MIN_SCORE, help='Minimum cosine similarity')
+    p.add_argument('--changed-since', metavar='TIMESTAMP', default=None,
+                   help='Only recompute herbs affected by text changes since this ISO timestamp (see changes.py)')
+    p.add_argument('--chunk-cells', type=int, default=CHUNK_CELLS, help='Score matrix cells held in memory at once')
+    p.add_argument('--dry-run', action='store_true')
+    p.add_argument('--bench', type=int, metavar='N', help='Time TF-IDF and top-k on N synthetic records')
+    args = p.parse_args()
+    if args.bench:
+        bench(args.bench)
+    else:
+        main(args.k, args.min_score, args.changed_since, args.dry_run, args.chunk_cells)
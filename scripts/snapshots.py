@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Deduplicated, versioned snapshots of the herb dataset.
+
+Every record is stored once as a blob, addressed by the SHA-256 of its JSON:
+
+    data/snapshots/objects/ab/ab12....json    one record per blob
+    data/snapshots/manifests/<name>.json      [id, hash] pairs in dataset order
+    data/snapshots/index.jsonl                one line per snapshot, for listing
+
+A snapshot therefore costs one manifest plus the records that changed since
+earlier snapshots, and history is kept instead of one overwritten .bak per
+script. The scripts snapshot the previous dataset automatically before they
+replace it (`stream_update(..., snapshot='cleanup')`,
+`store.save(snapshot='wiki_api')`); a snapshot identical to the latest one is
+not repeated.
+
+Usage:
+  python scripts/snapshots.py create [--label manual]
+  python scripts/snapshots.py list
+  python scripts/snapshots.py diff <name> [<other>]    # other defaults to the current dataset
+  python scripts/snapshots.py restore <name>           # snapshots the current state first
+  python scripts/snapshots.py prune --keep 20
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+# imported as a module: herbio imports this one to take snapshots on save
+import changes as changefeed
+import herbio
+from changes import field_digests
+from herbdb import HerbDB, is_sqlite_path
+
+def _blob(herb):
+    return json.dumps(herb, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+class SnapshotStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.manifests = self.root / 'manifests'
+        self.index = self.root / 'index.jsonl'
+
+    @classmethod
+    def for_dataset(cls, path):
+        """The store kept next to a dataset: data/herbs.json -> data/snapshots."""
+        return cls(Path(path).resolve().parent / 'snapshots')
+
+    def _object_path(self, digest):
+        return self.objects / digest[:2] / f'{digest}.json'
+
+    def _put(self, herb):
+        data = _blob(herb)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, False
+        _atomic_write(path, data)
+        return digest, True
+
+    def get_object(self, digest):
+        return json.loads(self._object_path(digest).read_bytes())
+
+    # -- snapshots ---------------------------------------------------------
+
+    def list(self):
+        """Snapshot summaries, oldest first."""
+        if not self.index.exists():
+            return []
+        with self.index.open('r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def resolve(self, name):
+        """Accept a full name, a unique prefix, or 'latest'."""
+        names = [s['name'] for s in self.list()]
+        if name == 'latest' and names:
+            return names[-1]
+        if name in names:
+            return name
+        matches = [n for n in names if n.startswith(name)]
+        if len(matches) != 1:
+            raise SystemExit(f'No unique snapshot matches {name!r}')
+        return matches[0]
+
+    def entries(self, name):
+        with (self.manifests / f'{name}.json').open('r', encoding='utf-8') as f:
+            return json.load(f)['records']
+
+    def store_records(self, path):
+        """Store the blobs of the dataset at `path`; return ([id, hash] pairs, new blobs)."""
+        entries = []
+        new_objects = 0
+        for herb in herbio.iter_records(path):
+            digest, new = self._put(herb)
+            new_objects += new
+            entries.append([herb.get('id'), digest])
+        return entries, new_objects
+
+    def take(self, path, label='manual'):
+        """Snapshot the dataset at `path`; return the snapshot name.
+
+        If nothing changed since the latest snapshot, its name is returned and
+        no new snapshot is written.
+        """
+        entries, new_objects = self.store_records(path)
+        history = self.list()
+        if history and not new_objects and self.entries(history[-1]['name']) == entries:
+            return history[-1]['name']
+        now = datetime.now(timezone.utc)
+        name = now.strftime('%Y%m%dT%H%M%SZ') + f'-{label}'
+        taken = {s['name'] for s in history}
+        base, n = name, 1
+        while name in taken:
+            n += 1
+            name = f'{base}-{n}'
+        info = {
+            'name': name,
+            'created': now.isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            'label': label,
+            'source': str(path),
+            'records': len(entries),
+            'new_objects': new_objects,
+        }
+        _atomic_write(self.manifests / f'{name}.json',
+                      json.dumps({**info, 'records': entries}, ensure_ascii=False).encode('utf-8'))
+        with self.index.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(info, ensure_ascii=False) + '\n')
+        return name
+
+    def diff(self, old, new):
+        """Compare two entry lists; return (added, removed, changed) ids."""
+        a = dict(map(tuple, old))
+        b = dict(map(tuple, new))
+        added = [i for i in b if i not in a]
+        removed = [i for i in a if i not in b]
+        changed = [i for i in b if i in a and a[i] != b[i]]
+        return added, removed, changed
+
+    def changed_fields(self, old_digest, new_digest):
+        a = self.get_object(old_digest)
+        b = self.get_object(new_digest)
+        return [k for k in {**a, **b} if a.get(k) != b.get(k)]
+
+    def restore(self, name, path):
+        """Replace the dataset at `path` with snapshot `name` (current state is snapshotted first).
+
+        A SQLite dataset stays a database (rows are upserted and the ids that
+        are not in the snapshot deleted). Every record that changes is
+        appended to the change feed, like any other write.
+        """
+        entries = self.entries(name)
+        with herbio.file_lock(path):
+            current = dict(map(tuple, self.entries(self.take(path, 'pre-restore')))) if Path(path).exists() else {}
+            target = dict(map(tuple, entries))
+            feed = []
+            for herb_id, digest in target.items():
+                old = current.get(herb_id)
+                if old != digest:
+                    before = field_digests(self.get_object(old)) if old else None
+                    after = field_digests(self.get_object(digest))
+                    if before != after:
+                        feed.append(changefeed.change(herb_id, before, after))
+            removed = [i for i in current if i not in target]
+            feed += [changefeed.change(i, field_digests(self.get_object(current[i])), None) for i in removed]
+            records = (self.get_object(digest) for _, digest in entries)
+            if is_sqlite_path(path):
+                with HerbDB(path) as db:
+                    db.upsert_many(records, removed=removed)
+            else:
+                with herbio.RecordWriter(path) as out:
+                    for herb in records:
+                        out.write(herb)
+            changefeed.append(path, feed)
+        return len(entries)
+
+    def prune(self, keep):
+        """Keep the newest `keep` snapshots and delete objects no longer referenced."""
+        history = self.list()
+        kept = history[-keep:] if keep > 0 else []
+        drop = history[:len(history) - len(kept)]
+        for s in drop:
+            (self.manifests / f"{s['name']}.json").unlink(missing_ok=True)
+        live = {digest for s in kept for _, digest in self.entries(s['name'])}
+        removed = 0
+        for obj in self.objects.glob('*/*.json'):
+            if obj.stem not in live:
+                obj.unlink()
+                removed += 1
+        # objects are never served; drop .gz/.br copies left by older precompress runs
+        for sibling in (*self.objects.glob('*/*.json.gz'), *self.objects.glob('*/*.json.br')):
+            sibling.unlink()
+        _atomic_write(self.index, ''.join(json.dumps(s, ensure_ascii=False) + '\n' for s in kept).encode('utf-8'))
+        return len(drop), removed
+
+def take(path, label='manual'):
+    return SnapshotStore.for_dataset(path).take(path, label)
+
+def main():
+    from herbstore import DATA
+
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    c = sub.add_parser('create')
+    c.add_argument('--label', default='manual')
+    sub.add_parser('list')
+    d = sub.add_parser('diff')
+    d.add_argument('old')
+    d.add_argument('new', nargs='?', help='Snapshot to compare with (default: the current dataset)')
+    d.add_argument('--fields', action='store_true', help='Also list changed fields per record')
+    r = sub.add_parser('restore')
+    r.add_argument('name')
+    pr = sub.add_parser('prune')
+    pr.add_argument('--keep', type=int, required=True)
+    p.add_argument('--data', default=str(DATA), help='Dataset path (default: HERBAR_DATA or data/herbs.json)')
+    args = p.parse_args()
+
+    store = SnapshotStore.for_dataset(args.data)
+    if args.command == 'create':
+        with herbio.file_lock(args.data):
+            print(store.take(args.data, args.label))
+    elif args.command == 'list':
+        print(f"{'name':<40}{'records':>9}{'new':>7}")
+        for s in store.list():
+            print(f"{s['name']:<40}{s['records']:>9}{s['new_objects']:>7}")
+    elif args.command == 'diff':
+        old_name = store.resolve(args.old)
+        old = store.entries(old_name)
+        # blobs of the current dataset are stored too (and reused by the next snapshot)
+        new = store.entries(store.resolve(args.new)) if args.new else store.store_records(args.data)[0]
+        added, removed, changed = store.diff(old, new)
+        print(f'{old_name} -> {args.new or args.data}: '
+              f'{len(added)} added, {len(removed)} removed, {len(changed)} changed')
+        for label, ids in (('+', added), ('-', removed), ('~', changed)):
+            for i in ids:
+                print(f'  {label} {i}')
+        if args.fields and changed:
+            a, b = dict(map(tuple, old)), dict(map(tuple, new))
+            for i in changed:
+                print(f"  ~ {i}: {', '.join(store.changed_fields(a[i], b[i]))}")
+    elif args.command == 'restore':
+        name = store.resolve(args.name)
+        n = store.restore(name, args.data)
+        print(f'Restored {n} records from {name} into {args.data}')
+    else:
+        dropped, removed = store.prune(args.keep)
+        print(f'Pruned {dropped} snapshots and {removed} unreferenced objects.')
+
+if __name__ == '__main__':
+    main()
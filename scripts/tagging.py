@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Derive tags from section text and count them per tag (facets).
+
+TAXONOMY maps each tag to folded word stems ("caj" matches čaj, čaje, čajová).
+A tag can be limited to some canonical sections (harvest seasons are read
+only from "Sběr"). The stems are compiled once into one dict, and each
+distinct word of a record is looked up by its prefixes, so the cost is a few
+dict lookups per word whatever the size of the taxonomy. Template texts from
+populate_all_with_templates.py are ignored: they mention tea, spices and
+medicine for every herb.
+
+Records keep manually added tags. Derived tags are listed in `tags_auto` too,
+so a later run can drop them when the text no longer supports them.
+
+Writes the tag -> ids index with counts to data/tag-index.json. The site
+export writes the same facets for the index page (data/site/facets.json).
+
+Usage:
+  python scripts/tagging.py [--dry-run]
+"""
+import argparse
+import json
+
+from herbio import iter_records, stream_update
+from herbstore import DATA, ROOT
+from populate_all_with_templates import make_sections, make_summary
+from search_index import tokens
+from section_taxonomy import canonicalize
+
+INDEX = ROOT / 'data' / 'tag-index.json'
+SNAPSHOT = 'tags'
+MIN_STEM = 3
+
+# tag -> (stems, sections the tag is read from or None for all text);
+# a stem ending in '$' matches only the whole word ("kveten$": květen, not květenství)
+TAXONOMY = {
+    'čaj': (('caj', 'nalev', 'odvar', 'zapar'), None),
+    'koření': (('koreni', 'korenit', 'okoren', 'ochucen', 'dochucen'), None),
+    'kuchyně': (('kuchyn', 'kulinar', 'pokrm', 'omack', 'polevk', 'salat'), None),
+    'léčivá': (('leciv', 'lecitel', 'lecb', 'lecen', 'zanet', 'traveni', 'kaslu', 'kasel'), None),
+    'aromatická': (('aromat', 'vonn', 'silic'), None),
+    'vytrvalá': (('vytrval', 'trvalk'), None),
+    'jednoletá': (('jednolet',), None),
+    'dvouletá': (('dvoulet',), None),
+    'sběr: jaro': (('jaro$', 'jare$', 'jarn', 'brezen$', 'brezn', 'duben$', 'dubn', 'kveten$', 'kvetn'), ('Sběr',)),
+    'sběr: léto': (('leto$', 'leta$', 'lete$', 'letn', 'cerven$', 'cervn', 'cervenc', 'srpen$', 'srpn'), ('Sběr',)),
+    'sběr: podzim': (('podzim', 'zari$', 'rijen$', 'rijn', 'listopad'), ('Sběr',)),
+}
+
+def _compile(taxonomy):
+    stems = {}
+    for tag, (words, sections) in taxonomy.items():
+        for stem in words:
+            stems.setdefault(stem, []).append((tag, sections))
+    return stems
+
+STEMS = _compile(TAXONOMY)
+_LONGEST = max(len(s) for s in STEMS if not s.endswith('$'))
+
+def _matches(word):
+    yield from STEMS.get(word + '$', ())
+    for n in range(MIN_STEM, min(len(word), _LONGEST) + 1):
+        yield from STEMS.get(word[:n], ())
+
+def _texts(herb):
+    """(canonical heading or None, text) pairs, without template text."""
+    name = herb.get('name') or herb.get('id') or 'Bylinka'
+    summary = herb.get('summary')
+    if isinstance(summary, str) and summary != make_summary(name):
+        yield None, summary
+    templates = make_sections(name)
+    sections = herb.get('sections_text') or herb.get('sections')
+    if not isinstance(sections, dict):
+        return
+    for heading, value in canonicalize(sections).items():
+        if isinstance(value, str) and value != templates.get(heading):
+            yield heading, value
+
+def derive_tags(herb, cache=None):
+    """Return the sorted tags that the record's text supports."""
+    cache = {} if cache is None else cache
+    found = set()
+    for heading, text in _texts(herb):
+        for word in set(tokens(text)):
+            hits = cache.get(word)
+            if hits is None:
+                hits = cache[word] = tuple(_matches(word))
+            for tag, sections in hits:
+                if sections is None or heading in sections:
+                    found.add(tag)
+    return sorted(found)
+
+_cache = {}
+
+def process_record(herb):
+    """Pipeline stage: refresh derived tags in place; return 1 if tags changed."""
+    auto = derive_tags(herb, _cache)
+    old_auto = set(herb.get('tags_auto') or [])
+    manual = [t for t in (herb.get('tags') or []) if t not in old_auto]
+    tags = sorted(set(manual) | set(auto))
+    if tags == (herb.get('tags') or []) and auto == sorted(old_auto):
+        return 0
+    herb['tags'] = tags
+    if auto:
+        herb['tags_auto'] = auto
+    else:
+        herb.pop('tags_auto', None)
+    return 1
+
+class TagIndex:
+    """Tag -> ids inverted index with facet counts, built record by record."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def add(self, herb):
+        for tag in herb.get('tags') or []:
+            self.ids.setdefault(tag, []).append(herb.get('id'))
+
+    def to_json(self):
+        tags = sorted(self.ids, key=lambda t: (-len(self.ids[t]), t))
+        return {'facets': [{'tag': t, 'count': len(self.ids[t])} for t in tags],
+                'index': {t: self.ids[t] for t in tags}}
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--dry-run', action='store_true', help='Report tag counts without writing the records')
+    args = p.parse_args()
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    index = TagIndex()
+    def process(herb):
+        n = process_record(herb)
+        index.add(herb)
+        return n
+    if args.dry_run:
+        records = changed = 0
+        for herb in iter_records(DATA):
+            records += 1
+            changed += process(herb)
+    else:
+        records, changed, _ = stream_update(process, DATA, snapshot=SNAPSHOT)
+        with INDEX.open('w', encoding='utf-8') as f:
+            json.dump(index.to_json(), f, ensure_ascii=False, indent=2)
+    for facet in index.to_json()['facets']:
+        print(f"{facet['count']:>7}  {facet['tag']}")
+    print(f'Done. Tags changed in {changed} of {records} records'
+          + (' (dry run).' if args.dry_run else f'. Index: {INDEX.name}'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Cluster templated and near-duplicate herb texts with MinHash + LSH.
+
+Behavior:
+- Builds a 64-value MinHash signature (NumPy, multiply-shift hashing) of the
+  word 3-shingles of each record's summary and section text, folded for case
+  and diacritics. Records are processed in batches, so the cost is linear.
+- LSH splits each signature into bands; records that share a band bucket are
+  candidates, and a candidate is joined to the bucket's first record
+  (union-find) if their estimated Jaccard similarity reaches --threshold.
+  No pairwise comparison over the whole dataset is done.
+- Marks every record with `content_quality`: 'template' (cluster of at least
+  --template-size records, e.g. the generic text of
+  populate_all_with_templates.py), 'near_duplicate' (smaller cluster) or
+  'unique', and clustered records with `template_cluster` (the id of the
+  cluster's first record).
+- Writes a report to data/template-clusters.json.
+
+Usage:
+  python scripts/template_clusters.py [--threshold 0.7] [--template-size 5] [--dry-run]
+  python scripts/template_clusters.py --bench 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from herbio import iter_records, stream_update
+from herbstore import DATA, ROOT
+from textnorm import fold
+
+REPORT = ROOT / 'data' / 'template-clusters.json'
+SNAPSHOT = 'template_clusters'
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 3
+BATCH = 2000
+SEED = 42
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+def record_text(herb):
+    parts = [herb.get('summary') or '']
+    # plain text from sanitize_html.py when available
+    sections = herb.get('sections_text') or herb.get('sections')
+    if isinstance(sections, dict):
+        parts.extend(v for v in sections.values() if isinstance(v, str))
+    return ' '.join(p for p in parts if isinstance(p, str))
+
+class _Vocab(dict):
+    """Word -> id; words that fold to the same form share an id, and each
+    distinct word is folded only once."""
+
+    def __init__(self):
+        self.folded = {}
+
+    def __missing__(self, word):
+        i = self[word] = self.folded.setdefault(fold(word), len(self.folded))
+        return i
+
+class Signer:
+    """Turns texts into MinHash signatures, a batch at a time.
+
+    The words of a whole batch are mapped to integer ids and shingled in one
+    array, so the per-record Python work is one dict lookup per word.
+    """
+
+    def __init__(self):
+        self.vocab = _Vocab()
+
+    def sign(self, texts):
+        """Return a (len(texts), NUM_PERM) uint32 signature matrix."""
+        out = np.tile(_EMPTY, (len(texts), 1))
+        lookup = self.vocab.__getitem__
+        words, lengths = [], []
+        for text in texts:
+            before = len(words)
+            words.extend(map(lookup, text.lower().split()))
+            lengths.append(len(words) - before)
+        if len(words) < SHINGLE:
+            return out
+        ids = np.array(words, dtype=np.uint64)
+        rec = np.repeat(np.arange(len(texts)), lengths)
+        # a shingle is kept only if its words all belong to the same record
+        valid = rec[:1 - SHINGLE] == rec[SHINGLE - 1:]
+        with np.errstate(over='ignore'):
+            sh = (ids[:-2] * _MIX[0] ^ ids[1:-1] * _MIX[1] ^ ids[2:] * _MIX[2])[valid]
+        counts = np.bincount(rec[:1 - SHINGLE][valid], minlength=len(texts))
+        rows = np.nonzero(counts)[0]
+        if not len(rows):
+            return out
+        starts = np.concatenate(([0], np.cumsum(counts[rows])[:-1]))
+        with np.errstate(over='ignore'):
+            for p in range(NUM_PERM):
+                hv = ((sh * _A[p] + _B[p]) >> np.uint64(32)).astype(np.uint32)
+                out[rows, p] = np.minimum.reduceat(hv, starts)
+        return out
+
+def signatures(texts):
+    signer = Signer()
+    chunks = [signer.sign(texts[i:i + BATCH]) for i in range(0, len(texts), BATCH)]
+    return np.vstack(chunks) if chunks else np.empty((0, NUM_PERM), dtype=np.uint32)
+
+def cluster(sig, threshold):
+    """Union-find over LSH band buckets; return a list of root indices per row."""
+    n = len(sig)
+    parent = list(range(n))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    empty = (sig == _EMPTY).all(axis=1)
+    rows = NUM_PERM // BANDS
+    for b in range(BANDS):
+        with np.errstate(over='ignore'):
+            keys = sig[:, b * rows:(b + 1) * rows].astype(np.uint64) @ _BAND_MIX[:rows]
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        multi = counts[inverse.ravel()] > 1
+        if not multi.any():
+            continue
+        idx = np.nonzero(multi & ~empty)[0]
+        order = idx[np.argsort(inverse.ravel()[idx], kind='stable')]
+        buckets = inverse.ravel()[order]
+        bounds = np.nonzero(np.diff(buckets))[0] + 1
+        for group in np.split(order, bounds):
+            if len(group) < 2:
+                continue
+            lead = group[0]
+            sim = (sig[group[1:]] == sig[lead]).mean(axis=1)
+            for j in group[1:][sim >= threshold]:
+                ra, rb = find(lead), find(j)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+    return [find(i) for i in range(n)]
+
+def label(roots, ids, template_size):
+    """Map record index -> (content_quality, template_cluster or None)."""
+    sizes = {}
+    for r in roots:
+        sizes[r] = sizes.get(r, 0) + 1
+    out = []
+    for i, r in enumerate(roots):
+        size = sizes[r]
+        if size < 2:
+            out.append(('unique', None))
+        else:
+            out.append(('template' if size >= template_size else 'near_duplicate', ids[r]))
+    return out, sizes
+
+def bench(n):
+    from herbrecord import synthetic
+    texts = [record_text(h) for h in synthetic(n)]
+    t0 = time.perf_counter()
+    sig = signatures(texts)
+    t1 = time.perf_counter()
+    roots = cluster(sig, 0.7)
+    t2 = time.perf_counter()
+    print(json.dumps({'records': n, 'signatures_s': round(t1 - t0, 2), 'lsh_s': round(t2 - t1, 2),
+                      'clusters': len(set(roots)), 'ms_per_100k': round((t2 - t0) * 1000 * 100_000 / n)}))
+
+def main(threshold=0.7, template_size=5, dry_run=False):
+    if not DATA.exists():
+        print('data/herbs.json not found')
+        return
+    t0 = time.perf_counter()
+    ids, texts, summaries = [], [], []
+    for herb in iter_records(DATA):
+        ids.append(herb.get('id'))
+        texts.append(record_text(herb))
+        summaries.append((herb.get('summary') or '')[:160])
+    roots = cluster(signatures(texts), threshold)
+    labels, sizes = label(roots, ids, template_size)
+    elapsed = time.perf_counter() - t0
+    by_id = dict(zip(ids, labels))
+
+    clusters = {}
+    for i, r in enumerate(roots):
+        if sizes[r] > 1:
+            clusters.setdefault(r, []).append(ids[i])
+    report = {
+        'records': len(ids),
+        'threshold': threshold,
+        'seconds': round(elapsed, 3),
+        'counts': {q: sum(1 for l in labels if l[0] == q) for q in ('template', 'near_duplicate', 'unique')},
+        'clusters': [{'id': ids[r], 'size': len(members), 'quality': labels[r][0],
+                      'sample': summaries[r], 'members': members[:50]}
+                     for r, members in sorted(clusters.items(), key=lambda kv: -len(kv[1]))],
+    }
+    with REPORT.open('w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    changed = 0
+    if not dry_run:
+        def mark(herb):
+            quality, cluster_id = by_id.get(herb.get('id'), ('unique', None))
+            before = (herb.get('content_quality'), herb.get('template_cluster'))
+            herb['content_quality'] = quality
+            if cluster_id is None:
+                herb.pop('template_cluster', None)
+            else:
+                herb['template_cluster'] = cluster_id
+            return int(before != (quality, cluster_id))
+        _, changed, _ = stream_update(mark, DATA, snapshot=SNAPSHOT)
+
+    c = report['counts']
+    print(f"Done. {len(ids)} records in {elapsed:.2f} s: {c['template']} template, "
+          f"{c['near_duplicate']} near-duplicate, {c['unique']} unique; {len(clusters)} clusters. "
+          f"{changed} records updated. Report: {REPORT.name}")
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--threshold', type=float, default=0.7, help='Minimum estimated Jaccard similarity')
+    p.add_argument('--template-size', type=int, default=5, help='Cluster size from which records count as template')
+    p.add_argument('--dry-run', action='store_true', help='Write the report only')
+    p.add_argument('--bench', type=int, metavar='N', help='Time signatures and LSH on N synthetic records')
+    args = p.parse_args()
+    if args.bench:
+        bench(args.bench)
+    else:
+        main(args.threshold, args.template_size, args.dry_run)
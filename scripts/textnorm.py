@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Czech/Latin text normalisation shared by the scripts.
+
+Diacritics are stripped with `str.translate` tables built once at import
+(every precomposed Latin letter -> its base letter, combining marks removed)
+instead of NFKD plus a per-character loop. Text that still has non-ASCII
+characters after the table (Greek, ligatures, full-width forms) falls back to
+NFKD, so results are the same as the old `unicodedata` versions. Functions
+that are called again and again with the same names (herb names, search
+titles) are memoised with a bounded lru_cache.
+
+- fold(text): lower-case, no diacritics, same length (match offsets stay valid)
+- fold_key(text): fold() with combining marks dropped and whitespace collapsed;
+  the key for comparing names ("Šalvěj  lékařská" -> "salvej lekarska")
+- strip_diacritics(text): diacritics removed, case kept
+- words(text): runs of word characters (\\w+)
+- slugify(text): "Máta peprná" -> "mata-peprna"
+- safe_filename(text): characters outside [A-Za-z0-9_-] replaced by "_"
+- fold_keys / strip_many: batch versions for lists of texts (repeats are
+  served from the cache)
+
+Usage:
+  python scripts/textnorm.py --bench 100000
+"""
+import argparse
+import json
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+CACHE_SIZE = 1 << 14
+
+_WORD_RE = re.compile(r'\w+')
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+_UNSAFE_RE = re.compile(r'[^a-zA-Z0-9_\-]')
+_COMBINING_RE = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+def _nfkd_strip(s):
+    return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
+
+def _tables():
+    fold = {}
+    for cp in (*range(0x00C0, 0x0250), *range(0x1E00, 0x1F00)):
+        ch = chr(cp)
+        base = _nfkd_strip(ch)
+        if len(base) == 1 and base != ch:
+            fold[cp] = base
+    combining = {cp: None for cp in range(0x0300, 0x0370)}
+    return fold, {**fold, **combining}
+
+# FOLD keeps the length (one base letter per letter); STRIP also deletes combining marks
+FOLD, STRIP = _tables()
+
+def fold(text):
+    """Lower-case and strip diacritics, keeping the length (offsets stay valid)."""
+    out = text.translate(FOLD).lower()
+    if len(out) != len(text):
+        # a few characters change length when lower-cased ('İ'); fold them one by one
+        out = ''.join((c.translate(FOLD).lower() or c)[0] for c in text)
+    return out
+
+@lru_cache(maxsize=CACHE_SIZE)
+def strip_diacritics(text):
+    """Remove diacritics, keep case: 'Šalvěj' -> 'Salvej'."""
+    if not text:
+        return text
+    out = text.translate(STRIP)
+    if out.isascii() or (unicodedata.is_normalized('NFKD', out) and not _COMBINING_RE.search(out)):
+        return out
+    return _nfkd_strip(out)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fold_key(text):
+    """Lower-case, strip diacritics and collapse whitespace: 'Šalvěj  lékařská' -> 'salvej lekarska'."""
+    if not text:
+        return ''
+    return ' '.join(strip_diacritics(text.lower()).split())
+
+def words(text):
+    """Runs of word characters: 'máta (peprná)' -> ['máta', 'peprná']."""
+    return _WORD_RE.findall(text) if text else []
+
+def slugify(text, default=''):
+    """'Máta peprná' -> 'mata-peprna'; `default` when nothing is left."""
+    return _SLUG_RE.sub('-', fold_key(text)).strip('-') or default
+
+def safe_filename(text):
+    """Replace every character outside [A-Za-z0-9_-] by '_' (one for one)."""
+    return _UNSAFE_RE.sub('_', text)
+
+def fold_keys(texts):
+    """fold_key() of each text; repeated texts are folded once."""
+    return [fold_key(t) for t in texts]
+
+def strip_many(texts):
+    """strip_diacritics() of each text; repeated texts are stripped once."""
+    return [strip_diacritics(t) for t in texts]
+
+def _best_candidate_nfkd(results, name):
+    # best_candidate_from_search before this module: NFKD stripping inside the loops
+    name_norm = (name or '').strip().lower()
+    name_no_diac = _nfkd_strip(name_norm)
+    for item in results:
+        title = (item.get('title') or '').strip()
+        tnorm = title.lower()
+        if tnorm == name_norm or _nfkd_strip(tnorm) == name_no_diac:
+            return title
+    tokens = [t for t in re.split(r'[^\w]+', name_norm) if t and len(t) > 2]
+    for item in results:
+        title = (item.get('title') or '').strip()
+        tnorm = title.lower()
+        for tk in tokens:
+            if tk in tnorm or _nfkd_strip(tnorm).find(_nfkd_strip(tk)) != -1:
+                return title
+    return results[0].get('title')
+
+def bench(n):
+    from herbrecord import synthetic
+    from populate_wikipedia_links_api import best_candidate_from_search
+    names = [h['name'] for h in synthetic(n)]
+    # like populate_wikipedia_links_api.main: four query variants per herb, whose
+    # five search hits overlap with each other and with the neighbouring herbs'
+    suffixes = ('', ' (rostlina)', ' – rod', '', ' (koření)')
+    searches = [(name, [{'title': names[(i + q + j) % n] + suffixes[j]} for j in range(5)])
+                for i, name in enumerate(names) for q in range(4)]
+    out = {'records': n, 'searches': len(searches)}
+
+    def timed(label, fn):
+        t0 = time.perf_counter()
+        value = fn()
+        out[label] = round(time.perf_counter() - t0, 3)
+        return value
+
+    old = timed('strip_nfkd_s', lambda: [_nfkd_strip(s) for s in names])
+    strip_diacritics.cache_clear()
+    new = timed('strip_table_s', lambda: strip_many(names))
+    assert old == new
+    old = timed('best_candidate_nfkd_s', lambda: [_best_candidate_nfkd(r, s) for s, r in searches])
+    strip_diacritics.cache_clear()
+    new = timed('best_candidate_s', lambda: [best_candidate_from_search(r, s) for s, r in searches])
+    assert old == new
+    out['best_candidate_speedup'] = round(out['best_candidate_nfkd_s'] / max(out['best_candidate_s'], 1e-9), 1)
+    print(json.dumps(out))
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--bench', type=int, metavar='N', default=None,
+                   help='Compare table-based and NFKD normalisation on N synthetic names')
+    args = p.parse_args()
+    if args.bench:
+        bench(args.bench)
+    else:
+        p.print_help()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Validate data/herbs.json in one streaming pass and report coverage statistics.
+
+The record schema (SCHEMA) is compiled once into a flat list of per-field
+checks. Every record is then checked in a single pass while the coverage
+statistics are gathered: field fill rates, section length distribution,
+template-text ratios and image/URL validity. The report is JSON, for CI:
+
+    python scripts/validate.py --out data/validation.json --require summary=1,sections=1
+
+exits with status 1 if any schema error is found or a field's fill rate is
+below its --require threshold.
+
+Usage:
+  python scripts/validate.py [--out FILE] [--require field=rate,...] [--bench N]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from array import array
+from pathlib import Path
+
+from herbio import iter_records
+from herbstore import DATA, ROOT
+from boilerplate import Stripper
+from populate_all_with_templates import make_sections, make_summary
+from section_taxonomy import CANONICAL
+
+PUBLIC = ROOT / 'public'
+WIKI_RE = re.compile(r'^https://[a-z-]+\.(?:m\.)?wikipedia\.org/wiki/[^\s]+$')
+URL_RE = re.compile(r'^https?://[^\s/?#]+[^\s]*$')
+MAX_EXAMPLES = 5
+
+# field -> spec; 'type' is required, the other keys are optional checks
+SCHEMA = {
+    'id': {'type': str, 'required': True, 'nonempty': True},
+    'name': {'type': str, 'required': True, 'nonempty': True},
+    'summary': {'type': str, 'required': True},
+    'sections': {'type': dict, 'required': True, 'values': str},
+    'images': {'type': list, 'items': dict},
+    'source_url': {'type': str, 'url': True},
+    'wikipedia_url': {'type': (str, type(None)), 'pattern': WIKI_RE},
+    'other_names': {'type': list, 'items': str},
+    'tags': {'type': list, 'items': str},
+    'tags_auto': {'type': list, 'items': str},
+    'content_hash': {'type': str},
+    'content_quality': {'type': str, 'pattern': re.compile(r'^(?:template|near_duplicate|unique)$')},
+    'template_cluster': {'type': str},
+    'similar': {'type': list, 'items': str},
+    'sections_html': {'type': dict, 'values': str},
+    'sections_text': {'type': dict, 'values': str},
+    'sanitizer': {'type': dict},
+}
+
+def compile_schema(schema):
+    """Compile the schema into a tuple of (field, required, types, checks, error codes).
+
+    `checks` are the extra per-value checks (value -> error code or None), run
+    only when the field is present and has the right type; the error codes
+    are prebuilt so the hot loop does no string formatting.
+    """
+    compiled = []
+    for field, spec in schema.items():
+        checks = []
+        if spec.get('nonempty'):
+            checks.append(lambda v: 'empty' if isinstance(v, str) and not v.strip() else None)
+        if 'values' in spec:
+            t = spec['values']
+            checks.append(lambda v, t=t: 'value_type' if any(not isinstance(x, t) for x in v.values()) else None)
+        if 'items' in spec:
+            t = spec['items']
+            checks.append(lambda v, t=t: 'item_type' if any(not isinstance(x, t) for x in v) else None)
+        if spec.get('url'):
+            checks.append(lambda v: 'url' if v and not URL_RE.match(v) else None)
+        if 'pattern' in spec:
+            rx = spec['pattern']
+            checks.append(lambda v, rx=rx: 'pattern' if isinstance(v, str) and v and not rx.match(v) else None)
+        codes = {c: f'{field}.{c}' for c in ('missing', 'type', 'empty', 'value_type', 'item_type', 'url', 'pattern')}
+        compiled.append((field, bool(spec.get('required')), spec['type'], tuple(checks), codes))
+    return tuple(compiled)
+
+def _filled(v):
+    if isinstance(v, str):
+        return bool(v.strip())
+    return v is not None and v != [] and v != {}
+
+def _percentiles(values):
+    if not values:
+        return None
+    s = sorted(values)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {'min': s[0], 'p10': pick(0.1), 'p50': pick(0.5), 'p90': pick(0.9), 'max': s[-1],
+            'mean': round(sum(s) / len(s), 1)}
+
+class Validator:
+    def __init__(self, schema=SCHEMA):
+        self.checks = compile_schema(schema)
+        self.fields = tuple(schema)
+        self.records = 0
+        self.present = dict.fromkeys(self.fields, 0)
+        self.filled = dict.fromkeys(self.fields, 0)
+        self.errors = {}
+        self.examples = {}
+        self.section_keys = {}
+        self.non_canonical = 0
+        self.section_lengths = array('I')
+        self.sections_per_record = array('I')
+        self.template = {'summary': 0, 'sections': 0, 'records_all_sections': 0, 'boilerplate': 0}
+        self.images = {'records_with_image': 0, 'valid_url': 0, 'invalid_url': 0, 'local': 0, 'local_missing': 0}
+        self.urls = {'wikipedia': 0, 'wikipedia_invalid': 0, 'source': 0, 'source_invalid': 0}
+        self._local_seen = {}
+        self.boilerplate = Stripper.from_file()
+
+    def _error(self, rule, herb):
+        self.errors[rule] = self.errors.get(rule, 0) + 1
+        ex = self.examples.setdefault(rule, [])
+        if len(ex) < MAX_EXAMPLES:
+            ex.append(herb.get('id') if isinstance(herb, dict) else None)
+
+    def add(self, herb):
+        self.records += 1
+        if not isinstance(herb, dict):
+            self._error('record.type', herb)
+            return
+        present, filled = self.present, self.filled
+        for field, required, types, checks, codes in self.checks:
+            if field not in herb:
+                if required:
+                    self._error(codes['missing'], herb)
+                continue
+            v = herb[field]
+            present[field] += 1
+            if _filled(v):
+                filled[field] += 1
+            if not isinstance(v, types):
+                self._error(codes['type'], herb)
+                continue
+            for check in checks:
+                err = check(v)
+                if err:
+                    self._error(codes[err], herb)
+        self._sections(herb)
+        self._images(herb)
+        self._urls(herb)
+
+    def _sections(self, herb):
+        name = herb.get('name') or herb.get('id') or 'Bylinka'
+        summary = herb.get('summary')
+        if isinstance(summary, str):
+            if summary == make_summary(name):
+                self.template['summary'] += 1
+            if self.boilerplate.contains(summary):
+                self.template['boilerplate'] += 1
+        sections = herb.get('sections')
+        if not isinstance(sections, dict):
+            return
+        templates = make_sections(name)
+        n = templated = 0
+        for key, text in sections.items():
+            if not isinstance(text, str):
+                continue
+            n += 1
+            self.section_keys[key] = self.section_keys.get(key, 0) + 1
+            if key not in CANONICAL:
+                self.non_canonical += 1
+            self.section_lengths.append(len(text))
+            if templates.get(key) == text:
+                templated += 1
+            if self.boilerplate.contains(text):
+                self.template['boilerplate'] += 1
+        self.sections_per_record.append(n)
+        self.template['sections'] += templated
+        if n and templated == n:
+            self.template['records_all_sections'] += 1
+
+    def _images(self, herb):
+        imgs = herb.get('images')
+        if not isinstance(imgs, list) or not imgs or not isinstance(imgs[0], dict):
+            return
+        url = imgs[0].get('file_url')
+        if not url:
+            return
+        self.images['records_with_image'] += 1
+        if url.startswith('/'):
+            self.images['local'] += 1
+            exists = self._local_seen.get(url)
+            if exists is None:
+                exists = self._local_seen[url] = (PUBLIC / url.lstrip('/')).is_file()
+            if not exists:
+                # downloaded files are not in git: a statistic, not a schema error
+                self.images['local_missing'] += 1
+        elif URL_RE.match(url):
+            self.images['valid_url'] += 1
+        else:
+            self.images['invalid_url'] += 1
+            self._error('images.url', herb)
+
+    def _urls(self, herb):
+        wiki = herb.get('wikipedia_url')
+        if isinstance(wiki, str) and wiki:
+            ok = bool(WIKI_RE.match(wiki))
+            self.urls['wikipedia' if ok else 'wikipedia_invalid'] += 1
+        src = herb.get('source_url')
+        if isinstance(src, str) and src:
+            self.urls['source' if URL_RE.match(src) else 'source_invalid'] += 1
+
+    def report(self, seconds=None):
+        n = self.records or 1
+        rate = lambda k: round(k / n, 4)
+        total_sections = len(self.section_lengths) or 1
+        out = {
+            'records': self.records,
+            'valid': not self.errors,
+            'errors': dict(sorted(self.errors.items())),
+            'error_examples': self.examples,
+            'fields': {f: {'present': self.present[f], 'filled': self.filled[f], 'fill_rate': rate(self.filled[f])}
+                       for f in self.fields},
+            'sections': {
+                'keys': dict(sorted(self.section_keys.items(), key=lambda kv: -kv[1])),
+                'non_canonical': self.non_canonical,
+                'length': _percentiles(self.section_lengths),
+                'per_record': _percentiles(self.sections_per_record),
+            },
+            'templates': {
+                'summary_rate': rate(self.template['summary']),
+                'section_rate': round(self.template['sections'] / total_sections, 4),
+                'records_all_template_sections_rate': rate(self.template['records_all_sections']),
+                'boilerplate_leftovers': self.template['boilerplate'],
+            },
+            'images': {**self.images, 'rate': rate(self.images['records_with_image'])},
+            'urls': self.urls,
+        }
+        if seconds is not None:
+            out['timing'] = {'seconds': round(seconds, 3),
+                             'ms_per_100k': round(seconds * 1000 * 100_000 / n, 1)}
+        return out
+
+def validate(records, schema=SCHEMA):
+    v = Validator(schema)
+    t0 = time.perf_counter()
+    for herb in records:
+        v.add(herb)
+    return v.report(time.perf_counter() - t0)
+
+def parse_require(spec):
+    req = {}
+    for part in (spec or '').split(','):
+        if part.strip():
+            field, _, value = part.partition('=')
+            req[field.strip()] = float(value or 1)
+    return req
+
+def gate(report, require):
+    """Return the list of failure messages for CI."""
+    failures = [f'{rule}: {count}' for rule, count in report['errors'].items()]
+    for field, minimum in require.items():
+        got = report['fields'].get(field, {}).get('fill_rate', 0)
+        if got < minimum:
+            failures.append(f'{field} fill rate {got:.2%} < {minimum:.2%}')
+    return failures
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--out', default=None, help='Write the JSON report here instead of stdout')
+    p.add_argument('--require', default=None, help='Minimum fill rates, e.g. summary=1,sections=0.95')
+    p.add_argument('--bench', type=int, metavar='N', help='Validate N synthetic records and report timing only')
+    args = p.parse_args()
+
+    if args.bench:
+        from herbrecord import synthetic
+        report = validate(list(synthetic(args.bench)))
+        print(json.dumps({'records': report['records'], **report['timing']}))
+        return
+    if not DATA.exists():
+        print(f'{DATA} not found', file=sys.stderr)
+        raise SystemExit(1)
+    report = validate(iter_records(DATA))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+    failures = gate(report, parse_require(args.require))
+    for f in failures:
+        print('FAIL', f, file=sys.stderr)
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
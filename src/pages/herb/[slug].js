@@ -1,10 +1,18 @@
 // `fs` and `path` are only needed server-side inside data-loading functions
 import Image from 'next/image'
-const { sanitizeHtml } = require('../../../lib/sanitizeHtml')
+import Link from 'next/link'
 
-export default function HerbDetail({ herb }) {
+export default function HerbDetail({ herb, similar = [] }) {
   if (!herb) return <div style={{ padding: 20 }}>Bylinka nenalezena</div>
-  const img = (herb.images && herb.images[0] && (herb.images[0].thumb_url || herb.images[0].file_url)) || null
+  const first = (herb.images && herb.images[0]) || {}
+  const img = first.thumb_url || first.file_url || null
+  const placeholder = {
+    backgroundColor: first.dominant_color || '#fafafa',
+    backgroundImage: first.lqip ? `url(${first.lqip})` : undefined,
+    backgroundSize: 'cover',
+    backgroundPosition: 'center',
+    aspectRatio: first.width && first.height ? `${first.width} / ${first.height}` : undefined
+  }
   return (
     <main className="herb-detail" style={{ padding: 20, fontFamily: 'system-ui, Arial' }}>
       <p><a href="/">← Zpět na seznam</a></p>
@@ -15,30 +23,21 @@ export default function HerbDetail({ herb }) {
 
           {/* Ordered section rendering: show requested sections in order and fallbacks */}
           {(() => {
-            const sections = herb.sections || {}
-            const keys = Object.keys(sections)
+            // sanitized at data-build time (scripts/sanitize_html.py); raw sections are not shipped
+            const html = herb.sections_html || {}
+            const keys = Object.keys(html)
+            const render = k => html[k] || null
 
+            // canonical headings (DISPLAY in scripts/section_taxonomy.py); records store these keys
             const target = ['Popis', 'Použití', 'Pěstování', 'Léčivé účinky', 'Složení', 'Sběr', 'Recepty']
-            const used = new Set()
-            const out = []
-
-            const findKey = token => keys.find(k => k.toLowerCase().includes(token.toLowerCase()))
-
-            for (const t of target) {
-              const k = findKey(t)
-              if (k && !used.has(k)) {
-                used.add(k)
-                out.push([t, sanitizeHtml(sections[k])])
-              } else {
-                out.push([t, null])
-              }
-            }
+            const used = new Set(target)
+            const out = target.map(t => [t, render(t)])
 
             // append remaining keys not already used
             for (const k of keys) {
               if (!used.has(k)) {
                 used.add(k)
-                out.push([k, sanitizeHtml(sections[k])])
+                out.push([k, render(k)])
               }
             }
 
@@ -68,8 +67,8 @@ export default function HerbDetail({ herb }) {
           {herb.other_names && <div><strong>Další názvy:</strong> {(herb.other_names||[]).join(', ')}</div>}
           {herb.latin && <div><strong>Latinsky:</strong> {herb.latin}</div>}
             {img ? (
-              <div style={{ width: 200, marginBottom: 8 }}>
-                <img src={img} alt={herb.name} style={{ width: '100%', height: 'auto', borderRadius: 6 }} />
+              <div style={{ width: 200, marginBottom: 8, borderRadius: 6, overflow: 'hidden', ...placeholder }}>
+                <img src={img} alt={herb.name} decoding="async" style={{ display: 'block', width: '100%', height: 'auto', borderRadius: 6 }} />
               </div>
             ) : null}
             {herb.wikipedia_url ? (
@@ -79,6 +78,16 @@ export default function HerbDetail({ herb }) {
             )}
           {herb.source_url && <div style={{ marginTop: 8 }}><a href={herb.source_url} target="_blank" rel="noopener noreferrer">Zobrazit zdroj</a></div>}
           {herb.license && <div style={{ marginTop: 8, fontSize: 13, color: '#666' }}>Licence: {herb.license}</div>}
+          {similar.length > 0 && (
+            <div style={{ marginTop: 12 }}>
+              <strong>Podobné bylinky:</strong>
+              <ul style={{ margin: '4px 0 0', paddingLeft: 18 }}>
+                {similar.map(s => (
+                  <li key={s.id}><Link href={`/herb/${encodeURIComponent(s.id)}`}>{s.name}</Link></li>
+                ))}
+              </ul>
+            </div>
+          )}
         </aside>
       </div>
     </main>
@@ -86,43 +95,16 @@ export default function HerbDetail({ herb }) {
 }
 
 export async function getStaticPaths() {
-  const fs = require('fs')
-  const path = require('path')
-  const dataPath = path.join(process.cwd(), 'data', 'herbs.json')
-  const raw = fs.readFileSync(dataPath, 'utf8')
-  const herbs = JSON.parse(raw)
-  const paths = herbs.map(h => ({ params: { slug: h.id } }))
+  const { listSlugs } = require('../../../lib/siteData')
+  const paths = listSlugs().map(slug => ({ params: { slug } }))
   return { paths, fallback: false }
 }
 
 export async function getStaticProps({ params }) {
-  const fs = require('fs')
-  const path = require('path')
-  const dataPath = path.join(process.cwd(), 'data', 'herbs.json')
-  const raw = fs.readFileSync(dataPath, 'utf8')
-  const herbs = JSON.parse(raw)
-  const herb = herbs.find(h => h.id === params.slug) || null
-  // attempt to find a Wikipedia page (cs then en)
-  if (herb && !herb.wikipedia_url) {
-    const tryUrls = []
-    const nameCandidate = encodeURIComponent(herb.name.replace(/\s+/g, '_'))
-    const idCandidate = encodeURIComponent(herb.id.replace(/\s+/g, '_'))
-    tryUrls.push(`https://cs.wikipedia.org/wiki/${nameCandidate}`)
-    if (idCandidate !== nameCandidate) tryUrls.push(`https://cs.wikipedia.org/wiki/${idCandidate}`)
-    tryUrls.push(`https://en.wikipedia.org/wiki/${nameCandidate}`)
-
-    for (const u of tryUrls) {
-      try {
-        const res = await fetch(u, { method: 'HEAD' })
-        if (res && res.ok) {
-          herb.wikipedia_url = u
-          break
-        }
-      } catch (e) {
-        // ignore network errors
-      }
-    }
-  }
-
-  return { props: { herb } }
+  // one small per-slug shard instead of parsing the whole dataset for every page
+  const { loadHerb, similarHerbs } = require('../../../lib/siteData')
+  const herb = loadHerb(params.slug)
+  const similar = similarHerbs(herb)
+  // wikipedia_url is resolved by the data pipeline (scripts/populate_wikipedia_links.py), not at build time
+  return { props: { herb, similar } }
 }
@@ -1,30 +1,46 @@
 import Link from 'next/link'
-import { useState, useMemo } from 'react'
+import { useRouter } from 'next/router'
+import { useState, useMemo, useEffect } from 'react'
 import HerbCard from '../../components/HerbCard'
 import SearchBar from '../../components/SearchBar'
+const { fold, search } = require('../../lib/searchIndex')
 
-export default function Home({ herbs }) {
+export default function Home({ herbs, facets }) {
   const [query, setQuery] = useState('')
   const [tag, setTag] = useState('')
+  // null: not loaded yet, false: unavailable (plain substring filter is used)
+  const [index, setIndex] = useState(null)
+  const { basePath } = useRouter()
+  const searching = query.trim() !== ''
 
-  const availableTags = useMemo(() => {
-    const s = new Set()
-    herbs.forEach(h => (h.tags || []).forEach(t => s.add(t)))
-    return Array.from(s).sort()
-  }, [herbs])
+  useEffect(() => {
+    if (!searching || index !== null) return
+    let cancelled = false
+    fetch(`${basePath}/data/search-index.json`)
+      .then(r => (r.ok ? r.json() : false))
+      .catch(() => false)
+      .then(data => { if (!cancelled) setIndex(data) })
+    return () => { cancelled = true }
+  }, [searching, index, basePath])
+
+  const byId = useMemo(() => new Map(herbs.map(h => [h.id, h])), [herbs])
+
+  // precomputed tag counts and tag -> ids index (scripts/tagging.py)
+  const availableTags = useMemo(() => facets.facets.map(f => f.tag), [facets])
+  const tagCounts = useMemo(() => Object.fromEntries(facets.facets.map(f => [f.tag, f.count])), [facets])
+  const tagIds = useMemo(() => (tag ? new Set(facets.index[tag] || []) : null), [facets, tag])
 
   const filtered = useMemo(() => {
-    const q = query.trim().toLowerCase()
+    const hasTag = h => !tagIds || tagIds.has(h.id)
+    const ids = index ? search(index, query) : null
+    if (ids) return ids.map(id => byId.get(id)).filter(h => h && hasTag(h))
+    const q = fold(query.trim())
     return herbs.filter(h => {
-      if (tag) {
-        const tags = (h.tags || [])
-        if (!tags.includes(tag)) return false
-      }
+      if (!hasTag(h)) return false
       if (!q) return true
-      const hay = (h.name + ' ' + (h.summary||'')).toLowerCase()
-      return hay.includes(q)
+      return fold(h.name + ' ' + (h.summary || '')).includes(q)
     })
-  }, [herbs, query, tag])
+  }, [herbs, byId, index, query, tagIds])
 
   return (
     <main style={{ padding: 20, fontFamily: 'system-ui, Arial' }}>
@@ -41,7 +57,7 @@ export default function Home({ herbs }) {
         položku zobrazíte detail s popisem, informacemi o použití a odkazy na Wikipedii či původní zdroj.
       </p>
 
-      <SearchBar value={query} onChange={setQuery} tag={tag} onTagChange={setTag} tags={availableTags} />
+      <SearchBar value={query} onChange={setQuery} tag={tag} onTagChange={setTag} tags={availableTags} counts={tagCounts} />
 
       <div style={{ marginTop: 16, display: 'grid', gridTemplateColumns: 'repeat(auto-fit,minmax(220px,1fr))', gap: 16 }}>
         {filtered.map(h => (
@@ -59,10 +75,9 @@ export default function Home({ herbs }) {
 }
 
 export async function getStaticProps() {
-  const fs = require('fs')
-  const path = require('path')
-  const dataPath = path.join(process.cwd(), 'data', 'herbs.json')
-  const raw = fs.readFileSync(dataPath, 'utf8')
-  const herbs = JSON.parse(raw)
-  return { props: { herbs } }
+  // listing projection (id, name, summary snippet, thumbnail, tags) from scripts/export_site_data.py
+  const { loadListing, loadFacets } = require('../../lib/siteData')
+  const herbs = loadListing()
+  const facets = loadFacets()
+  return { props: { herbs, facets } }
 }